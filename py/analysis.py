@@ -2,6 +2,8 @@ import fire
 from util import file
 import pandas as pd
 
+ANALYSIS_ROWS = 200
+
 
 def compare_price_with_line_series(
     df: pd.DataFrame, price_col: str, series_1_col: str, series_2_col: str
@@ -267,7 +269,8 @@ class Analysis(object):
             source (str): The path to the source data.
             interval (str): The time interval for the analysis (e.g., '1m', '5m').
         """
-        df = file.get_source(source)
+        # Every check looks at the last few candles only
+        df = file.read_tail(source, ANALYSIS_ROWS)
 
         print(f"\nIn chart {interval}:")
 
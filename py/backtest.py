@@ -69,17 +69,14 @@ class Back_Test_CLI:
             tail (int): Number of rows to plot from the end of the DataFrame.
             filter (str): Filter to apply on the DataFrame.
         """
-        # Load data
-        df = file.get_source(source)
-        symbol = df["symbol"].iloc[0] if "symbol" in df.columns else None
+        # Load only the last N rows
+        plot_df = file.read_tail(source, tail)
+        symbol = plot_df["symbol"].iloc[0] if "symbol" in plot_df.columns else None
 
         if symbol is None:
             print("No symbol found in the DataFrame. Please check your source file.")
             return
 
-        # Plot last N rows
-        plot_df = df.tail(tail).reset_index(drop=True)
-
         # Set position column based on RSI conditions
         plot_df["position"] = "-"
         plot_df["sensitive_position"] = "-"
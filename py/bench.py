@@ -0,0 +1,204 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+import pandas
+from fire import Fire
+import bingx
+from binanceapi import Price_CLI
+from mockexchange import MockExchange
+from util import file, integrity, ratelimit
+from util.klinestore import INTERVAL_MS_MAP
+
+MODES = [
+    "chunk",
+    "from_to",
+    "from_to_parallel",
+    "merge",
+    "bingx",
+    "bingx_async",
+]
+
+
+class Bench_CLI:
+    """
+    CLI tool to benchmark every fetch mode offline against the local mock exchange.
+
+    Example usage:
+        python py/bench.py run --chunk=20 --latency=0.05 --jitter=0.02
+        python py/bench.py run --modes=chunk,from_to_parallel --error_rate=0.02 --output=ignore/bench.csv
+    """
+
+    def run(
+        self,
+        modes=None,
+        symbol: str = "BTCUSDT",
+        interval: str = "1m",
+        chunk: int = 20,
+        workers: int = 8,
+        merge_gap: int = 1000,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        weight_limit: int = 6000,
+        store: str = None,
+        repeat: int = 1,
+        output: str = None,
+        seed: int = 0,
+    ):
+        """
+        Start the mock exchange in this process, point the Binance and BingX fetchers
+        at it with the kline cache off, and time each fetch mode. The candles of
+        every run are checked for order, duplicates and holes, and the bench fails
+        if any run has one. Every run starts with fresh rate limiters, a fresh
+        exchange weight budget and the same random latency and errors.
+
+        Args:
+            modes (str | list): Modes to run, defaults to all of them:
+                chunk, from_to, from_to_parallel, merge, bingx, bingx_async.
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1m
+            chunk (int): Pages fetched per run, the date range modes cover the same span.
+            workers (int): Workers of the parallel and async modes.
+            merge_gap (int): Candles missing from the CSV file before fetch_and_merge.
+            latency (float): Base response latency in seconds.
+            jitter (float): Extra random latency in seconds.
+            error_rate (float): Probability of a 429 answer to any request.
+            weight_limit (int): Used weight per minute above which requests get 429.
+            store (str): Kline store to serve instead of synthetic candles.
+            repeat (int): Runs per mode.
+            output (str): Optional CSV file path for the results.
+            seed (int): Seed of the random latency and errors of the mock exchange.
+        """
+        if isinstance(modes, str):
+            modes = modes.split(",")
+        modes = modes or MODES
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+
+        exchange = MockExchange(
+            latency, jitter, error_rate, weight_limit, store=store, seed=seed
+        )
+        base_url = exchange.start()
+        prices = Price_CLI()
+        prices.base_url = base_url
+        prices.use_cache = False
+        bingx.APIURL = base_url
+        bingx.USE_CACHE = False
+
+        results = []
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for mode in modes:
+                    for _ in range(repeat):
+                        path = os.path.join(tmp, f"{mode}.csv")
+                        run = self.prepare(
+                            mode,
+                            prices,
+                            symbol,
+                            interval,
+                            chunk,
+                            workers,
+                            merge_gap,
+                            path,
+                        )
+                        exchange.reset()
+                        ratelimit.reset_limiter("binance")
+                        ratelimit.reset_limiter("bingx")
+                        started = time.perf_counter()
+                        collection = run()
+                        elapsed = time.perf_counter() - started
+                        stats = exchange.stats()
+                        results.append(
+                            {
+                                "mode": mode,
+                                "seconds": round(elapsed, 3),
+                                **stats,
+                                "candles_per_s": round(stats["candles"] / elapsed),
+                                **self.check(mode, interval, path, collection),
+                            }
+                        )
+        finally:
+            exchange.stop()
+
+        df = pandas.DataFrame(results)
+        print(df.to_string(index=False))
+        if output:
+            file.write_dataframe(df, output)
+        broken = df[(df["out_of_order"] + df["duplicates"] + df["gaps"]) > 0]
+        if len(broken):
+            raise ValueError(
+                f"Fetched candles are not continuous for: {', '.join(broken['mode'].unique())}"
+            )
+
+    def check(
+        self, mode: str, interval: str, path: str, collection: bingx.KlineCollection
+    ) -> dict:
+        """
+        Check the candles of one run: the CSV file of the Binance modes, the
+        returned collection of the BingX modes.
+
+        Returns:
+            dict: Rows, and out of order, duplicate and missing open times.
+        """
+        if mode.startswith("bingx"):
+            columns = bingx.ConnectorAdapter(collection).to_columns()
+        else:
+            columns = integrity.read_csv_columns(path)
+        report = integrity.scan(columns, INTERVAL_MS_MAP.get(interval))
+        return {
+            "rows": report["rows"],
+            "out_of_order": report["out_of_order"],
+            "duplicates": report["duplicates"],
+            "gaps": report["gaps"],
+        }
+
+    def prepare(
+        self,
+        mode: str,
+        prices: Price_CLI,
+        symbol: str,
+        interval: str,
+        chunk: int,
+        workers: int,
+        merge_gap: int,
+        path: str,
+    ):
+        """
+        Set up one run of a mode.
+
+        Returns:
+            callable: The timed part of the run, returning the candles of the BingX modes.
+        """
+        client = prices.create_client(pool_size=workers)
+        now = datetime.now(timezone.utc)
+        span = timedelta(milliseconds=chunk * prices.limit * INTERVAL_MS_MAP[interval])
+        from_ = (now - span).strftime("%Y-%m-%d %H:%M:%S")
+        to = now.strftime("%Y-%m-%d %H:%M:%S")
+
+        if mode == "chunk":
+            return lambda: prices.fetch_by_chunk(client, symbol, interval, path, chunk)
+        if mode == "from_to":
+            return lambda: prices.fetch_by_from_to(
+                client, symbol, interval, path, from_, to
+            )
+        if mode == "from_to_parallel":
+            return lambda: prices.fetch_by_from_to_parallel(
+                client, symbol, interval, path, from_, to, workers
+            )
+        if mode == "merge":
+            # An up to date file missing its last `merge_gap` candles
+            pages = -(-merge_gap // prices.limit) + 1
+            prices.fetch_by_chunk(client, symbol, interval, path, pages)
+            file.truncate(path, file.tail_offset(path, merge_gap))
+            return lambda: prices.fetch_and_merge(client, symbol, interval, path)
+        if mode == "bingx":
+            connector = bingx.BingXConnector()
+        else:
+            connector = bingx.AsyncBingXConnector(concurrency=workers)
+        return lambda: connector.fetch_by_chunk(symbol, interval, chunk)
+
+
+if __name__ == "__main__":
+    Fire(Bench_CLI)
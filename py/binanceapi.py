@@ -2,11 +2,32 @@ import csv
 import os
 import fire
 import csv
+import numpy as np
+import pandas
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from datetime import datetime, timezone, timedelta
-from util import file
+from requests.adapters import HTTPAdapter
+from pathlib import Path
+from util import bars, coverage, file, klinecache, klinestore, ratelimit, resample
 from binance.spot import Spot
+from binance.error import ClientError
 from termcolor import colored
 
+KLINE_CSV_HEADERS = [
+    "symbol",
+    "timestamp",
+    "date",
+    "start",
+    "end",
+    "open",
+    "high",
+    "low",
+    "close",
+    "vol",
+    "type",
+]
+
 
 def calc_stoploss(price: float, stoploss: float):
     """Calculate the stop loss price."""
@@ -88,9 +109,15 @@ class Price_CLI:
     Example usage:
         python price.py fetch --symbol=BTCUSDT --interval=1d --path=ignore/btc.csv --chunk=3
         python price.py fetch --symbol=BTCUSDT --interval=1d --path=ignore/btc.csv --from_=2023-01-01 --to=2025-07-12
+        python price.py fetch --symbol=BTCUSDT --interval=1m --path=ignore/btc.csv --from_=2023-01-01 --to=2025-07-12 --workers=8
     """
 
+    base_url = "https://api.binance.com"
     limit = 500
+    klines_weight = 2
+    agg_trades_limit = 1000
+    agg_trades_weight = 4
+    use_cache = True
 
     def calc_exit_futures(
         self,
@@ -154,28 +181,119 @@ class Price_CLI:
         start_time = int(from_dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
         end_time = int(to_dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
         total_ms = end_time - start_time
-        interval_map = {
-            "1m": 60 * 1000,
-            "3m": 3 * 60 * 1000,
-            "5m": 5 * 60 * 1000,
-            "15m": 15 * 60 * 1000,
-            "30m": 30 * 60 * 1000,
-            "1h": 60 * 60 * 1000,
-            "2h": 2 * 60 * 60 * 1000,
-            "4h": 4 * 60 * 60 * 1000,
-            "6h": 6 * 60 * 60 * 1000,
-            "8h": 8 * 60 * 60 * 1000,
-            "12h": 12 * 60 * 60 * 1000,
-            "1d": 24 * 60 * 60 * 1000,
-            "3d": 3 * 24 * 60 * 60 * 1000,
-            "1w": 7 * 24 * 60 * 60 * 1000,
-            "1M": 30 * 24 * 60 * 60 * 1000,
-        }
-        candle_ms = interval_map.get(interval, 24 * 60 * 60 * 1000)
+        candle_ms = klinestore.INTERVAL_MS_MAP.get(interval, 24 * 60 * 60 * 1000)
         est_candles = total_ms // candle_ms + 1
         est_chunks = (est_candles + limit - 1) // limit
         return candle_ms, est_candles, est_chunks, start_time, end_time
 
+    def calc_page_windows(self, interval: str, from_: str, to: str):
+        """
+        Split a date range into the exact page windows requested from Binance.
+        Each window spans `limit` candles, so every page can be requested independently.
+
+        Args:
+            interval (str): Kline interval, e.g. "1d", "1h"
+            from_ (str): Start date as string
+            to (str): End date as string
+
+        Returns:
+            list: List of (start_time, end_time) tuples in milliseconds, oldest first.
+        """
+        candle_ms, est_candles, est_chunks, start_time, end_time = (
+            self.calc_end_time_from_to(interval, from_, to)
+        )
+        return self.split_page_windows(candle_ms, start_time, end_time)
+
+    def split_page_windows(self, candle_ms: int, start_time: int, end_time: int):
+        """
+        Split [start_time, end_time] (milliseconds, inclusive) into windows of `limit` candles.
+
+        Returns:
+            list: List of (start_time, end_time) tuples in milliseconds, oldest first.
+        """
+        page_ms = candle_ms * self.limit
+        windows = []
+        for page_start in range(start_time, end_time + 1, page_ms):
+            windows.append((page_start, min(page_start + page_ms - 1, end_time)))
+        return windows
+
+    def request_klines(self, client: Spot, **params) -> list:
+        """
+        Request one page of klines through the kline cache and the shared Binance rate limiter.
+        Pages that only hold closed candles are cached on disk.
+
+        Args:
+            client (Spot): Binance Spot client
+            **params: Parameters forwarded to client.klines
+
+        Returns:
+            list: Kline data.
+        """
+        window = {k: params.get(k) for k in ("limit", "startTime", "endTime")}
+        cache = klinecache.get_cache() if self.use_cache else None
+        if cache is not None:
+            cached = cache.get("binance", params["symbol"], params["interval"], window)
+            if cached is not None:
+                return cached
+
+        klines = self.request_klines_uncached(client, **params)
+
+        # Only a window that ended in the past with no open candle can never change
+        now_ms = klinecache.now_ms()
+        end_time = params.get("endTime")
+        closed = end_time is not None and end_time < now_ms
+        if closed and klines:
+            closed = klines[-1][6] < now_ms
+        if cache is not None and closed:
+            cache.put("binance", params["symbol"], params["interval"], window, klines)
+        return klines
+
+    def request_klines_uncached(self, client: Spot, **params) -> list:
+        """
+        Request one page of klines through the shared Binance rate limiter.
+
+        Args:
+            client (Spot): Binance Spot client
+            **params: Parameters forwarded to client.klines
+
+        Returns:
+            list: Kline data.
+        """
+        return self.request_limited(client.klines, self.klines_weight, **params)
+
+    def request_limited(self, method, weight: int, **params):
+        """
+        Call a Binance Spot client method through the shared Binance rate limiter.
+
+        Args:
+            method (callable): Bound client method, e.g. client.klines
+            weight (int): Request weight of the endpoint.
+            **params: Parameters forwarded to the method.
+
+        Returns:
+            *: Response data.
+        """
+        limiter = ratelimit.get_limiter("binance")
+
+        def request():
+            try:
+                response = method(**params)
+            except ClientError as e:
+                if e.status_code in (418, 429):
+                    raise ratelimit.RateLimitError(
+                        e.status_code, ratelimit.parse_retry_after(e.header)
+                    )
+                raise
+            # Spot(show_limit_usage=True) wraps the data with the used-weight headers
+            if isinstance(response, dict):
+                used_weight = response["limit_usage"].get("x-mbx-used-weight-1m")
+                if used_weight is not None:
+                    limiter.observe_used_weight(int(used_weight))
+                return response["data"]
+            return response
+
+        return limiter.call(request, weight=weight)
+
     def fetch(
         self,
         symbol: str,
@@ -185,6 +303,8 @@ class Price_CLI:
         from_: str = None,
         to: str = None,
         merge: str = None,
+        workers: int = 1,
+        backfill: str = None,
     ):
         """
         Fetch Kline/Candlestick data from Binance and export to CSV.
@@ -192,17 +312,346 @@ class Price_CLI:
         Args:
             symbol (str): Symbol to fetch, e.g. BTCUSDT
             interval (str): Interval, e.g. 1d, 1h, 15m
-            path (str): Output CSV file path
+            path (str): Output CSV file path, or a kline store root directory if it does not end with .csv
             chunk (int): Number of chunks to fetch. Each chunk fetches up to 500 candles (Binance API limit).
             from_ (str): Start date (YYYY-MM-DD), required if chunk is not provided.
             to (str): End date (YYYY-MM-DD), required if chunk is not provided.
             merge (str): If "true", merge new data into existing CSV.
+            workers (int): Number of concurrent page requests for "from_"/"to" fetches. 1 fetches serially.
+            backfill (str): If "true", only fetch the parts of the range ("chunk" or "from_"/"to") missing from the output.
+        """
+        # Every page worker reuses its own kept-alive connection
+        client = self.create_client(pool_size=max(workers, 10))
+        self.fetch_with_client(
+            client, symbol, interval, path, chunk, from_, to, merge, workers, backfill
+        )
+        self.print_cache_stats()
+
+    def fetch_many(
+        self,
+        symbols,
+        intervals,
+        path: str = "ignore/{symbol}_{interval}.csv",
+        chunk: int = None,
+        from_: str = None,
+        to: str = None,
+        merge: str = None,
+        workers: int = 4,
+        process: str = None,
+        process_path: str = "ignore/{symbol}_{interval}_ta.csv",
+    ):
         """
-        client = Spot()
+        Fetch every symbol x interval pair in one process with a shared pooled client.
+        Command: python py/price.py fetch_many --symbols=BTCUSDT,ETHUSDT --intervals=1h,4h --merge=true --chunk=30 --process=true
+
+        Args:
+            symbols (str | list): Symbols to fetch, e.g. BTCUSDT,ETHUSDT
+            intervals (str | list): Intervals to fetch, e.g. 1h,2h,4h
+            path (str): Output path template with {symbol} and {interval} placeholders, or a kline store root directory.
+            chunk (int): Number of chunks to fetch per pair.
+            from_ (str): Start date (YYYY-MM-DD), required if chunk is not provided.
+            to (str): End date (YYYY-MM-DD), required if chunk is not provided.
+            merge (str): If "true", merge new data into existing outputs.
+            workers (int): Number of pairs fetched at the same time. Requests still go through the rate limiter.
+            process (str): If "true", apply processors.indicator to each result.
+            process_path (str): Output path template of the processed data.
+        """
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        if isinstance(intervals, str):
+            intervals = intervals.split(",")
+        if process == "true" and not file.is_csv(path):
+            raise ValueError('"process" requires a CSV "path" template.')
+
+        if process == "true":
+            # Imported here so plain fetches do not pay for loading ta
+            from processors import indicator
+
+        jobs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        client = self.create_client(pool_size=workers)
+        print(
+            f"Fetching {len(jobs)} symbol/interval pair(s) with {workers} worker(s)..."
+        )
+
+        def run_job(job):
+            symbol, interval = job
+            output = path.format(symbol=symbol, interval=interval)
+            self.fetch_with_client(
+                client, symbol, interval, output, chunk, from_, to, merge
+            )
+            if process == "true":
+                df = indicator.apply(file.get_source(output))
+                file.write_dataframe(
+                    df, process_path.format(symbol=symbol, interval=interval)
+                )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job): job for job in jobs}
+            failed = []
+            for future, (symbol, interval) in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(f"{symbol}_{interval}")
+                    print(colored(f"Failed to fetch {symbol}_{interval}: {e}", "red"))
+
+        print(f"Fetched {len(jobs) - len(failed)}/{len(jobs)} symbol/interval pair(s).")
+        self.print_cache_stats()
+        if failed:
+            print(colored(f"Failed: {', '.join(failed)}", "red"))
+
+    def resample(
+        self,
+        symbol: str,
+        source_interval: str,
+        interval: str,
+        path: str = "ignore/store",
+        output: str = None,
+    ):
+        """
+        Derive a higher interval from a finer one already fetched, without calling the exchange.
+        Only the candles from the last derived one onwards are rebuilt.
+        Command: python py/price.py resample --symbol=BTCUSDT --source_interval=1h --interval=4h --path=ignore/store
+        Command: python py/price.py resample --symbol=BTCUSDT --source_interval=1h --interval=4h --path=ignore/BTCUSDT_1h.csv --output=ignore/BTCUSDT_4h.csv
+
+        Args:
+            symbol (str): Symbol, e.g. BTCUSDT
+            source_interval (str): Fetched interval, e.g. 1h, 15m
+            interval (str): Interval to derive, e.g. 2h, 4h
+            path (str): Kline store root directory, or the source CSV file path.
+            output (str): Output CSV file path, required when "path" is a CSV file.
+        """
+        if not file.is_csv(path):
+            store = klinestore.KlineStore(file.resolve(path))
+            count = resample.resample_store(store, symbol, source_interval, interval)
+            print(
+                f"Resampled symbol={symbol} {source_interval} -> {interval}, {count} rows updated."
+            )
+            return
+
+        if not output or not file.is_csv(output):
+            raise ValueError('Argument "output" must be a CSV file path.')
+
+        df = file.get_source(path)
+        base = {
+            "open_time": np.rint(df["timestamp"].to_numpy() * 1000).astype(np.int64),
+            "open": df["open"].to_numpy(),
+            "high": df["high"].to_numpy(),
+            "low": df["low"].to_numpy(),
+            "close": df["close"].to_numpy(),
+            "vol": df["vol"].to_numpy(),
+        }
+
+        # Rebuild from the last derived candle, it may have been partial
+        append = os.path.exists(file.resolve(output))
+        if append:
+            last_row, last_offset = file.read_last_record(output)
+            append = last_row is not None
+        if append:
+            last_open_time = int(round(float(last_row["timestamp"]) * 1000))
+            keep = base["open_time"] >= last_open_time
+            base = {c: a[keep] for c, a in base.items()}
+
+        derived = resample.resample(base, source_interval, interval)
+        if append and len(derived["open_time"]) > 0:
+            file.truncate(output, last_offset)
+        self.write_columns_csv(symbol, output, derived, append=append)
+        abs_path = os.path.abspath(output)
+        print(
+            f"Resampled symbol={symbol} {source_interval} -> {interval}, {len(derived['open_time'])} rows updated in {abs_path}."
+        )
+
+    def fetch_bars(
+        self,
+        symbol: str,
+        kind: str = "volume",
+        threshold: float = None,
+        from_: str = None,
+        to: str = None,
+        source: str = None,
+        path: str = "ignore/store",
+        flush_bars: int = 10000,
+    ):
+        """
+        Build tick, volume or dollar bars from aggregated trades, fetched from Binance
+        or read from a recorded aggTrades CSV file, and write them incrementally.
+        Bars are stored under the interval name <kind>_<threshold>, e.g. volume_1000.
+        The kline store keys rows by open time, so bars opening in the same millisecond
+        are merged into one.
+        Command: python py/price.py fetch_bars --symbol=BTCUSDT --kind=volume --threshold=1000 --from_=2025-01-01 --to=2025-01-02
+        Command: python py/price.py fetch_bars --symbol=BTCUSDT --kind=dollar --threshold=10000000 --source=ignore/BTCUSDT-aggTrades-2025-01-01.csv
+
+        Args:
+            symbol (str): Symbol, e.g. BTCUSDT
+            kind (str): Bar kind: tick, volume (base asset) or dollar (quote asset).
+            threshold (float): Trades, base volume or quote volume per bar.
+            from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS), when fetching from Binance.
+            to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS), when fetching from Binance.
+            source (str): Recorded aggTrades CSV file, used instead of the API.
+            path (str): Kline store root directory, or output CSV file path.
+            flush_bars (int): Number of completed bars buffered before each write.
+        """
+        if threshold is None:
+            raise ValueError('Argument "threshold" is required.')
+        aggregator = bars.BarAggregator(kind, threshold)
+        interval = bars.bar_interval(kind, threshold)
+
+        if source:
+            batches = bars.read_trade_file(file.resolve(source))
+        elif from_ and to:
+            client = self.create_client()
+            batches = self.iter_agg_trade_batches(client, symbol, from_, to)
+        else:
+            raise ValueError('Either "source" or "from_" and "to" are required.')
+
+        if file.is_csv(path):
+            # The file is rebuilt from the first bar
+            self.coverage_path(symbol, None, path).unlink(missing_ok=True)
+            file.resolve(path).unlink(missing_ok=True)
+
+        pending = []
+        pending_count = 0
+        written = 0
+
+        def write_pending():
+            if not pending_count:
+                return 0
+            data = {c: np.concatenate([p[c] for p in pending]) for c in pending[0]}
+            pending.clear()
+            data = klinestore.scale_prices(symbol, data)
+            if file.is_csv(path):
+                self.write_columns_csv(symbol, path, data, append=True)
+                return len(data["open_time"])
+            store = klinestore.KlineStore(file.resolve(path))
+            return store.append(symbol, interval, data)
+
+        for time, price, qty in batches:
+            completed = aggregator.add(time, price, qty)
+            if len(completed["open_time"]):
+                pending.append(completed)
+                pending_count += len(completed["open_time"])
+            if pending_count >= flush_bars:
+                written += write_pending()
+                pending_count = 0
+        # A recorded file is complete, its last partial bar is kept too
+        pending.append(aggregator.flush(partial=bool(source)))
+        pending_count += len(pending[-1]["open_time"])
+        written += write_pending()
+
+        abs_path = os.path.abspath(path)
+        print(
+            f"Aggregated {aggregator.trades} trade(s) of symbol={symbol} into {written} {interval} bar(s) in {abs_path}."
+        )
+
+    def iter_agg_trade_batches(self, client: Spot, symbol: str, from_: str, to: str):
+        """
+        Page through the aggregated trades of a date range, oldest first.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol, e.g. BTCUSDT
+            from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+
+        Yields:
+            tuple: (time, price, qty) arrays, one page at a time.
+        """
+        start_time, end_time = self.calc_end_time_from_to("1m", from_, to)[3:]
+        params = {"startTime": start_time}
+        while True:
+            trades = self.request_limited(
+                client.agg_trades,
+                self.agg_trades_weight,
+                symbol=symbol,
+                limit=self.agg_trades_limit,
+                **params,
+            )
+            if not trades:
+                break
+            time, price, qty = bars.agg_trades_to_arrays(trades)
+            keep = time <= end_time
+            yield time[keep], price[keep], qty[keep]
+            if not keep.all() or len(trades) < self.agg_trades_limit:
+                break
+            # Later pages continue from the last trade id
+            params = {"fromId": trades[-1]["a"] + 1}
+
+    def print_cache_stats(self):
+        """
+        Print the kline cache hit/miss counters of this process.
+        """
+        if not self.use_cache:
+            return
+        stats = klinecache.get_cache().stats()
+        print(
+            f"Kline cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['bytes'] / 1024**2:.1f} MB."
+        )
+
+    def create_client(self, pool_size: int = 10) -> Spot:
+        """
+        Create a Binance Spot client that reports used weight and keeps enough pooled connections.
+        The pool is sized here once: the client may be shared by worker threads, so
+        fetch methods must not mount new adapters on it.
+
+        Args:
+            pool_size (int): Maximum number of kept-alive connections, at least the
+                number of threads sending requests with the client.
+
+        Returns:
+            Spot: Binance Spot client.
+        """
+        client = Spot(base_url=self.base_url, show_limit_usage=True)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        client.session.mount("https://", adapter)
+        client.session.mount("http://", adapter)
+        return client
+
+    def fetch_with_client(
+        self,
+        client: Spot,
+        symbol: str,
+        interval: str,
+        path: str,
+        chunk: int = None,
+        from_: str = None,
+        to: str = None,
+        merge: str = None,
+        workers: int = 1,
+        backfill: str = None,
+    ):
+        """
+        Run the fetch mode selected by the arguments with an existing client.
+        Arguments are the same as `fetch`.
+        """
+        if backfill == "true":
+            if chunk is not None:
+                # The last `chunk` pages up to now, as a date range
+                candle_ms = klinestore.INTERVAL_MS_MAP.get(
+                    interval, 24 * 60 * 60 * 1000
+                )
+                now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+                from_ms = (now_ms - chunk * self.limit * candle_ms) // candle_ms
+                from_dt = datetime.fromtimestamp(
+                    from_ms * candle_ms / 1000, timezone.utc
+                )
+                now_dt = datetime.fromtimestamp(now_ms / 1000, timezone.utc)
+                from_ = from_dt.strftime("%Y-%m-%d %H:%M:%S")
+                to = now_dt.strftime("%Y-%m-%d %H:%M:%S")
+            if not (from_ and to):
+                raise ValueError(
+                    '"backfill" requires "chunk", or both "from_" and "to".'
+                )
+            self.fetch_missing(client, symbol, interval, path, from_, to, workers)
+            print(f"Successfully fetched {symbol}_{interval}")
+            return
 
         if merge == "true":
             resolved_path = file.resolve(path)
-            if os.path.exists(resolved_path):
+            if file.is_csv(path):
+                exists = os.path.exists(resolved_path)
+            else:
+                exists = klinestore.KlineStore(resolved_path).exists(symbol, interval)
+            if exists:
                 self.fetch_and_merge(client, symbol, interval, path)
                 print(f"Successfully fetched {symbol}_{interval}")
                 return
@@ -212,6 +661,13 @@ class Price_CLI:
             print(f"Successfully fetched {symbol}_{interval}")
             return
 
+        if from_ and to and workers > 1:
+            self.fetch_by_from_to_parallel(
+                client, symbol, interval, path, from_, to, workers
+            )
+            print(f"Successfully fetched {symbol}_{interval}")
+            return
+
         if from_ and to:
             self.fetch_by_from_to(client, symbol, interval, path, from_, to)
             print(f"Successfully fetched {symbol}_{interval}")
@@ -233,13 +689,20 @@ class Price_CLI:
         """
         limit = self.limit
         resolved_path = file.resolve(path)
-        with open(resolved_path, "r", newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            rows = list(reader)
-        if not rows:
-            return  # No data, nothing to merge, fallback to normal fetch
-        last_row = rows[-1]
-        last_start_str = last_row["start"]
+        if file.is_csv(path):
+            last_row, last_offset = file.read_last_record(resolved_path)
+            if last_row is None:
+                return  # No data, nothing to merge, fallback to normal fetch
+            last_start_str = last_row["start"]
+        else:
+            store = klinestore.KlineStore(resolved_path)
+            last_open_time = store.last_open_time(symbol, interval)
+            if last_open_time is None:
+                return
+            last_start_dt = datetime.fromtimestamp(
+                last_open_time / 1000, tz=timezone.utc
+            )
+            last_start_str = last_start_dt.strftime("%Y-%m-%d %H:%M:%S")
         now_dt = datetime.now(timezone.utc)
         now_str = now_dt.strftime("%Y-%m-%d %H:%M:%S")
         candle_ms, est_candles, est_chunks, fetch_start, fetch_end = (
@@ -250,7 +713,8 @@ class Price_CLI:
         )
         new_klines = []
         while True:
-            klines = client.klines(
+            klines = self.request_klines(
+                client,
                 symbol=symbol,
                 interval=interval,
                 limit=limit,
@@ -269,23 +733,15 @@ class Price_CLI:
             fetch_end = klines[0][0] - 1
 
         if new_klines:
-            last_start_dt = datetime.strptime(last_start_str, "%Y-%m-%d %H:%M:%S")
-            last_start_time = int(
-                last_start_dt.replace(tzinfo=timezone.utc).timestamp() * 1000
-            )
-            # Remove last row if it has the same start time as the first new kline
-            dup_rows = [k for k in new_klines if k[0] == last_start_time]
-            if dup_rows:
-                rows.pop()
-                with open(resolved_path, "w", newline="") as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
-                    writer.writeheader()
-                    writer.writerows(rows)
-
-            self.write_klines_csv(symbol, path, new_klines, append=True)
+            # Drop the stored last candle in place if it is fetched again (it may have been still open)
+            # The kline store replaces rows with the same open time by itself
+            if file.is_csv(path) and new_klines[0][0] == fetch_start:
+                file.truncate(resolved_path, last_offset)
+
+            self.write_klines(symbol, interval, path, new_klines, append=True)
             abs_path = os.path.abspath(path)
             print(
-                f"Merged symbol={symbol} with {len(rows) + len(new_klines)} rows to {abs_path}."
+                f"Merged symbol={symbol} with {len(new_klines)} new rows to {abs_path}."
             )
         else:
             print("No new data to merge.")
@@ -303,23 +759,34 @@ class Price_CLI:
             path (str): Output CSV file path
             chunk (int): Number of chunks to fetch
         """
+        pages = self.iter_chunk_pages(client, symbol, interval, chunk)
+        rows = self.write_pages(symbol, interval, path, pages)
+        abs_path = os.path.abspath(path)
+        print(f"Exported symbol={symbol} with {rows} rows to {abs_path}.")
+
+    def iter_chunk_pages(self, client: Spot, symbol: str, interval: str, chunk: int):
+        """
+        Yield up to `chunk` pages of klines ending now, newest page first.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            chunk (int): Number of chunks to fetch
+        """
         limit = self.limit
-        all_klines = []
         end_time = int(datetime.now().timestamp() * 1000)
         print(
             f"Fetching {chunk} chunk(s) of {limit} candles each (up to {chunk * limit} candles)..."
         )
         for i in range(chunk):
-            klines = client.klines(
-                symbol=symbol, interval=interval, limit=limit, endTime=end_time
+            klines = self.request_klines(
+                client, symbol=symbol, interval=interval, limit=limit, endTime=end_time
             )
             if not klines:
                 break
-            all_klines = klines + all_klines
             end_time = klines[0][0] - 1
-        self.write_klines_csv(symbol, path, all_klines)
-        abs_path = os.path.abspath(path)
-        print(f"Exported symbol={symbol} with {len(all_klines)} rows to {abs_path}.")
+            yield klines
 
     def fetch_by_from_to(
         self, client: Spot, symbol: str, interval: str, path: str, from_: str, to: str
@@ -335,8 +802,25 @@ class Price_CLI:
             from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
             to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
         """
+        pages = self.iter_from_to_pages(client, symbol, interval, from_, to)
+        rows = self.write_pages(symbol, interval, path, pages)
+        abs_path = os.path.abspath(path)
+        print(f"Exported symbol={symbol} with {rows} rows to {abs_path}.")
+
+    def iter_from_to_pages(
+        self, client: Spot, symbol: str, interval: str, from_: str, to: str
+    ):
+        """
+        Yield the pages of klines of a date range, newest page first.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+        """
         limit = self.limit
-        all_klines = []
         candle_ms, est_candles, est_chunks, start_time, end_time = (
             self.calc_end_time_from_to(interval, from_, to)
         )
@@ -345,22 +829,348 @@ class Price_CLI:
         )
         fetch_end = end_time
         while True:
-            klines = client.klines(
-                symbol=symbol, interval=interval, limit=limit, endTime=fetch_end
+            klines = self.request_klines(
+                client,
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                endTime=fetch_end,
             )
             if not klines:
                 break
             filtered_klines = [k for k in klines if k[0] >= start_time]
             if not filtered_klines:
                 break
-            all_klines = filtered_klines + all_klines
+            yield filtered_klines
             if klines[0][0] <= start_time:
                 break
             fetch_end = klines[0][0] - 1
-        self.write_klines_csv(symbol, path, all_klines)
+
+    def fetch_by_from_to_parallel(
+        self,
+        client: Spot,
+        symbol: str,
+        interval: str,
+        path: str,
+        from_: str,
+        to: str,
+        workers: int = 8,
+    ):
+        """
+        Fetch Kline/Candlestick data by date range with concurrent page requests and export to CSV.
+        All page windows are computed up front, fetched through a bounded worker pool,
+        then assembled in chronological order.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            path (str): Output CSV file path
+            from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            workers (int): Maximum number of pages fetched at the same time
+        """
+        limit = self.limit
+        windows = self.calc_page_windows(interval, from_, to)
+        print(
+            f"Fetching {len(windows)} chunk(s) of {limit} candles each with {workers} worker(s) for interval '{interval}' from {from_} to {to}..."
+        )
+
+        all_klines = self.fetch_windows(client, symbol, interval, windows, workers)
+        self.write_klines(symbol, interval, path, all_klines)
         abs_path = os.path.abspath(path)
         print(f"Exported symbol={symbol} with {len(all_klines)} rows to {abs_path}.")
 
+    def fetch_windows(
+        self,
+        client: Spot,
+        symbol: str,
+        interval: str,
+        windows: list,
+        workers: int = 1,
+    ) -> list:
+        """
+        Fetch page windows concurrently and assemble them in order.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            windows (list): (start_time, end_time) tuples in milliseconds, oldest first
+            workers (int): Maximum number of pages fetched at the same time
+
+        Returns:
+            list: Kline data of every window, oldest first.
+        """
+        limit = self.limit
+
+        def fetch_page(window):
+            page_start, page_end = window
+            return self.request_klines(
+                client,
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                startTime=page_start,
+                endTime=page_end,
+            )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetch_page, windows))
+
+        return [kline for page in pages for kline in page]
+
+    def coverage_path(self, symbol: str, interval: str, path: str) -> Path:
+        """
+        Get the coverage index file of a CSV file or of a kline store dataset.
+        """
+        resolved_path = file.resolve(path)
+        if file.is_csv(path):
+            return resolved_path.with_name(resolved_path.name + ".coverage.json")
+        store = klinestore.KlineStore(resolved_path)
+        return store.dataset_path(symbol, interval) / "coverage.json"
+
+    def load_coverage(
+        self, symbol: str, interval: str, path: str
+    ) -> coverage.CoverageIndex:
+        """
+        Load the coverage index of an output. Without an index file, it is built from
+        the open times already stored, so holes in existing data show up as missing.
+        Candles that may still have been open when they were written are left out.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            path (str): Output CSV file path, or a kline store root directory.
+
+        Returns:
+            coverage.CoverageIndex: The coverage index.
+        """
+        index_path = self.coverage_path(symbol, interval, path)
+        candle_ms = klinestore.INTERVAL_MS_MAP.get(interval, 24 * 60 * 60 * 1000)
+        if index_path.exists():
+            return coverage.CoverageIndex.load(index_path, candle_ms)
+
+        resolved_path = file.resolve(path)
+        open_times = np.empty(0, dtype=np.int64)
+        written_path = None
+        if file.is_csv(path) and os.path.exists(resolved_path):
+            timestamps = pandas.read_csv(resolved_path, usecols=["timestamp"])
+            open_times = np.sort(
+                np.rint(timestamps["timestamp"].to_numpy() * 1000).astype(np.int64)
+            )
+            written_path = resolved_path
+        elif not file.is_csv(path):
+            store = klinestore.KlineStore(resolved_path)
+            partitions = store.partitions(symbol, interval)
+            if partitions:
+                open_times = store.read(symbol, interval, columns=["open_time"])[
+                    "open_time"
+                ]
+                dataset = store.dataset_path(symbol, interval)
+                written_path = dataset / partitions[-1] / "close_time.npy"
+        if written_path is not None:
+            # The fetch time is not stored, the last write is the latest it can be:
+            # candles closing at or after it are fetched again
+            written_ms = os.path.getmtime(written_path) * 1000
+            open_times = open_times[open_times + candle_ms - 1 < written_ms]
+        return coverage.CoverageIndex.from_open_times(index_path, candle_ms, open_times)
+
+    def fetch_missing(
+        self,
+        client: Spot,
+        symbol: str,
+        interval: str,
+        path: str,
+        from_: str,
+        to: str,
+        workers: int = 1,
+    ):
+        """
+        Fetch only the parts of a date range that the coverage index does not have yet,
+        then merge them into the output and record them as covered.
+
+        Args:
+            client (Spot): Binance Spot client
+            symbol (str): Symbol to fetch, e.g. BTCUSDT
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            path (str): Output CSV file path, or a kline store root directory.
+            from_ (str): Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            to (str): End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+            workers (int): Maximum number of pages fetched at the same time
+        """
+        candle_ms, est_candles, est_chunks, start_time, end_time = (
+            self.calc_end_time_from_to(interval, from_, to)
+        )
+        index = self.load_coverage(symbol, interval, path)
+        gaps = index.missing(start_time, end_time)
+        windows = [
+            window
+            for gap_start, gap_end in gaps
+            for window in self.split_page_windows(candle_ms, gap_start, gap_end)
+        ]
+        print(
+            f"Backfilling {len(gaps)} missing range(s) in {len(windows)} chunk(s) of {self.limit} candles each (requested {est_chunks}) for interval '{interval}' from {from_} to {to}..."
+        )
+        if not windows:
+            print("Requested range is already covered.")
+            return
+
+        new_klines = self.fetch_windows(client, symbol, interval, windows, workers)
+        if file.is_csv(path):
+            self.merge_klines_csv(symbol, path, new_klines)
+        else:
+            self.write_klines_store(symbol, interval, path, new_klines)
+
+        # A candle that is still open can change, so it is never marked as covered
+        last_closed = int(datetime.now(timezone.utc).timestamp() * 1000) - candle_ms
+        for gap_start, gap_end in gaps:
+            index.add(gap_start, min(gap_end, last_closed))
+        index.save()
+        abs_path = os.path.abspath(path)
+        print(f"Backfilled symbol={symbol} with {len(new_klines)} rows to {abs_path}.")
+
+    def merge_klines_csv(self, symbol: str, path: str, all_klines: list):
+        """
+        Merge klines into an existing CSV, keeping rows sorted and unique by open time.
+        Klines from the last stored open time onwards are appended to the tail like
+        in `fetch_and_merge`, others make the file be rewritten.
+
+        Args:
+            symbol (str): Symbol name.
+            path (str): Output CSV file path.
+            all_klines (list): List of kline data.
+        """
+        resolved_path = file.resolve(path)
+        if not os.path.exists(resolved_path):
+            self.write_klines_csv(symbol, path, all_klines)
+            return
+
+        columns = klinestore.keep_last(self.klines_to_columns(symbol, all_klines))
+        if not len(columns["open_time"]):
+            return
+        last_row, last_offset = file.read_last_record(resolved_path)
+        last_open_time = (
+            None if last_row is None else round(float(last_row["timestamp"]) * 1000)
+        )
+        if last_open_time is None or columns["open_time"][0] >= last_open_time:
+            # Replace the stored last candle in place if it is fetched again
+            if columns["open_time"][0] == last_open_time:
+                file.truncate(resolved_path, last_offset)
+            self.write_columns_csv(symbol, path, columns, append=True)
+            return
+
+        existing = pandas.read_csv(resolved_path)
+        new = klinestore.to_frame(symbol, columns).astype({"symbol": str})
+        merged = pandas.concat([existing, new], ignore_index=True)
+        merged = merged.drop_duplicates("timestamp", keep="last")
+        merged = merged.sort_values("timestamp")
+
+        tmp_path = resolved_path.with_name(resolved_path.name + ".tmp")
+        merged.to_csv(tmp_path, index=False, lineterminator="\r\n")
+        os.replace(tmp_path, resolved_path)
+
+    def write_klines(
+        self,
+        symbol: str,
+        interval: str,
+        path: str,
+        all_klines: list,
+        append: bool = False,
+    ):
+        """
+        Write kline/candlestick data to a CSV file or to a kline store.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            path (str): Output CSV file path, or a kline store root directory.
+            all_klines (list): List of kline data.
+            append (bool): If True, append to file. If False, overwrite. The store always appends.
+        """
+        if file.is_csv(path):
+            self.write_klines_csv(symbol, path, all_klines, append=append)
+        else:
+            self.write_klines_store(symbol, interval, path, all_klines)
+
+    def write_pages(self, symbol: str, interval: str, path: str, pages) -> int:
+        """
+        Write pages of klines produced newest first, one page at a time, so memory
+        stays bounded by a page however many pages are fetched.
+        A CSV file is replaced, a kline store is appended to.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            path (str): Output CSV file path, or kline store root directory.
+            pages (iterable): Lists of kline data, newest page first.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows = 0
+        if not file.is_csv(path):
+            store = klinestore.KlineStore(file.resolve(path))
+            for page in pages:
+                rows += store.append(
+                    symbol, interval, self.klines_to_columns(symbol, page)
+                )
+            return rows
+
+        def blocks():
+            nonlocal rows
+            for page in pages:
+                rows += len(page)
+                columns = self.klines_to_columns(symbol, page)
+                yield self.format_columns_csv(symbol, columns)
+
+        header = ",".join(KLINE_CSV_HEADERS) + "\r\n"
+        if file.write_pages_reversed(path, blocks(), header):
+            # The file is replaced, so the coverage recorded for it no longer applies
+            self.coverage_path(symbol, None, path).unlink(missing_ok=True)
+        return rows
+
+    def write_klines_store(
+        self, symbol: str, interval: str, path: str, all_klines: list
+    ):
+        """
+        Append kline/candlestick data to a columnar kline store.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1d, 1h, 15m
+            path (str): Kline store root directory.
+            all_klines (list): List of kline data.
+        """
+        if not all_klines:
+            return
+        data = self.klines_to_columns(symbol, all_klines)
+        klinestore.KlineStore(file.resolve(path)).append(symbol, interval, data)
+
+    def klines_to_columns(self, symbol: str, all_klines: list) -> dict:
+        """
+        Convert raw klines into numpy column arrays in one batch.
+        Prices are scaled with klinestore.scale_prices, e.g. PEPEUSDT by 1000.
+
+        Args:
+            symbol (str): Symbol name.
+            all_klines (list): List of kline data.
+
+        Returns:
+            dict: Column name to numpy array, with the columns of the kline store.
+        """
+        columns = list(zip(*all_klines)) or [()] * 7
+        data = {
+            "open_time": np.asarray(columns[0], dtype=np.int64),
+            "close_time": np.asarray(columns[6], dtype=np.int64),
+            "open": np.asarray(columns[1], dtype=np.float64),
+            "high": np.asarray(columns[2], dtype=np.float64),
+            "low": np.asarray(columns[3], dtype=np.float64),
+            "close": np.asarray(columns[4], dtype=np.float64),
+            "vol": np.asarray(columns[5], dtype=np.float64),
+        }
+        return klinestore.scale_prices(symbol, data)
+
     def write_klines_csv(
         self, symbol: str, path: str, all_klines: list, append: bool = False
     ):
@@ -373,54 +1183,67 @@ class Price_CLI:
             all_klines (list): List of kline data.
             append (bool): If True, append to file. If False, overwrite.
         """
-        headers = [
-            "symbol",
-            "timestamp",
-            "date",
-            "start",
-            "end",
-            "open",
-            "high",
-            "low",
-            "close",
-            "vol",
-            "type",
-        ]
+        # Build every column in one pass, then format and write the rows in bulk
+        columns = self.klines_to_columns(symbol, all_klines)
+        self.write_columns_csv(symbol, path, columns, append=append)
+
+    def write_columns_csv(
+        self, symbol: str, path: str, columns: dict, append: bool = False
+    ):
+        """
+        Write kline store columns to CSV in the kline CSV schema.
+
+        Args:
+            symbol (str): Symbol name.
+            path (str): Output CSV file path.
+            columns (dict): Column name to numpy array, with the columns of the kline store.
+            append (bool): If True, append to file. If False, overwrite.
+        """
         resolved_path = file.resolve(path)
         mode = "a" if append else "w"
         write_header = not append or not os.path.exists(resolved_path)
-        # vnt_tz = timezone(timedelta(hours=7, minutes=0))
+        if not append:
+            # The file is replaced, so the coverage recorded for it no longer applies
+            self.coverage_path(symbol, None, path).unlink(missing_ok=True)
 
-        mul = 1000 if symbol == "PEPEUSDT" else 1
+        text = self.format_columns_csv(symbol, columns)
 
         with open(resolved_path, mode, newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
             if write_header:
-                writer.writeheader()
-            for row in all_klines:
-                open_time = datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc)
-                close_time = datetime.fromtimestamp(row[6] / 1000, tz=timezone.utc)
-                open_price = float(row[1]) * mul
-                high_price = float(row[2]) * mul
-                low_price = float(row[3]) * mul
-                close_price = float(row[4]) * mul
-                vol = float(row[5])
-                candle_type = 1 if close_price > open_price else 0
-                writer.writerow(
-                    {
-                        "symbol": symbol,
-                        "timestamp": open_time.timestamp(),
-                        "date": open_time.strftime("%Y-%m-%d"),
-                        "start": open_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "end": close_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "open": open_price,
-                        "high": high_price,
-                        "low": low_price,
-                        "close": close_price,
-                        "vol": vol,
-                        "type": candle_type,
-                    }
-                )
+                csvfile.write(",".join(KLINE_CSV_HEADERS) + "\r\n")
+            csvfile.write(text)
+            if append:
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+
+    def format_columns_csv(self, symbol: str, columns: dict) -> str:
+        """
+        Format kline store columns as CSV rows in the kline CSV schema, without header.
+
+        Args:
+            symbol (str): Symbol name.
+            columns (dict): Column name to numpy array, with the columns of the kline store.
+
+        Returns:
+            str: The rows, each terminated by CRLF.
+        """
+        dates, starts = klinestore.format_times(columns["open_time"])
+        ends = klinestore.format_times(columns["close_time"])[1]
+        candle_type = (columns["close"] > columns["open"]).astype(np.int64)
+        rows = zip(
+            repeat(symbol, len(dates)),
+            map(repr, (columns["open_time"] / 1000).tolist()),
+            dates.tolist(),
+            starts.tolist(),
+            ends.tolist(),
+            map(repr, columns["open"].tolist()),
+            map(repr, columns["high"].tolist()),
+            map(repr, columns["low"].tolist()),
+            map(repr, columns["close"].tolist()),
+            map(repr, columns["vol"].tolist()),
+            map(str, candle_type.tolist()),
+        )
+        return "".join(",".join(row) + "\r\n" for row in rows)
 
 
 if __name__ == "__main__":
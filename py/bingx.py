@@ -1,25 +1,82 @@
-import csv
+import asyncio
 import time
+import aiohttp
+import numpy as np
 import requests
 import json
+import os
+import threading
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from fire import Fire
+from itertools import chain
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    from .util import file, klinecache, klinestore, ratelimit
+except ImportError:
+    from util import file, klinecache, klinestore, ratelimit
 
-def fetch(symbol: str, interval: str, limit: int = 500, endTime: int = None) -> dict:
+APIURL = "https://open-api.bingx.com"
+KLINES_PATH = "/openApi/swap/v3/quote/klines"
+
+# Serve pages of closed candles from the kline cache
+USE_CACHE = True
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (5, 15)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = 10, retries: int = 3) -> requests.Session:
     """
-    Fetch Kline/Candlestick data from BingX API.
+    Create a keep-alive session for the BingX API.
     Parameters:
-    - symbol (str): Trading pair symbol (e.g., "XAUT-USDT").
-    - interval (str): Time interval for each candlestick (e.g., "1m", "5m", "1h", "1d").
-    - limit (int): Number of candlesticks to retrieve (default is 500, max is 500).
-    - endTime (int): End time in milliseconds since epoch (optional).
+    - pool_size (int): Maximum number of pooled connections.
+    - retries (int): Retries of failed connections and 5xx answers, with exponential backoff.
+      429/418 answers are left to the rate limiter.
     Returns:
-    - dict: Parsed JSON response from the API containing candlestick data.
+    - requests.Session: The session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+        # Otherwise any 429 with Retry-After is retried here, behind the limiter's back
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide BingX session, creating it on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
 
+def build_klines_url(
+    symbol: str, interval: str, limit: int, endTime: int = None
+) -> str:
+    """
+    Build the klines request URL with a fresh timestamp.
     """
-    APIURL = "https://open-api.bingx.com"
     paramsMap = {
         "symbol": symbol,
         "interval": interval,
@@ -34,12 +91,109 @@ def fetch(symbol: str, interval: str, limit: int = 500, endTime: int = None) ->
     else:
         paramsStr = "timestamp=" + str(int(time.time() * 1000))
 
-    # Make request
-    path = "/openApi/swap/v3/quote/klines"
-    url = "%s%s?%s" % (APIURL, path, paramsStr)
-    response = requests.get(url)
+    return "%s%s?%s" % (APIURL, KLINES_PATH, paramsStr)
+
+
+def get_cached_page(symbol: str, interval: str, limit: int, endTime: int = None):
+    """
+    Get a page from the kline cache. Pages without endTime are never cached.
+    """
+    if endTime is None or not USE_CACHE:
+        return None
+    window = {"limit": limit, "endTime": endTime}
+    return klinecache.get_cache().get("bingx", symbol, interval, window)
+
 
-    return json.loads(response.text)
+def cache_page(symbol: str, interval: str, limit: int, endTime: int, result: dict):
+    """
+    Store a page in the kline cache if it ended in the past and holds no open candle.
+    """
+    if not USE_CACHE:
+        return
+    now_ms = klinecache.now_ms()
+    klines = result.get("data")
+    if endTime is not None and endTime < now_ms and type(klines) is list:
+        candle_ms = INTERVAL_MS_MAP.get(interval, 0)
+        if all(int(k["time"]) + candle_ms <= now_ms for k in klines):
+            window = {"limit": limit, "endTime": endTime}
+            klinecache.get_cache().put("bingx", symbol, interval, window, result)
+
+
+def fetch(
+    symbol: str,
+    interval: str,
+    limit: int = 500,
+    endTime: int = None,
+    session: requests.Session = None,
+) -> dict:
+    """
+    Fetch Kline/Candlestick data from BingX API.
+    Parameters:
+    - symbol (str): Trading pair symbol (e.g., "XAUT-USDT").
+    - interval (str): Time interval for each candlestick (e.g., "1m", "5m", "1h", "1d").
+    - limit (int): Number of candlesticks to retrieve (default is 500, max is 500).
+    - endTime (int): End time in milliseconds since epoch (optional).
+    - session (requests.Session): Session to send the request with (default is the shared session).
+    Returns:
+    - dict: Parsed JSON response from the API containing candlestick data.
+
+    """
+    # Pages ending in the past only hold closed candles and are served from the cache
+    cached = get_cached_page(symbol, interval, limit, endTime)
+    if cached is not None:
+        return cached
+
+    session = session or get_session()
+
+    def request():
+        # Make request
+        url = build_klines_url(symbol, interval, limit, endTime)
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+        if response.status_code in (418, 429):
+            raise ratelimit.RateLimitError(
+                response.status_code, ratelimit.parse_retry_after(response.headers)
+            )
+        return response
+
+    response = ratelimit.get_limiter("bingx").call(request)
+    # Decode straight from the body bytes
+    result = json.loads(response.content)
+    cache_page(symbol, interval, limit, endTime, result)
+
+    return result
+
+
+async def fetch_async(
+    http: aiohttp.ClientSession,
+    symbol: str,
+    interval: str,
+    limit: int = 500,
+    endTime: int = None,
+) -> dict:
+    """
+    Fetch Kline/Candlestick data from BingX API with an aiohttp session.
+    Parameters are the same as `fetch`, with the aiohttp session as first argument.
+    Returns:
+    - dict: Parsed JSON response from the API containing candlestick data.
+    """
+    cached = get_cached_page(symbol, interval, limit, endTime)
+    if cached is not None:
+        return cached
+
+    async def request():
+        url = build_klines_url(symbol, interval, limit, endTime)
+        async with http.get(url) as response:
+            if response.status in (418, 429):
+                raise ratelimit.RateLimitError(
+                    response.status, ratelimit.parse_retry_after(response.headers)
+                )
+            return await response.read()
+
+    body = await ratelimit.get_limiter("bingx").call_async(request)
+    result = json.loads(body)
+    cache_page(symbol, interval, limit, endTime, result)
+
+    return result
 
 
 INTERVAL_MS_MAP = {
@@ -61,6 +215,21 @@ INTERVAL_MS_MAP = {
 }
 
 
+# Columns of the normalized CSV output
+CSV_FIELDS = [
+    "symbol",
+    "timestamp",
+    "date",
+    "start",
+    "end",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+]
+
+
 class KlineCollection:
     def __init__(self, symbol: str, interval: str, raw_data, connector_type: str):
         self.symbol = symbol
@@ -71,108 +240,420 @@ class KlineCollection:
 
 
 class Connector(ABC):
+    connector_type = None
 
     def __init__(self):
         self.max_limit = 500
 
     @abstractmethod
-    def fetch_by_chunk(self, symbol: str, interval: str, chunk: int):
+    def iter_pages(self, symbol: str, interval: str, chunk: int):
+        """
+        Yield pages of raw candles, newest page first. Candles inside a page are
+        sorted by open time and no page repeats a candle of a newer page, so
+        writers can consume the pages one at a time.
+        """
         pass
 
+    async def aiter_pages(self, symbol: str, interval: str, chunk: int):
+        """
+        Async counterpart of `iter_pages`, with the same page order.
+        """
+        for page in self.iter_pages(symbol, interval, chunk):
+            yield page
 
-class BingXConnector(Connector):
     def fetch_by_chunk(self, symbol: str, interval: str, chunk: int) -> KlineCollection:
+        # Join the pages once at the end instead of prepending each of them
+        pages = list(self.iter_pages(symbol, interval, chunk))
+        all_klines = list(chain.from_iterable(reversed(pages)))
+        return KlineCollection(symbol, interval, all_klines, self.connector_type)
+
+
+class BingXConnector(Connector):
+    connector_type = "bingx"
+
+    def __init__(self, session: requests.Session = None):
+        super().__init__()
+        self.session = session or get_session()
+
+    def iter_pages(self, symbol: str, interval: str, chunk: int = None):
+        """
+        Yield pages of raw candles, newest page first. Each page ends just before
+        the oldest candle of the newer one.
+
+        Args:
+            chunk (int): Number of pages, or None to page back until the caller
+                stops or the history ends.
+        """
         limit = self.max_limit
-        all_klines = []
         end_time = int(datetime.now().timestamp() * 1000)
-        print(
-            f"Fetching {chunk} chunk(s) of {limit} candles each (up to {chunk * limit} candles)..."
-        )
-        for i in range(chunk):
+        if chunk is None:
+            print(f"Fetching pages of {limit} candles each...")
+        else:
+            print(
+                f"Fetching {chunk} chunk(s) of {limit} candles each (up to {chunk * limit} candles)..."
+            )
+        oldest_time = None
+        pages = 0
+        while chunk is None or pages < chunk:
             result = fetch(
-                symbol=symbol, interval=interval, limit=limit, endTime=end_time
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                endTime=end_time,
+                session=self.session,
             )
             klines = result["data"]
             if type(klines) is not list or len(klines) == 0:
                 break
-            klines.reverse()
+            # Drop the boundary candles already yielded with the newer page
+            if oldest_time is not None:
+                klines = [k for k in klines if k["time"] < oldest_time]
+            klines.sort(key=lambda k: k["time"])
+            if not klines:
+                break
+
+            oldest_time = klines[0]["time"]
+            end_time = oldest_time - 1
+            pages += 1
+            yield klines
+
+
+class AsyncBingXConnector(Connector):
+    """
+    BingX connector that requests the pages of a chunked fetch concurrently.
+    Page end times are computed up front from the candle width and at most
+    `concurrency` pages are in flight or waiting to be consumed at any time.
+    """
+
+    connector_type = "bingx"
+
+    def __init__(self, concurrency: int = 8):
+        super().__init__()
+        self.concurrency = concurrency
+
+    def iter_pages(self, symbol: str, interval: str, chunk: int):
+        # Drive the async generator from a private event loop, one page at a time
+        loop = asyncio.new_event_loop()
+        pages = self.aiter_pages(symbol, interval, chunk)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(pages.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.close()
+
+    async def aiter_pages(self, symbol: str, interval: str, chunk: int):
+        limit = self.max_limit
+        candle_ms = INTERVAL_MS_MAP[interval]
+        now = int(datetime.now().timestamp() * 1000)
+        end_times = iter([now - i * limit * candle_ms for i in range(chunk)])
+        print(
+            f"Fetching {chunk} chunk(s) of {limit} candles each (up to {chunk * limit} candles) concurrently..."
+        )
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1]
+        )
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
 
-            if i > 0:
-                klines = klines[0 : len(klines) - 1]
+            def schedule(tasks):
+                end_time = next(end_times, None)
+                if end_time is not None:
+                    tasks.append(
+                        asyncio.ensure_future(
+                            fetch_async(http, symbol, interval, limit, end_time)
+                        )
+                    )
 
-            all_klines = klines + all_klines
-            end_time = klines[0]["time"] - 1
+            tasks = deque()
+            for _ in range(self.concurrency):
+                schedule(tasks)
+            oldest_time = None
+            try:
+                while tasks:
+                    result = await tasks.popleft()
+                    schedule(tasks)
+                    klines = result.get("data")
+                    if type(klines) is not list or len(klines) == 0:
+                        break
+                    # Drop the boundary candles already yielded with the newer page
+                    if oldest_time is not None:
+                        klines = [k for k in klines if k["time"] < oldest_time]
+                    klines.sort(key=lambda k: k["time"])
+                    if not klines:
+                        continue
+                    oldest_time = klines[0]["time"]
+                    yield klines
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
-        return KlineCollection(symbol, interval, all_klines, "bingx")
+
+def local_offsets_ms(times_ms) -> np.ndarray:
+    """
+    UTC offset of the local timezone at each timestamp, in milliseconds.
+    The offset is looked up once per distinct UTC day, and per timestamp only on
+    days where it changes (daylight saving transitions).
+    """
+    times = np.asarray(times_ms, dtype=np.int64)
+    day_ms = INTERVAL_MS_MAP["1d"]
+
+    def offset(ms):
+        utcoffset = datetime.fromtimestamp(ms / 1000).astimezone().utcoffset()
+        return int(utcoffset.total_seconds() * 1000)
+
+    days, inverse = np.unique(times // day_ms, return_inverse=True)
+    day_starts = np.array([offset(d * day_ms) for d in days], dtype=np.int64)
+    day_ends = np.array([offset((d + 1) * day_ms - 1) for d in days], dtype=np.int64)
+    offsets = day_starts[inverse]
+    for i in np.flatnonzero(day_starts != day_ends):
+        mask = inverse == i
+        offsets[mask] = [offset(t) for t in times[mask].tolist()]
+    return offsets
 
 
 class ConnectorAdapter:
     def __init__(self, kline_collection: KlineCollection):
         self.kline_collection = kline_collection
 
-    def _normalize_data(self):
-        if self.kline_collection.connector_type == "bingx":
-            return self._normalize_bingx_data()
-        else:
+    def _parse_bingx_data(self) -> dict:
+        # One list per field, then a single bulk conversion per column
+        raw_data = self.kline_collection.raw_data
+        parsed = {"time": np.asarray([c["time"] for c in raw_data], dtype=np.int64)}
+        for field in ("open", "high", "low", "close", "volume"):
+            values = [c[field] for c in raw_data]
+            parsed[field] = np.asarray(values, dtype=np.float64)
+        return parsed
+
+    def to_normalized_columns(self) -> dict:
+        """
+        Convert the raw candles into normalized CSV columns.
+        Times are formatted in local time, like datetime.fromtimestamp.
+
+        Returns:
+        - dict: Field of CSV_FIELDS to numpy array.
+        """
+        if self.kline_collection.connector_type != "bingx":
             raise ValueError("Unsupported connector type")
 
-    def _normalize_bingx_data(self):
-        normalized = []
-        for candle in self.kline_collection.raw_data:
-            timestamp = candle["time"]
-            open_time = datetime.fromtimestamp(timestamp / 1000)
-            end_time = open_time + timedelta(
-                milliseconds=INTERVAL_MS_MAP[self.kline_collection.interval]
-            )
-            normalized.append(
-                {
-                    "symbol": self.kline_collection.symbol,
-                    "timestamp": open_time.timestamp(),
-                    "date": open_time.strftime("%Y-%m-%d"),
-                    "start": open_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "end": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "open": float(candle["open"]),
-                    "high": float(candle["high"]),
-                    "low": float(candle["low"]),
-                    "close": float(candle["close"]),
-                    "volume": float(candle["volume"]),
-                }
-            )
-        return normalized
+        parsed = self._parse_bingx_data()
+        times = parsed["time"]
+        local_times = times + local_offsets_ms(times)
+        candle_ms = INTERVAL_MS_MAP[self.kline_collection.interval]
+        dates, starts = klinestore.format_times(local_times)
+        ends = klinestore.format_times(local_times + candle_ms)[1]
+        return {
+            "symbol": np.full(len(times), self.kline_collection.symbol),
+            "timestamp": times / 1000,
+            "date": dates,
+            "start": starts,
+            "end": ends,
+            "open": parsed["open"],
+            "high": parsed["high"],
+            "low": parsed["low"],
+            "close": parsed["close"],
+            "volume": parsed["volume"],
+        }
 
+    def to_columns(self) -> dict:
+        """
+        Convert the raw candles into the column arrays of the kline store.
+        """
+        if self.kline_collection.connector_type != "bingx":
+            raise ValueError("Unsupported connector type")
 
-def write_csv(filename: str, data: list):
-    if not data or len(data) == 0:
-        print("No data to write.")
-        return
+        parsed = self._parse_bingx_data()
+        candle_ms = INTERVAL_MS_MAP[self.kline_collection.interval]
+        return {
+            "open_time": parsed["time"],
+            "close_time": parsed["time"] + candle_ms - 1,
+            "open": parsed["open"],
+            "high": parsed["high"],
+            "low": parsed["low"],
+            "close": parsed["close"],
+            "vol": parsed["volume"],
+        }
+
+
+def format_csv_rows(columns: dict) -> str:
+    """
+    Format normalized columns as CSV rows, without header.
+    Floats are written with repr, like csv.DictWriter does.
+    """
+    fields = []
+    for field in CSV_FIELDS:
+        values = columns[field]
+        if values.dtype.kind == "f":
+            fields.append(map(repr, values.tolist()))
+        else:
+            fields.append(values.tolist())
+    return "".join(",".join(row) + "\r\n" for row in zip(*fields))
+
+
+def write_csv_pages(filename: str, pages) -> int:
+    """
+    Write pages of normalized columns, newest page first, to CSV in chronological order.
+    Only one page is held in memory at a time.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    rows = 0
 
-    keys = data[0].keys()
-    with open(filename, mode="w", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=keys)
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
+    def blocks():
+        nonlocal rows
+        for columns in pages:
+            rows += len(columns["timestamp"])
+            yield format_csv_rows(columns)
+
+    header = ",".join(CSV_FIELDS) + "\r\n"
+    if not file.write_pages_reversed(filename, blocks(), header):
+        print("No data to write.")
+    return rows
 
 
 # python ./py/bingx.py run --symbol=XAUT-USDT --interval=15m --output=ignore/XAUT-USDT_15m.csv --chunk=1
+# python ./py/bingx.py run --symbol=XAUT-USDT --interval=15m --output=ignore/store --chunk=1
+# python ./py/bingx.py run --symbol=XAUT-USDT --interval=15m --output=ignore/XAUT-USDT_15m.csv --sync=true
 class BingX_CLI:
-    def __init__(self, symbol: str, interval: str, output: str, chunk: int = 1):
+    def __init__(
+        self,
+        symbol: str,
+        interval: str,
+        output: str,
+        chunk: int = 1,
+        sync: str = None,
+    ):
         self.symbol = symbol
         self.interval = interval
         self.output = output
         self.chunk = chunk
+        self.sync = sync
 
-    def run(self):
+    def run(self) -> int:
+        """
+        Fetch candles into the output CSV file or kline store.
+        With `sync` "true", an existing output is only updated with the candles from its
+        last stored open time onwards, otherwise `chunk` pages are fetched and the
+        CSV file is overwritten.
+
+        Returns:
+        - int: Number of rows written or changed, 0 when the output is already up to date.
+        """
         # Create BingX instance and execute fetch
-        print(f"Start connecting BingX with symbol={self.symbol}, interval={self.interval}")
-        bingx = BingXConnector()
-        data = bingx.fetch_by_chunk(
+        print(
+            f"Start connecting BingX with symbol={self.symbol}, interval={self.interval}"
+        )
+        if self.sync == "true":
+            last_open_time = self.last_open_time()
+            if last_open_time is not None:
+                return self.run_sync(last_open_time)
+
+        # Several pages are worth fetching concurrently, a single one is not
+        bingx = AsyncBingXConnector() if self.chunk > 1 else BingXConnector()
+        pages = bingx.iter_pages(
             symbol=self.symbol, interval=self.interval, chunk=self.chunk
         )
-        adapter = ConnectorAdapter(data)
-        normalized_data = adapter._normalize_data()
-        write_csv(self.output, normalized_data)
-        print(f"Data saved to {self.output}")
+        adapters = (
+            ConnectorAdapter(
+                KlineCollection(self.symbol, self.interval, page, bingx.connector_type)
+            )
+            for page in pages
+        )
+        # Pages are written as they arrive, newest first
+        if not self.output.endswith(".csv"):
+            # Any other output is the root directory of a kline store
+            store = klinestore.KlineStore(self.output)
+            rows = sum(
+                store.append(self.symbol, self.interval, adapter.to_columns())
+                for adapter in adapters
+            )
+            print(f"Data saved to kline store {self.output} ({rows} rows)")
+            return rows
+        rows = write_csv_pages(
+            self.output, (adapter.to_normalized_columns() for adapter in adapters)
+        )
+        print(f"Data saved to {self.output} ({rows} rows)")
+        return rows
+
+    def last_open_time(self) -> int:
+        """
+        Get the open time of the last stored candle, or None if there is none.
+        """
+        if not self.output.endswith(".csv"):
+            store = klinestore.KlineStore(self.output)
+            return store.last_open_time(self.symbol, self.interval)
+        if not os.path.exists(self.output):
+            return None
+        record, _ = file.read_last_record(self.output)
+        if record is None:
+            return None
+        return round(float(record["timestamp"]) * 1000)
+
+    def run_sync(self, last_open_time: int) -> int:
+        """
+        Fetch only the candles from `last_open_time` onwards. The last stored
+        candle may have been open when it was written, so it is replaced if it changed.
+
+        Returns:
+        - int: Number of rows changed.
+        """
+        candle_ms = INTERVAL_MS_MAP[self.interval]
+        now = int(datetime.now().timestamp() * 1000)
+        bingx = BingXConnector()
+        # Ask for just the candles since the last stored one when they fit in one page
+        needed = max(0, now - last_open_time) // candle_ms + 1
+        bingx.max_limit = min(bingx.max_limit, needed)
+
+        # Page back until the last stored candle is reached
+        pages = []
+        for page in bingx.iter_pages(self.symbol, self.interval, chunk=None):
+            pages.append([k for k in page if k["time"] >= last_open_time])
+            if page[0]["time"] <= last_open_time:
+                break
+        klines = list(chain.from_iterable(reversed(pages)))
+        adapter = ConnectorAdapter(
+            KlineCollection(self.symbol, self.interval, klines, bingx.connector_type)
+        )
+
+        if self.output.endswith(".csv"):
+            changed = self.sync_csv(adapter, last_open_time)
+        else:
+            changed = self.sync_store(adapter, last_open_time)
+        print(f"Synced {self.output}: {changed} row(s) changed")
+        return changed
+
+    def sync_csv(self, adapter: ConnectorAdapter, last_open_time: int) -> int:
+        raw_data = adapter.kline_collection.raw_data
+        lines = format_csv_rows(adapter.to_normalized_columns()).splitlines(True)
+        _, offset = file.read_last_record(self.output)
+        with open(self.output, "rb") as f:
+            f.seek(offset)
+            last_line = f.read().decode("utf-8")
+
+        if lines and raw_data[0]["time"] == last_open_time:
+            if lines[0] == last_line:
+                lines = lines[1:]
+            else:
+                file.truncate(self.output, offset)
+        if not lines:
+            return 0
+
+        with open(self.output, "a", newline="") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines)
+
+    def sync_store(self, adapter: ConnectorAdapter, last_open_time: int) -> int:
+        # The store overwrites the last stored row in place and counts it only if it changed
+        store = klinestore.KlineStore(self.output)
+        return store.append(self.symbol, self.interval, adapter.to_columns())
 
 
 if __name__ == "__main__":
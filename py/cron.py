@@ -7,6 +7,8 @@ from .bingx import BingX_CLI
 from .util import file
 from .telegrambot import send_telegram_message
 
+RSI_WARMUP_ROWS = 500
+
 
 def notify():
     try:
@@ -26,11 +28,17 @@ def run_job(symbol: str, interval: str):
     df_name = f"{symbol}_{interval}"
 
     output_csv = str(repo_root / "ignore" / f"{df_name}.csv")
-    b_cli = BingX_CLI(symbol=symbol, interval=interval, output=output_csv, chunk=1)
-    b_cli.run()
+    b_cli = BingX_CLI(
+        symbol=symbol, interval=interval, output=output_csv, chunk=1, sync="true"
+    )
+    changed = b_cli.run()
+    if changed == 0:
+        print("[cron]: no new candles - skipped.")
+        return
 
     input_path = output_csv
-    df = file.get_source(input_path)
+    # Enough candles for the RSI smoothing to forget its starting value
+    df = file.read_tail(input_path, RSI_WARMUP_ROWS, usecols=["close"])
     df["rsi"] = ta.momentum.RSIIndicator(df["close"], window=9).rsi()
 
     oversold = 30.0
@@ -0,0 +1,195 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pandas
+from binance.spot import Spot
+from fire import Fire
+from binanceapi import Price_CLI
+from util import depthstore, file, klinecache
+
+BINANCE_API_URL = "https://api.binance.com"
+
+
+def depth_weight(limit: int) -> int:
+    """
+    Request weight of GET /api/v3/depth for a given limit.
+    """
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def parse_date_ms(date: str, end: bool = False) -> int:
+    """
+    Convert a UTC date in format YYYY-MM-DD or YYYY-MM-DD HH:MM:SS to milliseconds.
+
+    Args:
+        date (str): The date.
+        end (bool): If True, a date without time stands for the last millisecond of the day.
+
+    Returns:
+        int: Time in milliseconds.
+    """
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            dt = datetime.strptime(date, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if end and fmt == "%Y-%m-%d":
+            dt += timedelta(days=1, milliseconds=-1)
+        return int(dt.timestamp() * 1000)
+    raise ValueError(
+        'Arguments "from_" and "to" must be in format YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.'
+    )
+
+
+class DepthRecorder:
+    """
+    Poll order-book depth snapshots of several symbols into depth ring files.
+
+    Every `interval` seconds one snapshot per symbol is requested through the
+    shared Binance rate limiter and appended to <path>/<symbol>.depth.
+    """
+
+    def __init__(
+        self,
+        symbols: list,
+        levels: int = 20,
+        path: str = "ignore/depth",
+        base_url: str = BINANCE_API_URL,
+        interval: float = 1.0,
+        capacity: int = 2**20,
+    ):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.levels = levels
+        self.interval = interval
+        self.client = Spot(base_url=base_url, show_limit_usage=True)
+        self.requester = Price_CLI()
+        root = file.resolve(path)
+        self.rings = {
+            symbol: depthstore.DepthRing(
+                depthstore.ring_path(root, symbol), levels, capacity
+            )
+            for symbol in self.symbols
+        }
+
+    def snapshot(self, symbol: str) -> int:
+        """
+        Request and store one snapshot.
+
+        Returns:
+            int: Snapshot time in milliseconds.
+        """
+        book = self.requester.request_limited(
+            self.client.depth,
+            depth_weight(self.levels),
+            symbol=symbol,
+            limit=self.levels,
+        )
+        now = klinecache.now_ms()
+        self.rings[symbol].append(now, book["bids"], book["asks"])
+        return now
+
+    def run(self, max_snapshots: int = None):
+        """
+        Record until interrupted.
+
+        Args:
+            max_snapshots (int): Stop after this many rounds, runs forever if None.
+        """
+        rounds = 0
+        try:
+            while max_snapshots is None or rounds < max_snapshots:
+                started = time.monotonic()
+                for symbol in self.symbols:
+                    self.snapshot(symbol)
+                rounds += 1
+                for ring in self.rings.values():
+                    ring.flush()
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            for ring in self.rings.values():
+                ring.flush()
+
+
+class Depth_CLI:
+    """
+    CLI tool to record Binance order-book depth snapshots and export book features.
+
+    Example usage:
+        python py/depth.py record --symbols=BTCUSDT,ETHUSDT --levels=20 --interval=1 --path=ignore/depth
+        python py/depth.py export --symbol=BTCUSDT --path=ignore/depth --output=ignore/BTCUSDT_depth.csv --levels=5
+        python py/depth.py export --symbol=BTCUSDT --from_=2024-01-01 --to="2024-01-02 12:00:00"
+    """
+
+    def record(
+        self,
+        symbols,
+        levels: int = 20,
+        interval: float = 1.0,
+        path: str = "ignore/depth",
+        base_url: str = BINANCE_API_URL,
+        capacity: int = 2**20,
+        max_snapshots: int = None,
+    ):
+        """
+        Poll depth snapshots into ring files.
+
+        Args:
+            symbols (str | list): Symbols to record, e.g. BTCUSDT,ETHUSDT
+            levels (int): Book levels kept per side.
+            interval (float): Seconds between two snapshots of a symbol.
+            path (str): Directory of the ring files.
+            base_url (str): REST API, e.g. http://localhost:8000 for a local stand-in.
+            capacity (int): Snapshots kept per symbol before the oldest are overwritten.
+            max_snapshots (int): Stop after this many snapshots per symbol.
+        """
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        recorder = DepthRecorder(symbols, levels, path, base_url, interval, capacity)
+        print(f"Recording depth of {len(recorder.symbols)} symbol(s) to {path}")
+        recorder.run(max_snapshots=max_snapshots)
+
+    def export(
+        self,
+        symbol: str,
+        path: str = "ignore/depth",
+        output: str = None,
+        levels: int = None,
+        from_: str = None,
+        to: str = None,
+    ):
+        """
+        Export mid price, spread and book imbalance per snapshot to CSV.
+
+        Args:
+            symbol (str): Symbol, e.g. BTCUSDT
+            path (str): Directory of the ring files.
+            output (str): Output CSV file path.
+            levels (int): Levels per side used for the imbalance, defaults to all.
+            from_ (str): Inclusive start date in UTC (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS).
+            to (str): Inclusive end date in UTC, a date without time includes the whole day.
+        """
+        ring_path = depthstore.ring_path(file.resolve(path), symbol.upper())
+        if not ring_path.exists():
+            raise FileNotFoundError(f"File not found: {ring_path}")
+        start = None if from_ is None else parse_date_ms(from_)
+        end = None if to is None else parse_date_ms(to, end=True)
+        records = depthstore.DepthRing(ring_path).read(start, end)
+        mid, spread = depthstore.mid_and_spread(records)
+        df = pandas.DataFrame(
+            {
+                "time": records["time"],
+                "mid": mid,
+                "spread": spread,
+                "imbalance": depthstore.book_imbalance(records, levels),
+            }
+        )
+        file.write_dataframe(df, output or f"ignore/{symbol.upper()}_depth.csv")
+
+
+if __name__ == "__main__":
+    Fire(Depth_CLI)
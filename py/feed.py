@@ -0,0 +1,70 @@
+import os
+import time
+from fire import Fire
+from util import feed, file
+
+
+class Feed_CLI:
+    """
+    CLI tool to consolidate the klines of one asset from several exchanges into one feed.
+
+    Example usage:
+        python py/feed.py merge --sources=binance=ignore/btc.csv,bingx=ignore/btc_bingx.csv --output=ignore/btc_feed.csv
+        python py/feed.py merge --sources=binance=ignore/store/BTCUSDT/1m,bingx=ignore/bingx/BTC-USDT/1m --output=ignore/btc_feed.csv --all_venues=true
+    """
+
+    def merge(
+        self,
+        sources,
+        output: str,
+        chunk_size: int = 1_000_000,
+        all_venues: str = None,
+    ):
+        """
+        Normalize every source to one schema and merge them by open time block by
+        block, writing each block as it is merged, so no history is fully loaded.
+
+        Output columns: timestamp, date, start (UTC), <name>_open/high/low/close/vol
+        per source, venues, spread, and <name>_premium and <name>_share per source.
+
+        Args:
+            sources (str | list): name=path pairs, e.g. binance=ignore/btc.csv,bingx=ignore/btc_bingx.csv.
+                A path is a Binance or BingX kline CSV file or a <store>/<symbol>/<interval> directory.
+                Every source must be sorted and unique by open time (see integrity.py repair).
+            output (str): Output CSV file path.
+            chunk_size (int): CSV rows read per source at a time.
+            all_venues (str): If "true", only keep open times every source has a candle for.
+        """
+        if isinstance(sources, str):
+            sources = sources.split(",")
+        paths = dict(source.split("=", 1) for source in sources)
+        names = list(paths)
+        blocks = feed.merge_sources(
+            {name: feed.iter_source(path, chunk_size) for name, path in paths.items()}
+        )
+
+        started = time.perf_counter()
+        resolved_path = file.resolve(output)
+        tmp_path = resolved_path.with_name(resolved_path.name + ".tmp")
+        rows = 0
+        try:
+            with open(tmp_path, "w", newline="") as f:
+                for i, block in enumerate(blocks):
+                    columns = feed.to_columns(block, names)
+                    if all_venues == "true":
+                        keep = columns["venues"] == len(names)
+                        columns = {c: values[keep] for c, values in columns.items()}
+                    if i == 0:
+                        f.write(",".join(columns) + "\n")
+                    f.write(feed.format_rows(columns))
+                    rows += len(columns["timestamp"])
+            os.replace(tmp_path, resolved_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        print(
+            f"Merged {len(names)} source(s) into {resolved_path} ({rows} rows) in {time.perf_counter() - started:.2f}s."
+        )
+
+
+if __name__ == "__main__":
+    Fire(Feed_CLI)
@@ -0,0 +1,127 @@
+import os
+import time
+from datetime import datetime, timezone
+from fire import Fire
+from util import coverage, file, integrity, klinestore
+
+
+def format_ms(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+class Integrity_CLI:
+    """
+    CLI tool to check kline CSV files and kline store datasets for duplicates,
+    out-of-order rows, holes, empty volume and inconsistent OHLC, and to repair CSV files.
+
+    Example usage:
+        python py/integrity.py scan --paths=ignore/btc.csv,ignore/store/BTCUSDT/1h
+        python py/integrity.py scan --paths=ignore/btc.csv --interval=1m --strict=true
+        python py/integrity.py repair --path=ignore/btc.csv --interval=1m
+    """
+
+    def scan(self, paths, interval: str = None, strict: str = None, max_gaps: int = 10):
+        """
+        Scan files and print one report per file.
+
+        Args:
+            paths (str | list): CSV files or <store>/<symbol>/<interval> directories.
+            interval (str): Interval, e.g. 1h, inferred from the open times if None.
+            strict (str): If "true", raise an error if any file has a problem, e.g. before a backtest.
+            max_gaps (int): Number of the largest holes printed per file.
+        """
+        if isinstance(paths, str):
+            paths = paths.split(",")
+        failed = []
+        for path in paths:
+            started = time.perf_counter()
+            columns = self.read(path)
+            report = integrity.scan(columns, self.candle_ms(path, interval), max_gaps)
+            self.print_report(path, report, time.perf_counter() - started)
+            if not integrity.is_clean(report):
+                failed.append(path)
+        if strict == "true" and failed:
+            raise ValueError(f"Integrity check failed for: {', '.join(failed)}")
+
+    def repair(self, path: str, interval: str = None):
+        """
+        Sort a CSV file by open time and drop duplicate candles, keeping the last
+        written copy, in one streaming pass over the file. Holes cannot be filled
+        from the file itself, so the coverage index is rebuilt from the repaired
+        open times: they show up as missing for `price.py fetch --backfill=true`.
+
+        Args:
+            path (str): CSV file, or a <store>/<symbol>/<interval> directory whose
+                coverage index is rebuilt (store datasets are kept sorted and unique).
+            interval (str): Interval, e.g. 1h, inferred from the open times if None.
+        """
+        started = time.perf_counter()
+        columns = self.read(path)
+        times = columns["open_time"]
+        order = integrity.keep_order(times)
+        if file.is_csv(path) and (
+            len(order) != len(times) or (order[:-1] > order[1:]).any()
+        ):
+            integrity.rewrite_rows(file.resolve(path), order, len(times))
+            print(
+                f"Rewrote {path}: {len(order)} rows, dropped {len(times) - len(order)} duplicate(s)."
+            )
+        else:
+            print(f"{path} is sorted and has no duplicates.")
+
+        candle_ms = self.candle_ms(path, interval) or integrity.infer_candle_ms(times)
+        index = coverage.CoverageIndex.from_open_times(
+            self.coverage_path(path), candle_ms, times[order]
+        )
+        index.save()
+        print(
+            f"Marked {max(len(index.ranges) - 1, 0)} gap(s) in {index.path} in {time.perf_counter() - started:.2f}s."
+        )
+
+    def read(self, path: str) -> dict:
+        resolved_path = file.resolve(path)
+        if not os.path.exists(resolved_path):
+            raise FileNotFoundError(f"File not found: {resolved_path}")
+        if file.is_csv(path):
+            return integrity.read_csv_columns(resolved_path)
+        store, symbol, interval = klinestore.KlineStore.from_path(resolved_path)
+        return store.read(symbol, interval)
+
+    def candle_ms(self, path: str, interval: str = None) -> int:
+        if interval is None and not file.is_csv(path):
+            # The interval of a store dataset is its directory name
+            interval = file.resolve(path).name
+        return klinestore.INTERVAL_MS_MAP.get(interval)
+
+    def coverage_path(self, path: str):
+        resolved_path = file.resolve(path)
+        if file.is_csv(path):
+            return resolved_path.with_name(resolved_path.name + ".coverage.json")
+        return resolved_path / "coverage.json"
+
+    def print_report(self, path: str, report: dict, elapsed: float):
+        print(f"{path}: {report['rows']} rows scanned in {elapsed:.2f}s")
+        if report["rows"]:
+            print(
+                f"  {format_ms(report['first_open_time'])} - {format_ms(report['last_open_time'])}, candle {report['candle_ms']} ms"
+            )
+        for key in (
+            "out_of_order",
+            "duplicates",
+            "gaps",
+            "missing_candles",
+            "misaligned",
+            "nan_rows",
+            "zero_volume",
+            "bad_ohlc",
+        ):
+            if report[key]:
+                print(f"  {key}: {report[key]}")
+        for start, end, missing in report["largest_gaps"]:
+            print(f"  gap {format_ms(start)} - {format_ms(end)} ({missing} candles)")
+        if integrity.is_clean(report):
+            print("  OK")
+
+
+if __name__ == "__main__":
+    Fire(Integrity_CLI)
@@ -0,0 +1,427 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+import numpy as np
+from aiohttp import web
+from fire import Fire
+from util import file, klinestore
+
+# Binance request weight of GET /api/v3/klines by limit
+BINANCE_KLINES_WEIGHTS = ((100, 1), (500, 2), (1000, 5))
+
+
+def klines_weight(limit: int) -> int:
+    for max_limit, weight in BINANCE_KLINES_WEIGHTS:
+        if limit <= max_limit:
+            return weight
+    return 10
+
+
+def synthetic_klines(symbol: str, open_times: np.ndarray, candle_ms: int) -> dict:
+    """
+    Deterministic candles: every value is a function of the symbol and open time
+    only, so overlapping pages and repeated runs always agree.
+
+    Returns:
+        dict: Kline store columns.
+    """
+    seed = zlib.crc32(symbol.encode("utf-8")) % 1000
+    base = 10 + seed
+
+    def price(times):
+        days = times / 86_400_000
+        return base * (1 + 0.05 * np.sin(days / 3 + seed) + 0.01 * np.sin(days * 24))
+
+    open_times = np.asarray(open_times, dtype=np.int64)
+    open_ = price(open_times)
+    close = price(open_times + candle_ms)
+    wick = 0.002 * (1.5 + np.sin(open_times / 3_600_000 + seed))
+    return {
+        "open_time": open_times,
+        "close_time": open_times + candle_ms - 1,
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + wick),
+        "low": np.minimum(open_, close) * (1 - wick),
+        "close": close,
+        "vol": 100 + 50 * np.sin(open_times / 7_200_000 + seed),
+    }
+
+
+class MockExchange:
+    """
+    Local stand-in for the Binance and BingX endpoints used by the fetchers.
+
+    Serves synthetic candles (or the candles of a kline store) with the response
+    shapes of Binance /api/v3/klines and BingX /openApi/swap/v3/quote/klines, plus
+    the Binance kline websocket stream, depth and 24h ticker. Latency, Binance
+    used-weight headers, weight-limit 429s and random 429s are simulated, and
+    every request is counted so benchmarks can report on them.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        weight_limit: int = 6000,
+        listed_days: int = 365,
+        store: str = None,
+        symbols: list = None,
+        ws_interval: float = 0.1,
+        closed_every: int = 5,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.weight_limit = weight_limit
+        self.listed_at = int(time.time() * 1000) - listed_days * 86_400_000
+        self.store = klinestore.KlineStore(file.resolve(store)) if store else None
+        self.symbols = symbols or ["BTCUSDT", "ETHUSDT"]
+        self.ws_interval = ws_interval
+        self.closed_every = closed_every
+        self.seed = seed
+        self.reset()
+        self._loop = None
+        self._thread = None
+        self._runner = None
+
+    def reset(self):
+        """
+        Start over like a new exchange: clear the request counters and the used
+        weight, and restart the random latency and errors from the seed.
+        """
+        self.used_weight = 0
+        self.weight_minute = 0
+        self.random = random.Random(self.seed)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Clear the request counters.
+        """
+        self.requests = 0
+        self.rate_limited = 0
+        self.candles = 0
+        self.durations = []
+
+    def stats(self) -> dict:
+        """
+        Request counters since the last reset.
+
+        Returns:
+            dict: Request, 429 and candle counts, and server-side latency percentiles in ms.
+        """
+        durations = np.asarray(self.durations) * 1000
+        p50, p95 = np.percentile(durations, [50, 95]) if len(durations) else (0, 0)
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "candles": self.candles,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+        }
+
+    def klines(
+        self,
+        symbol: str,
+        interval: str,
+        start: int = None,
+        end: int = None,
+        limit: int = 500,
+    ) -> dict:
+        """
+        Select a page of candles like the exchange does: from `start` forwards if
+        given, otherwise backwards from `end` (or now). The last candle may be open.
+
+        Returns:
+            dict: Kline store columns, oldest first.
+        """
+        candle_ms = klinestore.INTERVAL_MS_MAP[interval]
+        now = int(time.time() * 1000)
+        end = now if end is None else min(end, now)
+        if self.store is not None:
+            data = self.store.read(symbol, interval, start=start, end=end)
+            if start is None:
+                return {c: a[-limit:] for c, a in data.items()}
+            return {c: a[:limit] for c, a in data.items()}
+
+        first = max(self.listed_at, start or 0)
+        first = -(-first // candle_ms) * candle_ms
+        last = end // candle_ms * candle_ms
+        if start is None:
+            first = max(first, last - (limit - 1) * candle_ms)
+        else:
+            last = min(last, first + (limit - 1) * candle_ms)
+        if last < first:
+            open_times = np.empty(0, dtype=np.int64)
+        else:
+            open_times = np.arange(first, last + 1, candle_ms, dtype=np.int64)
+        return synthetic_klines(symbol, open_times, candle_ms)
+
+    async def _simulate(self, weight: int):
+        # Latency first, then the weight budget of the current minute
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        self.requests += 1
+        minute = int(time.time() // 60)
+        if minute != self.weight_minute:
+            self.weight_minute = minute
+            self.used_weight = 0
+        self.used_weight += weight
+        limited = self.used_weight > self.weight_limit
+        if limited or self.random.random() < self.error_rate:
+            self.rate_limited += 1
+            retry_after = 60 - int(time.time() % 60) if limited else 1
+            headers = {
+                "Retry-After": str(retry_after),
+                "x-mbx-used-weight-1m": str(self.used_weight),
+            }
+            self.durations.append(time.perf_counter() - started)
+            raise web.HTTPTooManyRequests(
+                text='{"code":-1003,"msg":"Too many requests."}',
+                headers=headers,
+                content_type="application/json",
+            )
+        return started
+
+    def _respond(self, payload, started: float, weight_header: bool = True):
+        headers = {}
+        if weight_header:
+            headers["x-mbx-used-weight"] = str(self.used_weight)
+            headers["x-mbx-used-weight-1m"] = str(self.used_weight)
+        self.durations.append(time.perf_counter() - started)
+        return web.json_response(payload, headers=headers)
+
+    async def binance_klines(self, request: web.Request):
+        query = request.query
+        limit = min(int(query.get("limit", 500)), 1000)
+        started = await self._simulate(klines_weight(limit))
+        data = self.klines(
+            query["symbol"],
+            query["interval"],
+            int(query["startTime"]) if "startTime" in query else None,
+            int(query["endTime"]) if "endTime" in query else None,
+            limit,
+        )
+        self.candles += len(data["open_time"])
+        rows = zip(
+            data["open_time"].tolist(),
+            map(str, data["open"].tolist()),
+            map(str, data["high"].tolist()),
+            map(str, data["low"].tolist()),
+            map(str, data["close"].tolist()),
+            map(str, data["vol"].tolist()),
+            data["close_time"].tolist(),
+            map(str, (data["vol"] * data["close"]).tolist()),
+        )
+        payload = [[*row, 100, "0", "0", "0"] for row in rows]
+        return self._respond(payload, started)
+
+    async def binance_depth(self, request: web.Request):
+        limit = int(request.query.get("limit", 100))
+        started = await self._simulate(5)
+        data = self.klines(request.query["symbol"], "1m", limit=1)
+        mid = float(data["close"][-1]) if len(data["close"]) else 100.0
+        step = mid * 0.0001
+        payload = {
+            "lastUpdateId": self.requests,
+            "bids": [[str(mid - (i + 1) * step), str(1 + i)] for i in range(limit)],
+            "asks": [[str(mid + (i + 1) * step), str(1 + i)] for i in range(limit)],
+        }
+        return self._respond(payload, started)
+
+    async def binance_ticker(self, request: web.Request):
+        started = await self._simulate(80)
+        payload = []
+        for symbol in self.symbols:
+            data = self.klines(symbol, "1h", limit=24)
+            payload.append(
+                {
+                    "symbol": symbol,
+                    "lastPrice": str(data["close"][-1]),
+                    "volume": str(data["vol"].sum()),
+                    "quoteVolume": str((data["vol"] * data["close"]).sum()),
+                }
+            )
+        return self._respond(payload, started)
+
+    async def bingx_klines(self, request: web.Request):
+        query = request.query
+        started = await self._simulate(1)
+        end = None
+        if "endTime" in query:
+            # BingX pages end with the candle opening at or right after endTime,
+            # so a page ending at the oldest candle - 1 repeats that candle
+            candle_ms = klinestore.INTERVAL_MS_MAP[query["interval"]]
+            end = -(-int(query["endTime"]) // candle_ms) * candle_ms
+        data = self.klines(
+            query["symbol"],
+            query["interval"],
+            int(query["startTime"]) if "startTime" in query else None,
+            end,
+            min(int(query.get("limit", 500)), 1440),
+        )
+        self.candles += len(data["open_time"])
+        candles = [
+            {
+                "open": str(o),
+                "close": str(c),
+                "high": str(h),
+                "low": str(lo),
+                "volume": str(v),
+                "time": t,
+            }
+            for t, o, h, lo, c, v in zip(
+                data["open_time"].tolist(),
+                data["open"].tolist(),
+                data["high"].tolist(),
+                data["low"].tolist(),
+                data["close"].tolist(),
+                data["vol"].tolist(),
+            )
+        ]
+        # BingX answers newest first
+        candles.reverse()
+        payload = {"code": 0, "msg": "", "data": candles}
+        return self._respond(payload, started, weight_header=False)
+
+    async def send_klines(self, ws: web.WebSocketResponse, streams: list):
+        # The candle advances every `closed_every` updates, the last update closes it
+        now = int(time.time() * 1000)
+        tick = 0
+        while not ws.closed:
+            for name, interval in streams:
+                symbol = name.upper()
+                candle_ms = klinestore.INTERVAL_MS_MAP[interval]
+                open_time = (now // candle_ms + tick // self.closed_every) * candle_ms
+                data = synthetic_klines(symbol, np.array([open_time]), candle_ms)
+                kline = {
+                    "t": open_time,
+                    "T": open_time + candle_ms - 1,
+                    "s": symbol,
+                    "i": interval,
+                    "o": str(data["open"][0]),
+                    "c": str(data["close"][0]),
+                    "h": str(data["high"][0]),
+                    "l": str(data["low"][0]),
+                    "v": str(data["vol"][0]),
+                    "x": tick % self.closed_every == self.closed_every - 1,
+                }
+                event = {"e": "kline", "E": int(time.time() * 1000), "s": symbol}
+                message = {
+                    "stream": f"{name}@kline_{interval}",
+                    "data": {**event, "k": kline},
+                }
+                await ws.send_json(message)
+            tick += 1
+            await asyncio.sleep(self.ws_interval)
+
+    async def binance_stream(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = [s.split("@kline_") for s in request.query["streams"].split("/")]
+        sender = asyncio.create_task(self.send_klines(ws, streams))
+        try:
+            # Reading answers the close handshake of the client
+            async for _ in ws:
+                pass
+        finally:
+            sender.cancel()
+        return ws
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", self.binance_klines)
+        app.router.add_get("/api/v3/depth", self.binance_depth)
+        app.router.add_get("/api/v3/ticker/24hr", self.binance_ticker)
+        app.router.add_get("/openApi/swap/v3/quote/klines", self.bingx_klines)
+        app.router.add_get("/stream", self.binance_stream)
+        return app
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Serve in a background thread.
+
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind, 0 picks a free one.
+
+        Returns:
+            str: Base URL of the server, e.g. http://127.0.0.1:8000
+        """
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self.app())
+        ready = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, host, port)
+            self._loop.run_until_complete(site.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        ready.wait()
+        bound_port = self._runner.addresses[0][1]
+        return f"http://{host}:{bound_port}"
+
+    def stop(self):
+        """
+        Stop the background server.
+        """
+        cleanup = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        cleanup.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class MockExchange_CLI:
+    """
+    CLI tool to run the local mock exchange.
+
+    Example usage:
+        python py/mockexchange.py run --port=8000 --latency=0.05 --error_rate=0.01
+
+    The fetchers have no command line flag for their base URL: point them at the
+    mock by setting Price_CLI.base_url and bingx.APIURL in code, as bench.py does.
+    """
+
+    def run(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        weight_limit: int = 6000,
+        store: str = None,
+        seed: int = None,
+    ):
+        """
+        Serve until interrupted.
+
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind.
+            latency (float): Base response latency in seconds.
+            jitter (float): Extra random latency in seconds.
+            error_rate (float): Probability of answering 429 to any request.
+            weight_limit (int): Used weight per minute above which requests get 429.
+            store (str): Kline store to serve instead of synthetic candles.
+            seed (int): Seed of the random latency and errors.
+        """
+        exchange = MockExchange(
+            latency, jitter, error_rate, weight_limit, store=store, seed=seed
+        )
+        print(f"Mock exchange listening on http://{host}:{port}")
+        web.run_app(exchange.app(), host=host, port=port, print=None)
+
+
+if __name__ == "__main__":
+    Fire(MockExchange_CLI)
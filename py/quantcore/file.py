@@ -3,6 +3,7 @@ import os
 import pandas
 import json
 from pathlib import Path
+from util import file
 
 
 def resolve(path: str) -> Path:
@@ -18,25 +19,22 @@ def resolve(path: str) -> Path:
     return Path(os.path.join(os.getcwd(), path)).resolve()
 
 
-def get_source(source: str) -> pandas.DataFrame:
+def get_source(source: str, **kwargs) -> pandas.DataFrame:
     """
-    Get the source data from a CSV file.
+    Get the source data from a CSV file, with the typed kline schema and the
+    parsed-file cache of util.file.get_source.
 
     Args:
         source (str): The path to the CSV file.
+        **kwargs: usecols, prices, engine and cache, see util.file.get_source.
 
     Returns:
-        dict: A dictionary containing the dataframe, filename, and filepath.
+        pandas.DataFrame: The data.
     """
     if re.search("(.csv$)", source) is None:
         raise ValueError("CSV not found")
 
-    source_path = resolve(source)
-
-    if not os.path.exists(source_path):
-        raise FileNotFoundError(f"File not found: {source_path}")
-
-    return pandas.read_csv(source_path, sep=",")
+    return file.get_source(source, **kwargs)
 
 
 def write(path: str, content: str, mode="w"):
@@ -49,28 +47,16 @@ def write(path: str, content: str, mode="w"):
         f.write(content)
 
 
-def write_dataframe(df: pandas.DataFrame, path: str):
+def write_dataframe(df: pandas.DataFrame, path: str, **kwargs):
     """
-    Write a DataFrame to a CSV file.
+    Write a DataFrame atomically, see util.file.write_dataframe.
 
     Args:
         df (pandas.DataFrame): The DataFrame to write.
-        path (str): The path to the output CSV file.
+        path (str): The path to the output file.
+        **kwargs: columns, compression and chunk_size, see util.file.write_dataframe.
     """
-    if not isinstance(df, pandas.DataFrame):
-        raise TypeError("Expected a pandas DataFrame")
-
-    resolved_path = resolve(path)
-
-    try:
-        df.drop(columns=["index"], inplace=True)
-    except KeyError:
-        pass
-
-    with open(resolved_path, "w") as f:
-        f.write(df.to_csv(index_label="index", lineterminator="\n"))
-
-    print(f"Exported DataFrame to {resolved_path}")
+    file.write_dataframe(df, path, **kwargs)
 
 
 def require(path: str) -> dict:
@@ -1,4 +1,7 @@
+import json
+import os
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from .deepseek.config import Config
 from .deepseek.data_loader import DataLoader
 from .deepseek.indicators import Indicators
@@ -6,10 +9,39 @@ from .deepseek.rule_engine import RuleEngine
 from .deepseek.rule_scorer import RuleScorer
 from .deepseek.portfolio_manager import PortfolioManager
 from .deepseek.dynamic_config import DynamicConfig
-from .util import file
+from .util import file, shared
 from fire import Fire
 
 
+def enabled_rules(allowed_rules: dict) -> list:
+    """Filter enabled rules, then get their name."""
+    return [
+        rule for rule, enabled in allowed_rules.items() if enabled in ("true", True)
+    ]
+
+
+def run_sweep_config(
+    dataset: shared.SharedDataset, config: dict = None, allowed_rules: dict = None
+) -> dict:
+    """Backtest one config on a shared dataset, in a worker process"""
+    trading_system = QuantitativeTradingSystem(
+        dataset.to_frame(),
+        config=DynamicConfig(config) if config else None,
+        allowed_rules=enabled_rules(allowed_rules) if allowed_rules else None,
+    )
+    dataset.close()
+    results = trading_system.run_backtest()
+    buy_success_rate, sell_success_rate = trading_system.signal_quality(results)
+    decisions = results["decision"].value_counts()
+    return {
+        "buy": int(decisions.get("BUY", 0)),
+        "sell": int(decisions.get("SELL", 0)),
+        "hold": int(decisions.get("HOLD", 0)),
+        "buy_success_rate": buy_success_rate,
+        "sell_success_rate": sell_success_rate,
+    }
+
+
 class QuantitativeTradingSystem:
     def __init__(self, df, config=None, allowed_rules: list = None):
         self.config = config if config else Config()
@@ -25,8 +57,8 @@ class QuantitativeTradingSystem:
         # Process data
         self.prepare_data()
 
-    def analyze_signal_quality(self, results_df: pd.DataFrame):
-        """Analyze how often signals are profitable"""
+    def signal_quality(self, results_df: pd.DataFrame) -> tuple:
+        """Share of BUY and SELL signals followed by a move in their direction"""
         profitable_buys = 0
         profitable_sells = 0
         total_buys = 0
@@ -48,6 +80,11 @@ class QuantitativeTradingSystem:
 
         buy_success_rate = profitable_buys / total_buys if total_buys > 0 else 0
         sell_success_rate = profitable_sells / total_sells if total_sells > 0 else 0
+        return buy_success_rate, sell_success_rate
+
+    def analyze_signal_quality(self, results_df: pd.DataFrame):
+        """Analyze how often signals are profitable"""
+        buy_success_rate, sell_success_rate = self.signal_quality(results_df)
 
         print("\n=== ANALYZE RESULTS ===")
         print(f"-> Buy Signal Success Rate: {buy_success_rate:.1%}")
@@ -140,6 +177,15 @@ class QuantitativeTradingSystem:
 
 
 class Quant_DeepSeek_CLI:
+    """
+    CLI tool to backtest the rule-based trading system on a kline file.
+
+    Example usage:
+        python py/quantdeepseek.py run --input=ignore/btc.csv --output=ignore/btc_deepseek.csv
+        python py/quantdeepseek.py sweep --input=ignore/btc.csv --output=ignore/btc_sweep.csv --configs=ignore/configs.json --workers=4
+        python py/quantdeepseek.py sweep --input=ignore/btc.csv --output=ignore/btc_sweep.csv --configs='[{"allowed_rules": {"rsi": true}}, {"allowed_rules": {"macd": true}}]'
+    """
+
     def __init__(
         self, input: str, output: str, config: dict = None, allowed_rules: dict = None
     ):
@@ -165,18 +211,7 @@ class Quant_DeepSeek_CLI:
         config = DynamicConfig(self.config)
         df = file.get_source(self.input)
 
-        # Filter enabled rules, then get their name.
-        allowed_rules = list(
-            map(
-                lambda tup: tup[0],
-                list(
-                    filter(
-                        lambda tup: tup[1] == "true" or tup[1] is True,
-                        list(self.allowed_rules.items()),
-                    )
-                ),
-            )
-        )
+        allowed_rules = enabled_rules(self.allowed_rules)
 
         trading_system = QuantitativeTradingSystem(
             df, config=config, allowed_rules=allowed_rules
@@ -186,6 +221,55 @@ class Quant_DeepSeek_CLI:
         file.write_dataframe(trading_system.data, self.output)
         return trading_system.data
 
+    def sweep(self, configs, workers: int = None):
+        """
+        Backtest many configs on the input in parallel and write one summary row per
+        config to the output. The input is loaded once and published to a shared
+        dataset registry, so workers map it instead of each receiving a pickled copy.
+        A config that fails gets its error in the "error" column of its row, the
+        other rows are kept.
+
+        Args:
+            configs (str | list): A JSON file, or a list, of {"config": {...},
+                "allowed_rules": {...}} entries, either key optional.
+            workers (int): Worker processes, defaults to the number of CPUs.
+        """
+        if isinstance(configs, str):
+            with open(file.resolve(configs)) as f:
+                configs = json.load(f)
+
+        with shared.DatasetRegistry() as registry:
+            registry.publish("input", self.input)
+            futures = []
+            with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+                for entry in configs:
+                    future = pool.submit(
+                        run_sweep_config,
+                        registry.acquire("input"),
+                        entry.get("config"),
+                        entry.get("allowed_rules"),
+                    )
+                    future.add_done_callback(lambda _: registry.release("input"))
+                    futures.append(future)
+                # Drop the reference of publish, the last job removes the dataset
+                registry.release("input")
+                rows = []
+                for index, future in enumerate(futures):
+                    try:
+                        rows.append(dict(future.result(), error=None))
+                    except Exception as e:
+                        print(f"Config {index} failed: {e!r}")
+                        rows.append({"error": repr(e)})
+                summary = pd.DataFrame(rows)
+
+        summary.insert(0, "config", range(len(configs)))
+        print(summary.to_string(index=False))
+        file.write_dataframe(summary, self.output)
+        failed = summary.loc[summary["error"].notna(), "config"].tolist()
+        if failed:
+            print(f"Failed config(s): {', '.join(map(str, failed))}")
+        return summary
+
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+import time
+import pandas
+from fire import Fire
+from binanceapi import Price_CLI
+from util import file, klinestore, screener
+
+
+class Screener_CLI:
+    """
+    CLI tool to screen many symbols at once from the local kline store.
+
+    Example usage:
+        python py/screener.py run --interval=1h --where="rsi < 30 and adx > 25" --sort=rsi
+        python py/screener.py run --interval=4h --top=300 --refresh=true --where="ema_cross == 1" --sort=adx --ascending=false
+    """
+
+    def run(
+        self,
+        interval: str = "1h",
+        symbols=None,
+        path: str = "ignore/store",
+        candles: int = 200,
+        where: str = None,
+        sort: str = "rsi",
+        ascending: str = "true",
+        limit: int = 20,
+        top: int = None,
+        quote: str = "USDT",
+        refresh: str = None,
+        workers: int = 8,
+        output: str = None,
+    ):
+        """
+        Load the latest candles of every symbol into one symbol x time array, compute
+        RSI/EMA/ADX for all of them in one pass, then filter and rank.
+
+        Args:
+            interval (str): Interval, e.g. 1h
+            symbols (str | list): Symbols to screen, defaults to every symbol of the store.
+            path (str): Kline store root directory.
+            candles (int): Candles loaded per symbol.
+            where (str): pandas query over the result columns, e.g. "rsi < 30 and adx > 25".
+                Columns: close, change, rsi, ema_9, ema_21, adx, plus_di, minus_di,
+                ema_cross (1 up, -1 down, 0 none), above_emas, below_emas, vol.
+            sort (str): Column to rank by.
+            ascending (str): If "true", rank in ascending order.
+            limit (int): Number of rows printed.
+            top (int): Screen the `top` pairs by 24h quote volume, from one bulk ticker request.
+            quote (str): Quote asset of the pairs selected by `top`.
+            refresh (str): If "true", merge the latest candles of the screened symbols into the store first.
+            workers (int): Number of symbols refreshed at the same time.
+            output (str): Optional CSV file path for the full ranked result.
+        """
+        store = klinestore.KlineStore(file.resolve(path))
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        if top:
+            symbols = self.top_symbols(top, quote)
+        if not symbols:
+            symbols = screener.list_symbols(store, interval)
+        if not symbols:
+            raise ValueError(f"No symbols with {interval} data in {path}.")
+
+        if refresh == "true":
+            Price_CLI().fetch_many(
+                symbols,
+                [interval],
+                path=path,
+                chunk=-(-candles // Price_CLI.limit),
+                merge="true",
+                workers=workers,
+            )
+
+        started = time.perf_counter()
+        symbols, _, data = screener.load_matrix(store, symbols, interval, candles)
+        result = screener.screen(symbols, data)
+        if where:
+            result = result.query(where)
+        result = result.sort_values(sort, ascending=ascending == "true").reset_index(
+            drop=True
+        )
+        elapsed = time.perf_counter() - started
+
+        print(f"Screened {len(symbols)} symbol(s) on {interval} in {elapsed:.2f}s:")
+        with pandas.option_context("display.width", 200):
+            print(result.head(limit).to_string(float_format=lambda x: f"{x:.4g}"))
+        if output:
+            file.write_dataframe(result, output)
+
+    def top_symbols(self, top: int, quote: str = "USDT") -> list:
+        """
+        Pick the most traded pairs of a quote asset from the 24h ticker of every symbol.
+        """
+        prices = Price_CLI()
+        client = prices.create_client()
+        # Weight 80 for all symbols at once
+        tickers = prices.request_limited(client.ticker_24hr, 80)
+        pairs = [t for t in tickers if t["symbol"].endswith(quote)]
+        pairs.sort(key=lambda t: float(t["quoteVolume"]), reverse=True)
+        return [t["symbol"] for t in pairs[:top]]
+
+
+if __name__ == "__main__":
+    Fire(Screener_CLI)
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import random
+import time
+import websockets
+from fire import Fire
+from util import file, klinestore
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+
+
+class KlineStreamer:
+    """
+    Ingest closed candles from Binance kline websocket streams into a kline store.
+
+    Every kline update (open or closed) is pushed to the registered listeners.
+    Closed candles are buffered and appended to the store every `flush_interval`
+    seconds, so a partition is rewritten once per flush instead of once per candle.
+    """
+
+    def __init__(
+        self,
+        symbols: list,
+        interval: str,
+        path: str = "ignore/store",
+        base_url: str = BINANCE_STREAM_URL,
+        flush_interval: float = 10.0,
+    ):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.interval = interval
+        self.store = klinestore.KlineStore(file.resolve(path))
+        self.base_url = base_url.rstrip("/")
+        self.flush_interval = flush_interval
+        self.listeners = []
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def add_listener(self, listener):
+        """
+        Register a callable receiving every kline event as a dict.
+        """
+        self.listeners.append(listener)
+
+    def stream_url(self) -> str:
+        streams = "/".join(
+            f"{symbol.lower()}@kline_{self.interval}" for symbol in self.symbols
+        )
+        return f"{self.base_url}/stream?streams={streams}"
+
+    def handle_message(self, message) -> dict:
+        """
+        Parse one combined-stream message, buffer it if the candle is closed
+        and notify the listeners.
+
+        Args:
+            message (str | bytes): Raw websocket message.
+
+        Returns:
+            dict: The kline event, or None if the message is not a kline.
+        """
+        payload = json.loads(message)
+        data = payload.get("data", payload)
+        if data.get("e") != "kline":
+            return None
+
+        kline = data["k"]
+        # Scaled like the REST writers, so one dataset never mixes price scales
+        mul = klinestore.price_multiplier(kline["s"])
+        event = {
+            "symbol": kline["s"],
+            "interval": kline["i"],
+            "closed": kline["x"],
+            "open_time": kline["t"],
+            "close_time": kline["T"],
+            "open": float(kline["o"]) * mul,
+            "high": float(kline["h"]) * mul,
+            "low": float(kline["l"]) * mul,
+            "close": float(kline["c"]) * mul,
+            "vol": float(kline["v"]),
+        }
+        if event["closed"]:
+            # Keyed by open time, a resent candle replaces the buffered one
+            candles = self.pending.setdefault(event["symbol"], {})
+            candles[event["open_time"]] = event
+
+        for listener in self.listeners:
+            listener(event)
+        return event
+
+    def flush(self) -> int:
+        """
+        Append the buffered closed candles to the store.
+
+        Returns:
+            int: Number of candles written.
+        """
+        written = 0
+        for symbol, candles in self.pending.items():
+            if not candles:
+                continue
+            rows = [candles[t] for t in sorted(candles)]
+            columns = {c: [row[c] for row in rows] for c in klinestore.COLUMNS}
+            written += self.store.append(symbol, self.interval, columns)
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        return written
+
+    async def run(self, max_messages: int = None, max_retries: int = None):
+        """
+        Consume the streams, reconnecting with jittered backoff when the connection drops.
+
+        Args:
+            max_messages (int): Stop after this many messages, runs forever if None.
+            max_retries (int): Stop after this many failed connections in a row, retries forever if None.
+        """
+        received = 0
+        retries = 0
+        url = self.stream_url()
+        while max_messages is None or received < max_messages:
+            try:
+                async with websockets.connect(url) as ws:
+                    print(f"Streaming {len(self.symbols)} symbol(s) from {url}")
+                    retries = 0
+                    async for message in ws:
+                        self.handle_message(message)
+                        received += 1
+                        if time.monotonic() - self.last_flush >= self.flush_interval:
+                            self.flush()
+                        if max_messages is not None and received >= max_messages:
+                            break
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                retries += 1
+                if max_retries is not None and retries > max_retries:
+                    raise
+                delay = min(60.0, 2**retries) * random.uniform(0.5, 1.0)
+                print(f"Stream disconnected ({e}), reconnecting in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+            finally:
+                self.flush()
+
+
+class Stream_CLI:
+    """
+    CLI tool to ingest live candles from Binance websocket streams into a kline store.
+
+    Example usage:
+        python py/stream.py run --symbols=BTCUSDT,ETHUSDT --interval=1m --path=ignore/store
+    """
+
+    def run(
+        self,
+        symbols,
+        interval: str = "1m",
+        path: str = "ignore/store",
+        base_url: str = BINANCE_STREAM_URL,
+        max_messages: int = None,
+    ):
+        """
+        Stream klines and store closed candles.
+
+        Args:
+            symbols (str | list): Symbols to stream, e.g. BTCUSDT,ETHUSDT
+            interval (str): Kline interval, e.g. 1m
+            path (str): Kline store root directory.
+            base_url (str): Websocket server, e.g. ws://localhost:8765 for a local stand-in.
+            max_messages (int): Stop after this many messages.
+        """
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+
+        streamer = KlineStreamer(symbols, interval, path, base_url)
+
+        def log_closed(event):
+            if event["closed"]:
+                print(
+                    f"[{event['symbol']} {event['interval']}] closed: close={event['close']}, vol={event['vol']}"
+                )
+
+        streamer.add_listener(log_closed)
+        asyncio.run(streamer.run(max_messages=max_messages))
+
+
+if __name__ == "__main__":
+    Fire(Stream_CLI)
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+import pytest
+
+# Scripts run from py/ and import the helpers as `util`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(autouse=True)
+def frame_cache_root(tmp_path, monkeypatch):
+    # Keep parsed-frame caches out of the working directory
+    from util import file
+
+    root = tmp_path / "frames"
+    monkeypatch.setattr(file, "CACHE_ROOT", str(root))
+    return root
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from util import bars
+from util.klinestore import KlineStore
+
+
+def trades(count: int, same_ms: int = 1, seed: int = 0) -> tuple:
+    # `same_ms` trades per millisecond
+    rng = np.random.default_rng(seed)
+    time = 1_704_067_200_000 + np.arange(count) // same_ms
+    price = 100 + np.cumsum(rng.normal(0, 0.1, count))
+    qty = rng.uniform(0.1, 2.0, count)
+    return time, price, qty
+
+
+def aggregate(kind: str, threshold: float, batches: list) -> dict:
+    aggregator = bars.BarAggregator(kind, threshold)
+    parts = [aggregator.add(*batch) for batch in batches]
+    parts.append(aggregator.flush())
+    return {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+
+
+def split(batch: tuple, sizes: list) -> list:
+    edges = np.cumsum(sizes)[:-1]
+    return list(zip(*(np.split(a, edges) for a in batch)))
+
+
+@pytest.mark.parametrize(
+    "kind, threshold", [("tick", 3), ("volume", 2.5), ("dollar", 400)]
+)
+def test_bars_opening_in_one_millisecond_are_merged(kind, threshold):
+    batch = trades(1000, same_ms=10)
+    result = aggregate(kind, threshold, [batch])
+
+    assert (np.diff(result["open_time"]) > 0).all()
+    assert np.isclose(result["vol"].sum(), batch[2].sum())
+    assert result["high"].max() == batch[1].max()
+    assert result["low"].min() == batch[1].min()
+    assert result["open"][0] == batch[1][0]
+    assert result["close"][-1] == batch[1][-1]
+
+
+@pytest.mark.parametrize("same_ms", [1, 7])
+def test_bars_do_not_depend_on_batch_boundaries(same_ms):
+    batch = trades(2000, same_ms=same_ms, seed=1)
+    whole = aggregate("volume", 10.0, [batch])
+    pieces = aggregate("volume", 10.0, split(batch, [3, 500, 1, 1, 700, 795]))
+    for column, values in whole.items():
+        assert np.allclose(values, pieces[column]), column
+
+
+def test_no_bar_is_lost_in_the_store(tmp_path):
+    batch = trades(600, same_ms=20, seed=2)
+    result = aggregate("tick", 5, [batch])
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "tick_5", result)
+    stored = store.read("BTCUSDT", "tick_5")
+    assert len(stored["open_time"]) == len(result["open_time"])
+    assert np.isclose(stored["vol"].sum(), batch[2].sum())
+
+
+def test_flush_without_partial_keeps_held_bars():
+    time = np.array([1, 1, 1, 2, 3], dtype=np.int64)
+    aggregator = bars.BarAggregator("tick", 2)
+    closed = aggregator.add(time, np.ones(5), np.ones(5))
+    rest = aggregator.flush(partial=False)
+    # The bars opening at ms 1 merge into one closed bar, the open bar of ms 3 is dropped
+    assert closed["open_time"].tolist() == [1]
+    assert closed["close_time"].tolist() == [2]
+    assert closed["vol"].tolist() == [4.0]
+    assert len(rest["open_time"]) == 0
+
+
+def test_bar_inside_one_millisecond_is_held_back():
+    aggregator = bars.BarAggregator("tick", 2)
+    closed = aggregator.add(np.array([5, 5]), np.array([1.0, 2.0]), np.ones(2))
+    assert len(closed["open_time"]) == 0
+
+    # The next bar also opens at ms 5 and closes later, so both are released as one
+    closed = aggregator.add(np.array([5, 6]), np.array([3.0, 0.5]), np.ones(2))
+    assert closed["open_time"].tolist() == [5]
+    assert closed["close_time"].tolist() == [6]
+    assert closed["high"].tolist() == [3.0]
+    assert closed["low"].tolist() == [0.5]
+    assert closed["vol"].tolist() == [4.0]
+
+    aggregator.add(np.array([7, 7]), np.ones(2), np.ones(2))
+    assert aggregator.flush(partial=False)["open_time"].tolist() == [7]
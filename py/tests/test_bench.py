@@ -0,0 +1,65 @@
+import asyncio
+import pandas
+from aiohttp import web
+from bench import Bench_CLI
+from mockexchange import MockExchange
+from util import ratelimit
+
+
+def answers(exchange: MockExchange, count: int) -> list:
+    async def main():
+        limited = []
+        for _ in range(count):
+            try:
+                await exchange._simulate(1)
+                limited.append(False)
+            except web.HTTPTooManyRequests:
+                limited.append(True)
+        return limited
+
+    return asyncio.run(main())
+
+
+def test_mock_errors_follow_the_seed():
+    exchange = MockExchange(latency=0, jitter=0.001, error_rate=0.5, seed=7)
+    first = answers(exchange, 50)
+    assert 0 < sum(first) < 50
+    assert (
+        answers(MockExchange(latency=0, jitter=0.001, error_rate=0.5, seed=7), 50)
+        == first
+    )
+
+    # A reset replays the same errors with a full weight budget
+    exchange.used_weight = exchange.weight_limit
+    exchange.reset()
+    assert answers(exchange, 50) == first
+    assert exchange.stats()["requests"] == 50
+
+
+def test_runs_start_with_fresh_limiters(tmp_path, monkeypatch):
+    limiters = []
+    prepare = Bench_CLI.prepare
+
+    def prepare_and_use(self, *args):
+        run = prepare(self, *args)
+
+        def timed():
+            limiters.append(ratelimit.get_limiter("binance"))
+            assert limiters[-1].stats()["in_flight"] == 0
+            # Leave the budget partly used, the next run must not see it
+            limiters[-1].tokens = 0
+            return run()
+
+        return timed
+
+    monkeypatch.setattr(Bench_CLI, "prepare", prepare_and_use)
+    output = tmp_path / "bench.csv"
+    Bench_CLI().run(
+        modes="chunk,from_to", chunk=2, latency=0.001, repeat=2, output=str(output)
+    )
+
+    assert len({id(limiter) for limiter in limiters}) == 4
+    df = pandas.read_csv(output)
+    assert (df["requests"] > 0).all()
+    assert (df["rows"] > 0).all()
+    ratelimit.reset_limiter("binance")
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+import os
+import numpy as np
+import pandas
+import pytest
+from binanceapi import Price_CLI
+from mockexchange import MockExchange
+from util import integrity, klinestore
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    exchange = MockExchange(latency=0.001, jitter=0.0)
+    yield exchange.start()
+    exchange.stop()
+
+
+@pytest.fixture
+def prices(base_url, monkeypatch):
+    prices = Price_CLI()
+    monkeypatch.setattr(prices, "base_url", base_url)
+    monkeypatch.setattr(prices, "use_cache", False)
+    return prices
+
+
+def date_range(hours: int) -> tuple:
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return (now - timedelta(hours=hours)).strftime(fmt), now.strftime(fmt)
+
+
+def test_parallel_fetch_keeps_the_client_pool(prices, tmp_path):
+    client = prices.create_client(pool_size=4)
+    adapters = dict(client.session.adapters)
+    from_, to = date_range(48)
+    path = str(tmp_path / "btc.csv")
+
+    prices.fetch_by_from_to_parallel(client, "BTCUSDT", "1m", path, from_, to, 4)
+
+    assert client.session.adapters == adapters
+    columns = integrity.read_csv_columns(path)
+    assert len(columns["open_time"]) >= 48 * 60
+    assert (np.diff(columns["open_time"]) == 60_000).all()
+
+
+def test_backfill_keeps_the_client_pool(prices, tmp_path):
+    client = prices.create_client(pool_size=4)
+    adapters = dict(client.session.adapters)
+    from_, to = date_range(24)
+    path = str(tmp_path / "btc.csv")
+
+    prices.fetch_with_client(
+        client, "BTCUSDT", "1h", path, from_=from_, to=to, workers=4, backfill="true"
+    )
+
+    assert client.session.adapters == adapters
+    assert (np.diff(integrity.read_csv_columns(path)["open_time"]) == 3_600_000).all()
+
+
+HOUR_MS = 3_600_000
+
+
+def hour_klines(first: int, last: int, price: float = 1.0) -> list:
+    # Hours counted back from the current hour, which is still open
+    now_hour = int(datetime.now(timezone.utc).timestamp() * 1000) // HOUR_MS
+    return [
+        [(now_hour + h) * HOUR_MS, price, price, price, price, 1.0]
+        + [(now_hour + h + 1) * HOUR_MS - 1]
+        for h in range(first, last)
+    ]
+
+
+def test_coverage_from_stored_rows_leaves_out_open_candles(prices, tmp_path):
+    path = str(tmp_path / "btc.csv")
+    klines = hour_klines(-5, 1)
+    prices.write_klines_csv("BTCUSDT", path, klines)
+
+    index = prices.load_coverage("BTCUSDT", "1h", path)
+    assert index.ranges == [(klines[0][0], klines[-2][0])]
+
+    # Written after it closed, the candle is final
+    os.utime(path, (klines[-1][6] / 1000 + 1,) * 2)
+    index = prices.load_coverage("BTCUSDT", "1h", path)
+    assert index.ranges == [(klines[0][0], klines[-1][0])]
+
+
+def test_coverage_from_store_leaves_out_open_candles(prices, tmp_path):
+    path = str(tmp_path / "store")
+    klines = hour_klines(-5, 1)
+    prices.write_klines_store("BTCUSDT", "1h", path, klines)
+
+    index = prices.load_coverage("BTCUSDT", "1h", path)
+    assert index.ranges == [(klines[0][0], klines[-2][0])]
+
+
+def test_merge_after_the_last_row_appends_to_the_tail(prices, tmp_path):
+    path = tmp_path / "btc.csv"
+    prices.write_klines_csv("BTCUSDT", str(path), hour_klines(-10, -4))
+    inode = os.stat(path).st_ino
+
+    # The stored last candle is fetched again with its final values
+    prices.merge_klines_csv("BTCUSDT", str(path), hour_klines(-5, 0, price=2.0))
+
+    assert os.stat(path).st_ino == inode
+    df = pandas.read_csv(path)
+    assert len(df) == 10
+    assert (np.diff(df["timestamp"]) == HOUR_MS / 1000).all()
+    assert (df["close"].to_numpy()[-5:] == 2.0).all()
+    assert (df["close"].to_numpy()[:-5] == 1.0).all()
+
+
+def test_merge_inside_the_stored_rows_rewrites_in_order(prices, tmp_path):
+    path = tmp_path / "btc.csv"
+    klines = hour_klines(-10, 0)
+    prices.write_klines_csv("BTCUSDT", str(path), klines[:3] + klines[6:])
+
+    prices.merge_klines_csv("BTCUSDT", str(path), klines[3:6])
+
+    df = pandas.read_csv(path)
+    assert len(df) == 10
+    assert (np.diff(df["timestamp"]) == HOUR_MS / 1000).all()
+
+
+def test_fetch_many_shares_one_client_and_isolates_failures(
+    prices, tmp_path, monkeypatch, capsys
+):
+    clients = set()
+    fetch_with_client = Price_CLI.fetch_with_client
+
+    def fetch_or_fail(self, client, symbol, interval, *args):
+        clients.add(id(client))
+        if (symbol, interval) == ("ETHUSDT", "4h"):
+            raise ConnectionError("reset by peer")
+        return fetch_with_client(self, client, symbol, interval, *args)
+
+    monkeypatch.setattr(Price_CLI, "fetch_with_client", fetch_or_fail)
+    prices.fetch_many(
+        "BTCUSDT,ETHUSDT",
+        "1h,4h",
+        path=str(tmp_path / "{symbol}_{interval}.csv"),
+        chunk=1,
+        workers=3,
+    )
+
+    assert len(clients) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "BTCUSDT_1h.csv",
+        "BTCUSDT_4h.csv",
+        "ETHUSDT_1h.csv",
+    ]
+    for name, candle_ms in [
+        ("BTCUSDT_4h.csv", 4 * HOUR_MS),
+        ("ETHUSDT_1h.csv", HOUR_MS),
+    ]:
+        times = integrity.read_csv_columns(tmp_path / name)["open_time"]
+        assert len(times) == prices.limit
+        assert (np.diff(times) == candle_ms).all()
+    assert "Failed: ETHUSDT_4h" in capsys.readouterr().out
+
+
+def test_fetch_many_into_a_store(prices, tmp_path):
+    path = str(tmp_path / "store")
+    prices.fetch_many(["BTCUSDT", "ETHUSDT"], ["1h"], path=path, chunk=2)
+
+    store = klinestore.KlineStore(path)
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        times = store.read(symbol, "1h", columns=["open_time"])["open_time"]
+        assert len(times) == 2 * prices.limit
+        assert (np.diff(times) == HOUR_MS).all()
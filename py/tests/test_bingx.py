@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas
+import pytest
+from fire import Fire
+import bingx
+
+CANDLE_MS = 60_000
+
+
+class FakeExchange:
+    """
+    Serves candles like the BingX klines endpoint: up to `limit` candles, newest
+    first, ending with the candle opening at or right after endTime.
+    """
+
+    def __init__(self, first: int, last: int):
+        self.first = first
+        self.last = last
+
+    def fetch(self, symbol, interval, limit=500, endTime=None, session=None):
+        end = self.last
+        if endTime is not None:
+            end = min(-(-endTime // CANDLE_MS) * CANDLE_MS, self.last)
+        times = range(
+            end, max(self.first, end - (limit - 1) * CANDLE_MS) - 1, -CANDLE_MS
+        )
+        data = [
+            {
+                "time": t,
+                "open": "1.0",
+                "high": "2.0",
+                "low": "0.5",
+                "close": str(1 + t % 7),
+                "volume": "3.0",
+            }
+            for t in times
+        ]
+        return {"code": 0, "data": data}
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    now = int(pandas.Timestamp.now().timestamp() * 1000)
+    now -= now % CANDLE_MS
+    exchange = FakeExchange(now - 5000 * CANDLE_MS, now)
+    monkeypatch.setattr(bingx, "fetch", exchange.fetch)
+    return exchange
+
+
+def open_times(path) -> np.ndarray:
+    return np.rint(pandas.read_csv(path)["timestamp"].to_numpy() * 1000).astype(
+        np.int64
+    )
+
+
+def test_iter_pages_has_no_holes(exchange):
+    pages = list(bingx.BingXConnector(session=object()).iter_pages("X-USDT", "1m", 3))
+    times = np.array([k["time"] for page in reversed(pages) for k in page])
+    # Every page after the first repeats the boundary candle of the newer one
+    assert len(times) == 1500 - 2
+    assert (np.diff(times) == CANDLE_MS).all()
+
+
+def test_iter_pages_stops_at_the_start_of_history(exchange):
+    pages = bingx.BingXConnector(session=object()).iter_pages("X-USDT", "1m", None)
+    times = np.array([k["time"] for page in reversed(list(pages)) for k in page])
+    assert times[0] == exchange.first
+    assert (np.diff(times) == CANDLE_MS).all()
+
+
+@pytest.mark.parametrize("behind", [1, 499, 500, 700, 1000, 1999])
+def test_sync_csv_catches_up_without_holes(exchange, tmp_path, behind):
+    path = str(tmp_path / "klines.csv")
+    last = exchange.last
+    exchange.last = last - behind * CANDLE_MS
+    bingx.BingX_CLI("X-USDT", "1m", path, chunk=1).run()
+    exchange.last = last
+
+    bingx.BingX_CLI("X-USDT", "1m", path, sync="true").run()
+    times = open_times(path)
+    assert times[-1] == last
+    assert len(times) == 500 + behind
+    assert (np.diff(times) == CANDLE_MS).all()
+
+
+@pytest.mark.parametrize("flag, rows", [("true", 600), ("false", 500)])
+def test_cli_parses_sync_flag(exchange, tmp_path, flag, rows):
+    path = str(tmp_path / "klines.csv")
+    last = exchange.last
+    exchange.last = last - 100 * CANDLE_MS
+    bingx.BingX_CLI("X-USDT", "1m", path, chunk=1).run()
+    exchange.last = last
+
+    # Without sync the single page overwrites the file
+    args = ["--symbol=X-USDT", "--interval=1m", f"--output={path}", f"--sync={flag}"]
+    Fire(bingx.BingX_CLI, command=args + ["run"])
+    times = open_times(path)
+    assert times[-1] == last
+    assert len(times) == rows
+
+
+def dict_rows_csv(collection: bingx.KlineCollection) -> str:
+    # The per-candle DictWriter path that to_normalized_columns replaced
+    normalized = []
+    for candle in collection.raw_data:
+        open_time = datetime.fromtimestamp(candle["time"] / 1000)
+        end_time = open_time + timedelta(
+            milliseconds=bingx.INTERVAL_MS_MAP[collection.interval]
+        )
+        normalized.append(
+            {
+                "symbol": collection.symbol,
+                "timestamp": open_time.timestamp(),
+                "date": open_time.strftime("%Y-%m-%d"),
+                "start": open_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "end": end_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "open": float(candle["open"]),
+                "high": float(candle["high"]),
+                "low": float(candle["low"]),
+                "close": float(candle["close"]),
+                "volume": float(candle["volume"]),
+            }
+        )
+    out = io.StringIO(newline="")
+    writer = csv.DictWriter(out, fieldnames=list(normalized[0]))
+    writer.writeheader()
+    writer.writerows(normalized)
+    return out.getvalue()
+
+
+@pytest.fixture
+def berlin_time(monkeypatch):
+    # Local time with daylight saving transitions
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize("interval", ["15m", "1h", "1d"])
+def test_normalized_columns_match_dict_rows(tmp_path, berlin_time, interval):
+    candle_ms = bingx.INTERVAL_MS_MAP[interval]
+    rng = np.random.default_rng(1)
+    # 2024-03-30 22:00 UTC, across the spring forward of 2024-03-31
+    first = 1_711_836_000_000 // candle_ms * candle_ms
+    page = [
+        {
+            "time": first + i * candle_ms,
+            "open": str(round(rng.uniform(1, 70000), 4)),
+            "high": str(round(rng.uniform(1, 70000), 2)),
+            "low": str(rng.uniform(0, 1)),
+            "close": f"{rng.uniform(1, 9):.8f}",
+            "volume": str(int(rng.integers(0, 10**9))),
+        }
+        for i in range(500)
+    ]
+    collection = bingx.KlineCollection("BTC-USDT", interval, page, "bingx")
+    path = tmp_path / "klines.csv"
+
+    bingx.write_csv_pages(
+        str(path), [bingx.ConnectorAdapter(collection).to_normalized_columns()]
+    )
+
+    assert path.read_bytes().decode("utf-8") == dict_rows_csv(collection)
+
+
+class BingXHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the exchange
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.ports.append(self.client_address[1])
+        status = server.answers.pop(0) if server.answers else 200
+        body = json.dumps({"code": 0, "data": [{"status": status}]}).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BingXHandler)
+    server.ports = []
+    server.answers = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(bingx, "APIURL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(bingx, "USE_CACHE", False)
+    monkeypatch.setattr(bingx, "_session", None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetches_reuse_one_pooled_connection(server):
+    assert bingx.get_session() is bingx.get_session()
+    for _ in range(5):
+        assert bingx.fetch("BTC-USDT", "1h", limit=2)["code"] == 0
+
+    assert len(server.ports) == 5
+    assert len(set(server.ports)) == 1
+
+
+def test_server_errors_are_retried(server):
+    server.answers = [503, 502]
+    result = bingx.fetch("BTC-USDT", "1h", limit=2)
+    assert result["data"] == [{"status": 200}]
+    assert len(server.ports) == 3
+
+
+def test_retries_are_bounded(server):
+    server.answers = [503, 503, 503]
+    session = bingx.create_session(retries=1)
+    result = bingx.fetch("BTC-USDT", "1h", limit=2, session=session)
+    # The last answer is returned once the retries are spent
+    assert result["data"] == [{"status": 503}]
+    assert len(server.ports) == 2
+
+
+def test_rate_limit_answers_are_left_to_the_limiter(server, monkeypatch):
+    penalties = []
+    limiter = bingx.ratelimit.get_limiter("bingx")
+    monkeypatch.setattr(limiter, "penalize", lambda *args: penalties.append(args))
+    server.answers = [429]
+    result = bingx.fetch("BTC-USDT", "1h", limit=2)
+    assert result["data"] == [{"status": 200}]
+    assert len(server.ports) == 2
+    assert penalties == [(0, 0.0)]
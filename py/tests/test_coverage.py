@@ -0,0 +1,35 @@
+from util.coverage import CoverageIndex
+
+HOUR = 3_600_000
+
+
+def test_add_merges_touching_ranges(tmp_path):
+    index = CoverageIndex(tmp_path / "coverage.json", HOUR)
+    index.add(0, 5 * HOUR)
+    index.add(10 * HOUR, 12 * HOUR)
+    assert index.ranges == [(0, 5 * HOUR), (10 * HOUR, 12 * HOUR)]
+    # Adjacent candles leave nothing missing in between
+    index.add(6 * HOUR, 9 * HOUR)
+    assert index.ranges == [(0, 12 * HOUR)]
+
+
+def test_missing_lists_uncovered_parts(tmp_path):
+    index = CoverageIndex(tmp_path / "coverage.json", HOUR)
+    index.add(2 * HOUR, 4 * HOUR)
+    index.add(8 * HOUR, 9 * HOUR)
+    assert index.missing(0, 12 * HOUR) == [
+        (0, 2 * HOUR - 1),
+        (4 * HOUR + 1, 8 * HOUR - 1),
+        (9 * HOUR + 1, 12 * HOUR),
+    ]
+    assert index.missing(2 * HOUR, 4 * HOUR) == []
+
+
+def test_from_open_times_and_save_round_trip(tmp_path):
+    times = [0, HOUR, 2 * HOUR, 5 * HOUR, 6 * HOUR]
+    index = CoverageIndex.from_open_times(tmp_path / "coverage.json", HOUR, times)
+    assert index.ranges == [(0, 2 * HOUR), (5 * HOUR, 6 * HOUR)]
+    index.save()
+    loaded = CoverageIndex.load(tmp_path / "coverage.json", HOUR)
+    assert loaded.ranges == index.ranges
+    assert CoverageIndex.load(tmp_path / "none.json", HOUR).ranges == []
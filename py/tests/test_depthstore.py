@@ -0,0 +1,115 @@
+import numpy as np
+import pandas
+import pytest
+from fire import Fire
+from depth import Depth_CLI
+from util.depthstore import DepthRing, ring_path
+
+# 2024-01-01 00:00 UTC
+START = 1_704_067_200_000
+MINUTE = 60_000
+
+
+def book(i: int) -> tuple:
+    bids = [(100 - i - level, 1 + level) for level in range(3)]
+    asks = [(101 + i + level, 2 + level) for level in range(2)]
+    return bids, asks
+
+
+def fill(ring: DepthRing, count: int, first: int = 0):
+    for i in range(first, first + count):
+        ring.append(START + i * MINUTE, *book(i))
+
+
+def times(records) -> list:
+    return ((records["time"] - START) // MINUTE).tolist()
+
+
+def test_append_and_read_round_trip(tmp_path):
+    ring = DepthRing(tmp_path / "BTCUSDT.depth", levels=4, capacity=16)
+    fill(ring, 5)
+    ring.flush()
+
+    records = DepthRing(tmp_path / "BTCUSDT.depth").read()
+    assert times(records) == [0, 1, 2, 3, 4]
+    assert records["bid_price"][2].tolist()[:3] == [98, 97, 96]
+    assert np.isnan(records["bid_price"][2][3])
+    assert np.isnan(records["ask_qty"][2][2:]).all()
+    with pytest.raises(ValueError):
+        ring.append(START, *book(0))
+
+
+@pytest.mark.parametrize("written", [7, 8, 9, 20, 23])
+def test_read_wraps_around(tmp_path, written):
+    ring = DepthRing(tmp_path / "BTCUSDT.depth", levels=3, capacity=8)
+    fill(ring, written)
+
+    # The slot after the newest snapshot is the next overwritten, it is not read
+    first = max(0, written - 7)
+    assert times(ring.read()) == list(range(first, written))
+    assert times(ring.read(START + 2 * MINUTE, START + 21 * MINUTE)) == list(
+        range(max(first, 2), min(written, 22))
+    )
+    assert len(ring.read(START + 30 * MINUTE)) == 0
+
+
+def test_read_skips_the_slot_being_overwritten(tmp_path):
+    ring = DepthRing(tmp_path / "BTCUSDT.depth", levels=3, capacity=8)
+    fill(ring, 12)
+    # A writer (or a crash) left the next slot half written, its count is not bumped yet
+    torn = ring.records[12 % 8]
+    torn["time"] = START + 99 * MINUTE
+    torn["bid_price"][:] = 0
+
+    records = ring.read()
+    assert times(records) == list(range(5, 12))
+    assert (records["bid_price"][:, 0] > 0).all()
+
+
+def test_read_drops_snapshots_overwritten_while_copying(tmp_path):
+    path = tmp_path / "BTCUSDT.depth"
+    writer = DepthRing(path, levels=3, capacity=8)
+    fill(writer, 10)
+
+    class RacingRing(DepthRing):
+        # The writer appends 3 snapshots between the two reads of the count
+        reads = 0
+
+        @property
+        def count(self):
+            self.reads += 1
+            if self.reads == 2:
+                fill(writer, 3, first=10)
+            return int(self.header["count"][0])
+
+    # Snapshots 3 and 4 were overwritten, the slot of 5 is being written
+    assert times(RacingRing(path).read()) == list(range(6, 10))
+
+
+def test_export_takes_dates(tmp_path):
+    ring = DepthRing(ring_path(tmp_path, "BTCUSDT"), levels=3, capacity=2**12)
+    # One snapshot per hour over 3 days
+    for i in range(72):
+        ring.append(START + i * 60 * MINUTE, *book(0))
+    ring.flush()
+
+    output = tmp_path / "depth.csv"
+    Fire(
+        Depth_CLI,
+        command=[
+            "export",
+            "--symbol=btcusdt",
+            f"--path={tmp_path}",
+            f"--output={output}",
+            "--from_=2024-01-02",
+            "--to=2024-01-02",
+        ],
+    )
+    df = pandas.read_csv(output)
+    assert len(df) == 24
+    assert df["time"].iloc[0] == START + 24 * 60 * MINUTE
+
+    Depth_CLI().export("BTCUSDT", str(tmp_path), str(output), to="2024-01-01 05:00:00")
+    assert len(pandas.read_csv(output)) == 6
+    with pytest.raises(ValueError):
+        Depth_CLI().export("BTCUSDT", str(tmp_path), str(output), from_="1704067200000")
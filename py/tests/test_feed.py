@@ -0,0 +1,92 @@
+import numpy as np
+import pandas
+import pytest
+from fire import Fire
+from feed import Feed_CLI
+from mockexchange import synthetic_klines
+from util import feed
+from util.klinestore import KlineStore
+
+MINUTE = 60_000
+START = 1_704_067_200_000
+
+
+def source(symbol: str, minutes) -> dict:
+    times = START + np.asarray(minutes, dtype=np.int64) * MINUTE
+    return synthetic_klines(symbol, times, MINUTE)
+
+
+def chunks(data: dict, size: int):
+    for i in range(0, len(data["open_time"]), size):
+        yield {c: data[c][i : i + size] for c in ["open_time", *feed.FEED_COLUMNS]}
+
+
+def test_merge_matches_an_outer_join():
+    a = source("BTCUSDT", np.arange(0, 1000))
+    b = source("BTC-USDT", np.setdiff1d(np.arange(500, 1500), np.arange(700, 720)))
+    blocks = feed.merge_sources({"a": chunks(a, 130), "b": chunks(b, 77)})
+    merged = {c: np.concatenate(v) for c, v in pandas.DataFrame(list(blocks)).items()}
+
+    frames = [
+        pandas.DataFrame(
+            {f"{name}_{c}": d[c] for c in feed.FEED_COLUMNS}, index=d["open_time"]
+        )
+        for name, d in (("a", a), ("b", b))
+    ]
+    expected = frames[0].join(frames[1], how="outer")
+    assert np.array_equal(merged["open_time"], expected.index.to_numpy())
+    for column in expected.columns:
+        assert np.array_equal(
+            merged[column], expected[column].to_numpy(), equal_nan=True
+        )
+
+    fields = feed.cross_fields(merged, ["a", "b"])
+    both = ~np.isnan(merged["a_close"]) & ~np.isnan(merged["b_close"])
+    assert (fields["venues"][both] == 2).all()
+    assert np.isnan(fields["spread"][~both]).all()
+
+
+def test_merge_reads_store_and_csv_sources(tmp_path):
+    data = source("BTCUSDT", np.arange(0, 200))
+    store = KlineStore(tmp_path / "store")
+    store.append("BTCUSDT", "1m", data)
+    csv = tmp_path / "btc.csv"
+    pandas.DataFrame(
+        {
+            "timestamp": data["open_time"] / 1000,
+            **{c: data[c] for c in feed.FEED_COLUMNS},
+        }
+    ).to_csv(csv, index=False, float_format="%.17g")
+
+    blocks = feed.merge_sources(
+        {
+            "store": feed.iter_source(str(tmp_path / "store" / "BTCUSDT" / "1m")),
+            "csv": feed.iter_source(str(csv), chunk_size=50),
+        }
+    )
+    merged = pandas.DataFrame(list(blocks)).apply(np.concatenate)
+    assert np.allclose(merged["store_close"], merged["csv_close"], rtol=1e-15)
+    assert len(merged["open_time"]) == 200
+
+
+def test_merge_rejects_unsorted_sources():
+    bad = source("BTCUSDT", [0, 2, 1, 3])
+    with pytest.raises(ValueError):
+        list(feed.merge_sources({"bad": chunks(bad, 10)}))
+
+
+@pytest.mark.parametrize("flag, rows", [("true", 100), ("false", 300)])
+def test_merge_cli_parses_all_venues_flag(tmp_path, flag, rows):
+    store = KlineStore(tmp_path / "store")
+    store.append("BTCUSDT", "1m", source("BTCUSDT", np.arange(0, 200)))
+    store.append("ETHUSDT", "1m", source("ETHUSDT", np.arange(100, 300)))
+    output = tmp_path / "feed.csv"
+    sources = [f"{s}={tmp_path / 'store' / s / '1m'}" for s in ("BTCUSDT", "ETHUSDT")]
+    command = [
+        "merge",
+        f"--sources={','.join(sources)}",
+        f"--output={output}",
+        f"--all_venues={flag}",
+    ]
+    Fire(Feed_CLI, command=command)
+    assert len(pandas.read_csv(output)) == rows
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas
+import pytest
+from util import file
+
+HEADER = "timestamp,date,start,symbol,open,high,low,close,vol,type\n"
+
+
+def write_csv(tmp_path, rows: list, name: str = "klines.csv"):
+    path = tmp_path / name
+    path.write_text(HEADER + "".join(rows))
+    return path
+
+
+def test_get_source_loads_type_with_nan(tmp_path):
+    path = write_csv(
+        tmp_path,
+        [
+            "1700000000.0,2023-11-14,2023-11-14 22:13,BTCUSDT,1,2,0.5,1.5,10,1\n",
+            "1700000060.0,2023-11-14,2023-11-14 22:14,BTCUSDT,1.5,2,1,1.8,12,\n",
+        ],
+    )
+    for cache in (False, True, True):
+        df = file.get_source(str(path), cache=cache)
+        assert df["close"].dtype == np.float64
+        assert df["type"].isna().tolist() == [False, True]
+
+
+def test_get_source_loads_text_type(tmp_path):
+    path = write_csv(
+        tmp_path,
+        [
+            "1700000000.0,2023-11-14,2023-11-14 22:13,BTCUSDT,1,2,0.5,1.5,10,U\n",
+            "1700000060.0,2023-11-14,2023-11-14 22:14,BTCUSDT,1.5,2,1,1.8,12,D\n",
+        ],
+    )
+    df = file.get_source(str(path))
+    assert df["type"].tolist() == ["U", "D"]
+    assert isinstance(df["symbol"].dtype, pandas.CategoricalDtype)
+
+
+def test_read_csv_typed_keeps_columns_that_do_not_parse(tmp_path):
+    path = write_csv(
+        tmp_path,
+        [
+            "1700000000.0,2023-11-14,2023-11-14 22:13,BTCUSDT,1,2,0.5,n/a?,10,1\n",
+            "1700000060.0,2023-11-14,2023-11-14 22:14,BTCUSDT,1.5,2,1,1.8,12,1\n",
+        ],
+    )
+    df = file.read_csv_typed(path, file.kline_dtypes())
+    assert df["close"].tolist() == ["n/a?", "1.8"]
+    assert df["open"].dtype == np.float64
+
+
+def test_read_tail_matches_full_read(tmp_path):
+    rows = [
+        f"{1700000000 + 60 * i}.0,2023-11-14,s{i},BTCUSDT,1,2,0.5,{i},10,{'' if i % 3 else 1}\n"
+        for i in range(50)
+    ]
+    path = write_csv(tmp_path, rows)
+    tail = file.read_tail(str(path), 7)
+    full = file.get_source(str(path), cache=False).tail(7).reset_index(drop=True)
+    pandas.testing.assert_frame_equal(tail, full)
+
+
+def test_get_source_parses_and_caches_only_requested_columns(
+    tmp_path, frame_cache_root, monkeypatch
+):
+    rows = [
+        f"{1700000000 + 60 * i}.0,2023-11-14,s{i},BTCUSDT,{i},2,0.5,{i + 1},10,1\n"
+        for i in range(20)
+    ]
+    path = write_csv(tmp_path, rows)
+    parsed = []
+    read_csv_typed = file.read_csv_typed
+
+    def spy(source, dtypes, **kwargs):
+        parsed.append(kwargs.get("usecols"))
+        return read_csv_typed(source, dtypes, **kwargs)
+
+    monkeypatch.setattr(file, "read_csv_typed", spy)
+
+    assert file.get_source(str(path), usecols=["close"])["close"].iloc[-1] == 20
+    file.get_source(str(path), usecols=["open"])
+    assert parsed == [["close"], ["open"]]
+    # Both columns were parsed once, in file order from the cache
+    df = file.get_source(str(path), usecols=["close", "open"])
+    assert parsed == [["close"], ["open"]]
+    assert list(df.columns) == ["open", "close"]
+    assert df["open"].tolist() == list(range(20))
+
+    # The cache lives under the cache root, not next to the data
+    assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ["klines.csv"]
+    assert list(frame_cache_root.iterdir()) == [file.frame_cache_path(path)]
+
+    # A changed file is parsed again
+    with open(path, "a") as f:
+        f.write(rows[-1])
+    assert len(file.get_source(str(path), usecols=["open"])) == 21
+    assert parsed[-1] == ["open"]
+
+
+def frame(rows: int = 200) -> pandas.DataFrame:
+    return pandas.DataFrame(
+        {
+            "timestamp": 1700000000.0 + 60 * np.arange(rows),
+            "symbol": pandas.Categorical(["BTCUSDT"] * rows),
+            "close": np.linspace(1, 2, rows),
+            "type": np.arange(rows) % 2,
+        }
+    )
+
+
+class FailingValue:
+    def __str__(self):
+        raise RuntimeError("disk full")
+
+
+def test_write_dataframe_failure_keeps_the_previous_file(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_text("previous\n")
+    df = frame().astype({"close": object})
+    # Written in chunks of 50 rows, the 4th chunk fails
+    df.loc[170, "close"] = FailingValue()
+
+    with pytest.raises(RuntimeError):
+        file.write_dataframe(df, str(path), chunk_size=50)
+
+    assert path.read_text() == "previous\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.csv"]
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["out.csv", "out.csv.gz", "out.csv.bz2", "out.npz", "out.parquet", "out.feather"],
+)
+def test_write_dataframe_picks_the_format_by_extension(tmp_path, name):
+    data_format, compression = file.file_format(name)
+    if data_format in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    df = frame()
+    path = tmp_path / name
+    file.write_dataframe(df, str(path), columns=["timestamp", "close"], chunk_size=7)
+
+    if data_format == "npz":
+        written = file.read_frame_npz(path)
+    elif data_format == "csv":
+        with open(path, "rb") as f:
+            magic = f.read(2)
+        assert (magic == b"\x1f\x8b") == (compression == "gzip")
+        written = pandas.read_csv(path, float_precision="round_trip")
+    else:
+        written = getattr(pandas, f"read_{data_format}")(path)
+    assert list(written.columns) == ["index", "timestamp", "close"]
+    np.testing.assert_array_equal(written["index"], df.index)
+    np.testing.assert_array_equal(written["close"], df["close"])
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+
+def test_write_dataframe_chunks_do_not_change_the_csv(tmp_path):
+    df = frame(1000)
+    file.write_dataframe(df, str(tmp_path / "a.csv"), chunk_size=33)
+    file.write_dataframe(df, str(tmp_path / "b.csv"))
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+
+
+def kline_rows(count: int) -> list:
+    return [
+        f"{1700000000 + 60 * i}.0,2023-11-14,s{i},BTCUSDT,1,2,0.5,{i},10,1\n"
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 64 * 1024])
+@pytest.mark.parametrize("ending", ["\n", "\r\n", ""])
+def test_tail_offset_across_blocks(tmp_path, block_size, ending):
+    lines = [f"line {i}" for i in range(30)]
+    path = tmp_path / "lines.txt"
+    path.write_bytes(("\n".join(lines) + ending).encode())
+    content = path.read_bytes()
+
+    for n in (1, 2, 13, 29):
+        offset = file.tail_offset(str(path), n, block_size)
+        assert content[offset:].decode().rstrip("\r\n").split("\n") == lines[-n:]
+    assert file.tail_offset(str(path), 30, block_size) == 0
+    assert file.tail_offset(str(path), 100, block_size) == 0
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_read_tail_of_a_file_larger_than_a_block(tmp_path, trailing_newline):
+    rows = kline_rows(3000)
+    path = write_csv(tmp_path, rows)
+    if not trailing_newline:
+        path.write_bytes(path.read_bytes().rstrip(b"\n"))
+    assert path.stat().st_size > 2 * 64 * 1024
+    full = file.get_source(str(path), cache=False)
+
+    for n in (1, 1500, 2999, 5000):
+        tail = file.read_tail(str(path), n)
+        expected = full.tail(n).reset_index(drop=True)
+        pandas.testing.assert_frame_equal(tail, expected)
+    tail = file.read_tail(str(path), 10, usecols=["timestamp", "close"])
+    assert list(tail.columns) == ["timestamp", "close"]
+    assert tail["close"].tolist() == list(range(2990, 3000))
+
+
+def test_read_last_record_cuts_a_partial_line(tmp_path):
+    rows = kline_rows(5)
+    path = write_csv(tmp_path, rows)
+    size = path.stat().st_size
+
+    record, offset = file.read_last_record(str(path))
+    assert record["close"] == "4"
+    assert offset == size - len(rows[-1])
+
+    # An interrupted write leaves a line without newline, it is dropped
+    with open(path, "a") as f:
+        f.write("1700000300.0,2023-11-14,s5,BTC")
+    record, offset = file.read_last_record(str(path))
+    assert record["close"] == "4"
+    assert path.stat().st_size == size
+
+    header_only = write_csv(tmp_path, [], name="empty.csv")
+    assert file.read_last_record(str(header_only)) == (None, 0)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas
+import pytest
+from fire import Fire
+from integrity import Integrity_CLI
+from mockexchange import synthetic_klines
+from util import integrity
+from util.coverage import CoverageIndex
+
+MINUTE = 60_000
+START = 1_704_067_200_000
+
+
+def kline_frame(times) -> pandas.DataFrame:
+    data = synthetic_klines("BTCUSDT", np.asarray(times, dtype=np.int64), MINUTE)
+    return pandas.DataFrame(
+        {
+            "timestamp": data["open_time"] / 1000,
+            "open": data["open"],
+            "high": data["high"],
+            "low": data["low"],
+            "close": data["close"],
+            "vol": data["vol"],
+        }
+    )
+
+
+def test_scan_counts_every_problem():
+    times = START + np.array([0, 1, 2, 2, 1, 6, 7], dtype=np.int64) * MINUTE
+    columns = integrity.frame_to_columns(kline_frame(times))
+    columns["vol"][0] = 0
+    columns["low"][1] = columns["high"][1] + 1
+
+    report = integrity.scan(columns, MINUTE)
+    assert report["out_of_order"] == 1
+    assert report["duplicates"] == 2
+    assert report["gaps"] == 1
+    assert report["missing_candles"] == 3
+    assert report["zero_volume"] == 1
+    assert report["bad_ohlc"] == 1
+    assert report["largest_gaps"] == [(START + 3 * MINUTE, START + 5 * MINUTE, 3)]
+    assert not integrity.is_clean(report)
+
+
+@pytest.mark.parametrize("line_end", ["\n", "\r\n"])
+def test_repair_matches_pandas_dedupe(tmp_path, line_end):
+    rng = np.random.default_rng(0)
+    times = START + rng.integers(0, 300, 1000) * MINUTE
+    df = kline_frame(times)
+    # Later copies of a candle differ, the repair keeps the last one
+    df["close"] += np.arange(len(df)) / 1e6
+    path = tmp_path / "btc.csv"
+    df.to_csv(path, index=False, lineterminator=line_end)
+
+    Integrity_CLI().repair(str(path), "1m")
+
+    repaired = pandas.read_csv(path)
+    expected = (
+        df.drop_duplicates("timestamp", keep="last")
+        .sort_values("timestamp", kind="stable")
+        .reset_index(drop=True)
+    )
+    pandas.testing.assert_frame_equal(repaired, expected)
+    assert integrity.scan(integrity.read_csv_columns(path), MINUTE)["duplicates"] == 0
+
+    index = CoverageIndex.load(str(path) + ".coverage.json", MINUTE)
+    expected_times = np.rint(expected["timestamp"].to_numpy() * 1000).astype(np.int64)
+    assert (
+        index.ranges
+        == CoverageIndex.from_open_times(index.path, MINUTE, expected_times).ranges
+    )
+
+
+def test_rewrite_rows_checks_the_row_count(tmp_path):
+    path = tmp_path / "btc.csv"
+    kline_frame(START + np.arange(5) * MINUTE).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        integrity.rewrite_rows(path, np.arange(4), 4)
+
+
+@pytest.mark.parametrize("flag, raises", [("true", True), ("false", False)])
+def test_scan_cli_parses_strict_flag(tmp_path, flag, raises):
+    path = tmp_path / "btc.csv"
+    kline_frame(START + np.array([0, 1, 1, 2]) * MINUTE).to_csv(path, index=False)
+    command = ["scan", f"--paths={path}", "--interval=1m", f"--strict={flag}"]
+    if raises:
+        with pytest.raises(ValueError):
+            Fire(Integrity_CLI, command=command)
+    else:
+        Fire(Integrity_CLI, command=command)
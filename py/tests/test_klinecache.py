@@ -0,0 +1,45 @@
+import os
+import time
+from util.klinecache import KlineCache
+
+WINDOW = {"limit": 500, "startTime": 0, "endTime": 1}
+
+
+def test_get_survives_eviction_after_read(tmp_path, monkeypatch):
+    cache = KlineCache(tmp_path)
+    cache.put("binance", "BTCUSDT", "1h", WINDOW, [[1, "2"]])
+
+    def evicted(path, *args, **kwargs):
+        # Another process deletes the entry between the read and the touch
+        os.unlink(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.get("binance", "BTCUSDT", "1h", WINDOW) == [[1, "2"]]
+    assert cache.stats()["hits"] == 1
+    assert cache.get("binance", "BTCUSDT", "1h", WINDOW) is None
+
+
+def test_evict_skips_entries_removed_by_another_process(tmp_path, monkeypatch):
+    cache = KlineCache(tmp_path, max_bytes=10_000)
+    for i in range(5):
+        cache.put("binance", "BTCUSDT", "1h", {"i": i}, ["x" * 1000])
+
+    # An entry listed just before another process deleted it
+    listed = cache._entries() + [tmp_path / "binance" / "gone.json"]
+    monkeypatch.setattr(cache, "_entries", lambda: listed)
+    cache.put("binance", "BTCUSDT", "1h", {"i": 99}, ["x" * 9000])
+    assert cache.get("binance", "BTCUSDT", "1h", {"i": 99}) is not None
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = KlineCache(tmp_path, max_bytes=5_000)
+    for i in range(4):
+        cache.put("binance", "BTCUSDT", "1h", {"i": i}, ["x" * 1000])
+        time.sleep(0.01)
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get("binance", "BTCUSDT", "1h", {"i": 0}) is not None
+    cache.put("binance", "BTCUSDT", "1h", {"i": 4}, ["x" * 1000])
+
+    kept = [i for i in range(5) if cache.get("binance", "BTCUSDT", "1h", {"i": i})]
+    assert 0 in kept and 1 not in kept
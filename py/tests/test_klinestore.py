@@ -0,0 +1,165 @@
+import os
+import numpy as np
+import pytest
+from util.klinestore import COLUMNS, KlineStore
+
+CANDLE_MS = 60_000
+# 2024-01-01 00:00 UTC
+START = 1_704_067_200_000
+
+
+def klines(first: int, count: int, price: float = 1.0) -> dict:
+    times = START + (first + np.arange(count, dtype=np.int64)) * CANDLE_MS
+    data = {"open_time": times, "close_time": times + CANDLE_MS - 1}
+    for column in ("open", "high", "low", "close", "vol"):
+        data[column] = np.full(count, price) + np.arange(count) / 1000
+    return data
+
+
+def file_ids(store: KlineStore, month: str = "2024-01") -> dict:
+    partition = store.dataset_path("BTCUSDT", "1m") / month
+    return {c: os.stat(partition / f"{c}.npy").st_ino for c in COLUMNS}
+
+
+def assert_sorted_unique(data: dict):
+    assert (np.diff(data["open_time"]) > 0).all()
+    assert len({len(a) for a in data.values()}) == 1
+
+
+def test_append_in_order_grows_files_in_place(tmp_path):
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "1m", klines(0, 500))
+    ids = file_ids(store)
+    for page in range(1, 10):
+        store.append("BTCUSDT", "1m", klines(page * 500, 500))
+
+    assert file_ids(store) == ids
+    data = store.read("BTCUSDT", "1m")
+    assert len(data["open_time"]) == 5000
+    assert (np.diff(data["open_time"]) == CANDLE_MS).all()
+    assert np.array_equal(data["close"][500:1000], klines(500, 500)["close"])
+
+
+def test_append_replaces_overlapping_rows(tmp_path):
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "1m", klines(0, 100))
+    store.append("BTCUSDT", "1m", klines(90, 20, price=2.0))
+    store.append("BTCUSDT", "1m", klines(50, 5, price=3.0))
+
+    data = store.read("BTCUSDT", "1m")
+    assert_sorted_unique(data)
+    assert len(data["open_time"]) == 110
+    assert data["close"][50] == 3.0
+    assert data["close"][89] < 2.0 <= data["close"][90]
+    assert not any("." in p.name for p in store.dataset_path("BTCUSDT", "1m").iterdir())
+
+
+def test_append_keeps_the_last_copy_within_a_page(tmp_path):
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "1m", klines(0, 10))
+    page = klines(10, 5)
+    page = {c: np.concatenate([a, a[:2][::-1]]) for c, a in page.items()}
+    page["close"][-2:] = [7.0, 8.0]
+    store.append("BTCUSDT", "1m", page)
+
+    data = store.read("BTCUSDT", "1m")
+    assert_sorted_unique(data)
+    assert data["close"][10:12].tolist() == [8.0, 7.0]
+
+
+def test_interrupted_append_is_trimmed_and_repaired(tmp_path):
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "1m", klines(0, 100))
+    # A crash after the first columns of an append grew
+    partition = store.dataset_path("BTCUSDT", "1m") / "2024-01"
+    for column in ("open_time", "close_time"):
+        stored = np.load(partition / f"{column}.npy")
+        np.save(partition / f"{column}.npy", np.append(stored, stored[-1] + CANDLE_MS))
+
+    assert len(store.read("BTCUSDT", "1m")["open_time"]) == 100
+    store.append("BTCUSDT", "1m", klines(100, 10, price=5.0))
+    data = store.read("BTCUSDT", "1m")
+    assert_sorted_unique(data)
+    assert len(data["open_time"]) == 110
+    assert data["close"][100] == 5.0
+
+
+@pytest.mark.parametrize("stage", ["writing", "moved_old"])
+def test_interrupted_rewrite_is_recovered(tmp_path, stage):
+    store = KlineStore(tmp_path)
+    store.append("BTCUSDT", "1m", klines(0, 100))
+    dataset = store.dataset_path("BTCUSDT", "1m")
+    partition = dataset / "2024-01"
+    new = klines(0, 100, price=2.0)
+
+    # Replay _write_partition up to a crash
+    tmp = dataset / "2024-01.tmp"
+    tmp.mkdir()
+    for column in COLUMNS:
+        np.save(tmp / f"{column}.npy", new[column])
+    if stage == "writing":
+        (tmp / "close.npy").unlink()
+    else:
+        os.replace(partition, dataset / "2024-01.old")
+
+    assert store.partitions("BTCUSDT", "1m") == (
+        ["2024-01"] if stage == "writing" else []
+    )
+    store.append("BTCUSDT", "1m", klines(100, 1, price=9.0))
+    data = store.read("BTCUSDT", "1m")
+    assert_sorted_unique(data)
+    assert len(data["open_time"]) == 101
+    assert data["close"][0] == (1.0 if stage == "writing" else 2.0)
+    assert sorted(p.name for p in dataset.iterdir()) == ["2024-01"]
+
+
+def test_append_spans_month_partitions(tmp_path):
+    store = KlineStore(tmp_path)
+    before_february = (1_706_745_600_000 - START) // CANDLE_MS
+    store.append("BTCUSDT", "1m", klines(before_february - 50, 100))
+    assert store.partitions("BTCUSDT", "1m") == ["2024-01", "2024-02"]
+    tail = store.read_tail("BTCUSDT", "1m", 70)
+    assert len(tail["open_time"]) == 70
+    assert (np.diff(tail["open_time"]) == CANDLE_MS).all()
+
+
+def rows(data: dict, lo: int, hi: int) -> dict:
+    return {c: a[lo:hi].copy() for c, a in data.items()}
+
+
+def test_append_counts_rows_added_or_changed(tmp_path):
+    store = KlineStore(tmp_path)
+    data = klines(0, 150)
+    assert store.append("BTCUSDT", "1m", rows(data, 0, 100)) == 100
+    # The same rows again, and repeated rows, change nothing
+    assert store.append("BTCUSDT", "1m", rows(data, 0, 100)) == 0
+    page = rows(data, 100, 150)
+    doubled = {c: np.concatenate([a, a]) for c, a in page.items()}
+    assert store.append("BTCUSDT", "1m", doubled) == 50
+
+    # Rows inside the partition: 2 changed, 3 unchanged, nothing new
+    inside = rows(data, 10, 15)
+    inside["close"][:2] += 1
+    assert store.append("BTCUSDT", "1m", inside) == 2
+    assert len(store.read("BTCUSDT", "1m")["open_time"]) == 150
+
+
+def test_append_overwrites_the_open_last_candle_in_place(tmp_path):
+    store = KlineStore(tmp_path)
+    data = klines(0, 102)
+    store.append("BTCUSDT", "1m", rows(data, 0, 100))
+    ids = file_ids(store)
+
+    assert store.append("BTCUSDT", "1m", rows(data, 99, 100)) == 0
+    last = rows(data, 99, 100)
+    last["close"] += 1
+    assert store.append("BTCUSDT", "1m", last) == 1
+    assert store.read("BTCUSDT", "1m")["close"][-1] == last["close"][0]
+    # The candle closed with other values, and two more follow
+    assert store.append("BTCUSDT", "1m", rows(data, 99, 102)) == 3
+
+    assert file_ids(store) == ids
+    stored = store.read("BTCUSDT", "1m")
+    assert_sorted_unique(stored)
+    for column, values in data.items():
+        assert np.array_equal(stored[column], values)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from util.ratelimit import RateLimiter, RateLimitError
+
+
+async def settle(limiter: RateLimiter, timeout: float = 5.0):
+    # Abandoned acquires finish in worker threads, give them time to hand back their slot
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = limiter.stats()
+        if not stats["queued"] and not stats["in_flight"]:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_call_async_releases_slots_of_cancelled_tasks():
+    limiter = RateLimiter("test", 6000, max_concurrency=2)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def request():
+            started.set()
+            await asyncio.sleep(60)
+
+        # Two tasks hold the slots, the others wait in acquire
+        tasks = [asyncio.create_task(limiter.call_async(request)) for _ in range(6)]
+        await started.wait()
+        while limiter.stats()["queued"] < 4:
+            await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await settle(limiter)
+
+        async def ok():
+            return "ok"
+
+        assert await asyncio.wait_for(limiter.call_async(ok), 5) == "ok"
+
+    asyncio.run(main())
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["queued"] == 0
+
+
+def test_call_releases_slot_after_rate_limit_retry():
+    limiter = RateLimiter("test", 6000, base_delay=0.01, max_delay=0.01)
+    answers = iter([RateLimitError(429, retry_after=0.01), "ok"])
+
+    def request():
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert limiter.call(request) == "ok"
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_acquire_async_releases_slot_after_event_loop_closes():
+    limiter = RateLimiter("test", 6000, max_concurrency=1)
+    limiter.acquire()
+
+    async def main():
+        # Still waiting in its worker thread when the loop shuts down, the slot it
+        # is waiting for only frees up afterwards
+        waiting = asyncio.create_task(limiter.acquire_async())
+        while not limiter.stats()["queued"]:
+            await asyncio.sleep(0.01)
+        waiting.cancel()
+        threading.Timer(0.2, limiter.release).start()
+
+    asyncio.run(main())
+    deadline = time.monotonic() + 5
+    while limiter.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["queued"] == 0
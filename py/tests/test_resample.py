@@ -0,0 +1,71 @@
+import numpy as np
+import pandas
+import pytest
+from mockexchange import synthetic_klines
+from util import resample
+from util.klinestore import INTERVAL_MS_MAP, KlineStore
+
+# 2024-01-03 05:00 UTC, a Wednesday, not aligned to any higher interval
+START = 1_704_258_000_000
+
+
+def hourly(count: int, first: int = START) -> dict:
+    times = first + np.arange(count, dtype=np.int64) * INTERVAL_MS_MAP["1h"]
+    return synthetic_klines("BTCUSDT", times, INTERVAL_MS_MAP["1h"])
+
+
+def pandas_resample(data: dict, rule: str) -> pandas.DataFrame:
+    df = pandas.DataFrame(data)
+    df.index = pandas.to_datetime(df["open_time"], unit="ms")
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "vol": "sum"}
+    return df.resample(rule, label="left", closed="left").agg(agg).dropna()
+
+
+@pytest.mark.parametrize(
+    "interval, rule", [("4h", "4h"), ("1d", "1D"), ("1w", "W-MON"), ("1M", "MS")]
+)
+def test_resample_matches_pandas(interval, rule):
+    data = hourly(24 * 70)
+    result = resample.resample(data, "1h", interval)
+    if rule == "W-MON":
+        # Weekly buckets open on Monday
+        expected = pandas.DataFrame(data)
+        expected.index = pandas.to_datetime(expected["open_time"], unit="ms")
+        expected = expected.groupby(expected.index.to_period("W-SUN").start_time).agg(
+            {
+                "open": "first",
+                "high": "max",
+                "low": "min",
+                "close": "last",
+                "vol": "sum",
+            }
+        )
+    else:
+        expected = pandas_resample(data, rule)
+
+    starts = pandas.to_datetime(result["open_time"], unit="ms")
+    assert list(starts) == list(expected.index)
+    for column in ("open", "high", "low", "close", "vol"):
+        assert np.allclose(result[column], expected[column].to_numpy()), column
+    assert (result["close_time"][:-1] == result["open_time"][1:] - 1).all()
+
+
+@pytest.mark.parametrize("base, interval", [("1w", "1M"), ("1h", "3m"), ("1M", "1w")])
+def test_resample_rejects_underivable_intervals(base, interval):
+    with pytest.raises(ValueError):
+        resample.check_derivable(base, interval)
+
+
+def test_resample_store_is_incremental(tmp_path):
+    data = hourly(24 * 10)
+    store = KlineStore(tmp_path)
+    half = 24 * 5 + 7
+    store.append("BTCUSDT", "1h", {c: a[:half] for c, a in data.items()})
+    resample.resample_store(store, "BTCUSDT", "1h", "4h")
+    store.append("BTCUSDT", "1h", {c: a[half:] for c, a in data.items()})
+    resample.resample_store(store, "BTCUSDT", "1h", "4h")
+
+    stored = store.read("BTCUSDT", "4h")
+    full = resample.resample(data, "1h", "4h")
+    for column, values in full.items():
+        assert np.array_equal(stored[column], values), column
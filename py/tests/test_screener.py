@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from fire import Fire
+from screener import Screener_CLI
+from util.klinestore import KlineStore
+
+HOUR_MS = 3_600_000
+# 2024-01-01 00:00 UTC
+START = 1_704_067_200_000
+
+
+def klines(count: int, drift: float) -> dict:
+    times = START + np.arange(count, dtype=np.int64) * HOUR_MS
+    close = 100 + np.cumsum(np.sin(np.arange(count) / 5) + drift)
+    return {
+        "open_time": times,
+        "close_time": times + HOUR_MS - 1,
+        "open": close - 0.5,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "vol": np.full(count, 10.0),
+    }
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    store = KlineStore(tmp_path)
+    for symbol, drift in [("AUSDT", -0.3), ("BUSDT", 0.0), ("CUSDT", 0.3)]:
+        store.append(symbol, "1h", klines(100, drift))
+    return str(tmp_path)
+
+
+def ranked(capsys) -> list:
+    lines = capsys.readouterr().out.splitlines()
+    return [line.split()[1] for line in lines[2:]]
+
+
+@pytest.mark.parametrize("flag, descending", [("true", False), ("false", True)])
+def test_run_parses_ascending_flag(store_path, capsys, flag, descending):
+    Fire(
+        Screener_CLI,
+        command=["run", f"--path={store_path}", "--sort=rsi", f"--ascending={flag}"],
+    )
+    order = ranked(capsys)
+    assert sorted(order) == ["AUSDT", "BUSDT", "CUSDT"]
+    assert order == sorted(order, reverse=descending)
+
+
+def test_run_does_not_refresh_when_disabled(store_path, capsys, monkeypatch):
+    def fetch_many(*args, **kwargs):
+        raise AssertionError("refresh=false must not fetch")
+
+    monkeypatch.setattr("binanceapi.Price_CLI.fetch_many", fetch_many)
+    Fire(Screener_CLI, command=["run", f"--path={store_path}", "--refresh=false"])
+    assert len(ranked(capsys)) == 3
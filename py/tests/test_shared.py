@@ -0,0 +1,77 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas
+import pytest
+from util import shared
+
+
+def frame(rows: int = 1000) -> pandas.DataFrame:
+    return pandas.DataFrame(
+        {
+            "timestamp": np.arange(rows) * 60.0,
+            "close": np.random.default_rng(0).random(rows),
+            # Missing text comes back as NaN
+            "start": [f"s{i}" if i % 7 else np.nan for i in range(rows)],
+            "symbol": pandas.Categorical(["BTCUSDT"] * rows),
+        }
+    )
+
+
+def mean_close(dataset: shared.SharedDataset) -> float:
+    close = dataset.array("close")
+    assert isinstance(close, np.memmap) and not close.flags.writeable
+    return float(close.mean())
+
+
+def test_handle_round_trips_through_pickle(tmp_path):
+    df = frame()
+    with shared.DatasetRegistry(tmp_path) as registry:
+        dataset = pickle.loads(pickle.dumps(registry.publish("btc", df)))
+        pandas.testing.assert_frame_equal(dataset.to_frame(), df)
+        assert dataset.to_frame(["close", "start"]).columns.tolist() == [
+            "close",
+            "start",
+        ]
+        assert len(dataset) == len(df)
+        with pytest.raises(KeyError):
+            dataset.array("missing")
+
+
+def test_last_release_removes_the_dataset(tmp_path):
+    with shared.DatasetRegistry(tmp_path) as registry:
+        registry.publish("btc", frame())
+        registry.acquire("btc")
+        registry.release("btc")
+        assert "btc" in registry
+        registry.release("btc")
+        assert "btc" not in registry
+        assert not list(registry.root.iterdir())
+        with pytest.raises(KeyError):
+            registry.acquire("btc")
+
+
+def test_close_removes_everything(tmp_path):
+    registry = shared.DatasetRegistry(tmp_path)
+    registry.publish("a", frame())
+    registry.publish("b", frame())
+    with pytest.raises(ValueError):
+        registry.publish("a", frame())
+    registry.close()
+    assert not registry.root.exists()
+
+
+def test_workers_read_the_published_columns(tmp_path):
+    df = frame(100_000)
+    with shared.DatasetRegistry(tmp_path) as registry:
+        registry.publish("btc", df)
+        with ProcessPoolExecutor(2) as pool:
+            futures = []
+            for _ in range(4):
+                future = pool.submit(mean_close, registry.acquire("btc"))
+                future.add_done_callback(lambda _: registry.release("btc"))
+                futures.append(future)
+            registry.release("btc")
+            results = [future.result() for future in futures]
+        assert results == [pytest.approx(df["close"].mean())] * 4
+        assert "btc" not in registry
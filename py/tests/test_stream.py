@@ -0,0 +1,39 @@
+import json
+import numpy as np
+import pytest
+from binanceapi import Price_CLI
+from stream import KlineStreamer
+
+RAW = [1700000000000, "0.00001234", "0.00001250", "0.00001200", "0.00001240", "5e9"]
+
+
+def message(symbol: str) -> str:
+    open_time, open_, high, low, close, vol = RAW
+    kline = {
+        "t": open_time,
+        "T": open_time + 59_999,
+        "s": symbol,
+        "i": "1m",
+        "o": open_,
+        "h": high,
+        "l": low,
+        "c": close,
+        "v": vol,
+        "x": True,
+    }
+    return json.dumps(
+        {"stream": f"{symbol.lower()}@kline_1m", "data": {"e": "kline", "k": kline}}
+    )
+
+
+@pytest.mark.parametrize("symbol", ["PEPEUSDT", "BTCUSDT"])
+def test_stream_scales_prices_like_rest(tmp_path, symbol):
+    streamer = KlineStreamer([symbol], "1m", path=str(tmp_path / "store"))
+    event = streamer.handle_message(message(symbol))
+    rest = Price_CLI().klines_to_columns(symbol, [[*RAW, RAW[0] + 59_999]])
+    for column in ("open", "high", "low", "close", "vol"):
+        assert event[column] == rest[column][0]
+
+    streamer.flush()
+    stored = streamer.store.read(symbol, "1m")
+    assert np.array_equal(stored["close"], rest["close"])
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas
+
+BAR_KINDS = ("tick", "volume", "dollar")
+
+# Columns of a Binance aggTrades CSV dump (data.binance.vision)
+AGG_TRADE_CSV_COLUMNS = [
+    "agg_trade_id",
+    "price",
+    "quantity",
+    "first_trade_id",
+    "last_trade_id",
+    "transact_time",
+    "is_buyer_maker",
+    "is_best_match",
+]
+
+
+def bar_interval(kind: str, threshold: float) -> str:
+    """
+    Name under which bars are stored in place of a time interval, e.g. volume_1000.
+    """
+    return f"{kind}_{np.format_float_positional(threshold, trim='-')}"
+
+
+class BarAggregator:
+    """
+    Turn a stream of trades into tick, volume or dollar bars.
+
+    Trades are fed in batches of arrays and only the still-open bar is carried
+    between batches, so memory does not grow with the number of trades. Bar k
+    holds the trades whose cumulative measure (count, base volume or quote
+    volume) before the trade lies in [k * threshold, (k + 1) * threshold): the
+    trade crossing a threshold closes its bar. A single large trade may cross
+    several thresholds, so bars are only emitted when they contain trades.
+
+    Bars are keyed by open time in the kline store, so a bar opening in the same
+    millisecond as the previous one is merged into it instead of replacing it.
+    A closed bar whose trades all share one millisecond is held back until the
+    next bar shows whether it needs merging, or until flush.
+    """
+
+    def __init__(self, kind: str, threshold: float):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Unsupported bar kind: {kind}")
+        if threshold <= 0:
+            raise ValueError("Threshold must be positive")
+        self.kind = kind
+        self.threshold = threshold
+        self.total = 0.0
+        self.trades = 0
+        self.open_bar = None
+        self.held = None
+
+    def _measure(self, price: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        if self.kind == "tick":
+            return np.ones(len(price))
+        if self.kind == "volume":
+            return qty
+        return price * qty
+
+    def add(self, time, price, qty) -> dict:
+        """
+        Aggregate a batch of trades, in trade order.
+
+        Args:
+            time: Array of trade times in milliseconds.
+            price: Array of trade prices.
+            qty: Array of trade quantities in base asset.
+
+        Returns:
+            dict: Kline store columns of the bars completed by this batch.
+        """
+        time = np.asarray(time, dtype=np.int64)
+        price = np.asarray(price, dtype=np.float64)
+        qty = np.asarray(qty, dtype=np.float64)
+        if len(time) == 0:
+            return self._empty()
+
+        measure = self._measure(price, qty)
+        cumulative = self.total + np.cumsum(measure)
+        index = np.floor((cumulative - measure) / self.threshold).astype(np.int64)
+        self.total = float(cumulative[-1])
+        self.trades += len(time)
+
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(index)) + 1])
+        ends = np.concatenate([starts[1:] - 1, [len(time) - 1]])
+        bars = {
+            "index": index[starts],
+            "open_time": time[starts],
+            "close_time": time[ends],
+            "open": price[starts],
+            "high": np.maximum.reduceat(price, starts),
+            "low": np.minimum.reduceat(price, starts),
+            "close": price[ends],
+            "vol": np.add.reduceat(qty, starts),
+        }
+
+        # The first bar of the batch may continue the bar left open by the previous one
+        if self.open_bar is not None:
+            if self.open_bar["index"][0] == bars["index"][0]:
+                bars["open_time"][0] = self.open_bar["open_time"][0]
+                bars["open"][0] = self.open_bar["open"][0]
+                bars["high"][0] = max(bars["high"][0], self.open_bar["high"][0])
+                bars["low"][0] = min(bars["low"][0], self.open_bar["low"][0])
+                bars["vol"][0] += self.open_bar["vol"][0]
+            else:
+                bars = {
+                    c: np.concatenate([self.open_bar[c], a]) for c, a in bars.items()
+                }
+
+        # Only the last bar can still be open
+        closed = (bars["index"] + 1) * self.threshold <= self.total
+        if closed[-1]:
+            self.open_bar = None
+        else:
+            self.open_bar = {c: a[-1:] for c, a in bars.items()}
+        return self._release({c: a[closed] for c, a in bars.items() if c != "index"})
+
+    def _release(self, bars: dict) -> dict:
+        if self.held is not None:
+            bars = {c: np.concatenate([self.held[c], a]) for c, a in bars.items()}
+            self.held = None
+        bars = merge_same_open_time(bars)
+        times = bars["open_time"]
+        # Only a bar opening and closing in one millisecond can share its open time
+        if len(times) and times[-1] == bars["close_time"][-1]:
+            self.held = {c: a[-1:] for c, a in bars.items()}
+            bars = {c: a[:-1] for c, a in bars.items()}
+        return bars
+
+    def flush(self, partial: bool = True) -> dict:
+        """
+        Emit the held back bar, and close the open bar, e.g. at the end of a recorded file.
+
+        Args:
+            partial (bool): Also emit the open bar, which has not reached the threshold.
+
+        Returns:
+            dict: Kline store columns of the remaining bars.
+        """
+        bars = self.held if self.held is not None else self._empty()
+        self.held = None
+        if partial and self.open_bar is not None:
+            open_bar = {c: a for c, a in self.open_bar.items() if c != "index"}
+            bars = {c: np.concatenate([a, open_bar[c]]) for c, a in bars.items()}
+            bars = merge_same_open_time(bars)
+        self.open_bar = None
+        return bars
+
+    def _empty(self) -> dict:
+        return {
+            "open_time": np.empty(0, dtype=np.int64),
+            "close_time": np.empty(0, dtype=np.int64),
+            "open": np.empty(0),
+            "high": np.empty(0),
+            "low": np.empty(0),
+            "close": np.empty(0),
+            "vol": np.empty(0),
+        }
+
+
+def merge_same_open_time(bars: dict) -> dict:
+    """
+    Merge consecutive bars opening in the same millisecond into one bar.
+
+    Args:
+        bars (dict): Kline store columns of bars in trade order.
+
+    Returns:
+        dict: The bars, with unique open times.
+    """
+    times = bars["open_time"]
+    if len(times) < 2 or (np.diff(times) > 0).all():
+        return bars
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(times)) + 1])
+    ends = np.concatenate([starts[1:] - 1, [len(times) - 1]])
+    return {
+        "open_time": times[starts],
+        "close_time": bars["close_time"][ends],
+        "open": bars["open"][starts],
+        "high": np.maximum.reduceat(bars["high"], starts),
+        "low": np.minimum.reduceat(bars["low"], starts),
+        "close": bars["close"][ends],
+        "vol": np.add.reduceat(bars["vol"], starts),
+    }
+
+
+def agg_trades_to_arrays(trades: list) -> tuple:
+    """
+    Convert a page of aggTrades from the REST API into (time, price, qty) arrays.
+    """
+    time = np.fromiter((t["T"] for t in trades), dtype=np.int64, count=len(trades))
+    price = np.asarray([t["p"] for t in trades], dtype=np.float64)
+    qty = np.asarray([t["q"] for t in trades], dtype=np.float64)
+    return time, price, qty
+
+
+def read_trade_file(path: str, chunk_size: int = 1_000_000):
+    """
+    Read a recorded Binance aggTrades CSV file in chunks of (time, price, qty) arrays.
+    Files with or without a header row are accepted, and microsecond trade times
+    (used by newer dumps) are converted to milliseconds.
+
+    Args:
+        path (str): Path to the CSV file.
+        chunk_size (int): Number of trades per chunk.
+
+    Yields:
+        tuple: (time, price, qty) arrays.
+    """
+    with open(path, "r") as f:
+        first_line = f.readline()
+    has_header = not first_line[:1].isdigit()
+    reader = pandas.read_csv(
+        path,
+        header=0 if has_header else None,
+        names=(
+            None if has_header else AGG_TRADE_CSV_COLUMNS[: first_line.count(",") + 1]
+        ),
+        usecols=["price", "quantity", "transact_time"],
+        dtype={"price": np.float64, "quantity": np.float64, "transact_time": np.int64},
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        time = chunk["transact_time"].to_numpy()
+        if len(time) and time[0] > 10**14:
+            time = time // 1000
+        yield time, chunk["price"].to_numpy(), chunk["quantity"].to_numpy()
@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+from pathlib import Path
+
+
+class CoverageIndex:
+    """
+    Sorted set of open time ranges (inclusive, in milliseconds) already fetched
+    for one symbol/interval, stored as a small JSON file next to the data.
+    """
+
+    def __init__(self, path: str, candle_ms: int, ranges: list = None):
+        self.path = Path(path)
+        self.candle_ms = candle_ms
+        self.ranges = ranges or []
+
+    @classmethod
+    def load(cls, path: str, candle_ms: int):
+        """
+        Load an index file, or return an empty index if it does not exist.
+
+        Args:
+            path (str): Path to the index file.
+            candle_ms (int): Candle width in milliseconds.
+
+        Returns:
+            CoverageIndex: The index.
+        """
+        path = Path(path)
+        if not path.exists():
+            return cls(path, candle_ms)
+        with open(path, "r") as f:
+            ranges = json.load(f)["ranges"]
+        return cls(path, candle_ms, [tuple(r) for r in ranges])
+
+    @classmethod
+    def from_open_times(cls, path: str, candle_ms: int, open_times):
+        """
+        Build an index from stored open times: every run of consecutive candles is one range.
+
+        Args:
+            path (str): Path the index will be saved to.
+            candle_ms (int): Candle width in milliseconds.
+            open_times: Sorted array of open times in milliseconds.
+
+        Returns:
+            CoverageIndex: The index.
+        """
+        times = np.asarray(open_times, dtype=np.int64)
+        if len(times) == 0:
+            return cls(path, candle_ms)
+        breaks = np.flatnonzero(np.diff(times) > candle_ms)
+        starts = np.concatenate([times[:1], times[breaks + 1]])
+        ends = np.concatenate([times[breaks], times[-1:]])
+        return cls(path, candle_ms, list(zip(starts.tolist(), ends.tolist())))
+
+    def save(self):
+        """
+        Write the index atomically.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"candle_ms": self.candle_ms, "ranges": self.ranges}, f)
+        os.replace(tmp_path, self.path)
+
+    def add(self, start: int, end: int):
+        """
+        Mark the open times in [start, end] as fetched, merging touching ranges.
+
+        Args:
+            start (int): First open time in milliseconds.
+            end (int): Last open time in milliseconds.
+        """
+        if start > end:
+            return
+        merged = []
+        for range_start, range_end in self.ranges:
+            # Ranges closer than one candle apart have no missing candle in between
+            if range_end + self.candle_ms < start or end + self.candle_ms < range_start:
+                merged.append((range_start, range_end))
+            else:
+                start = min(start, range_start)
+                end = max(end, range_end)
+        merged.append((start, end))
+        self.ranges = sorted(merged)
+
+    def missing(self, start: int, end: int) -> list:
+        """
+        List the parts of [start, end] that are not covered yet.
+
+        Args:
+            start (int): First open time in milliseconds.
+            end (int): Last open time in milliseconds.
+
+        Returns:
+            list: (start, end) tuples in milliseconds, oldest first.
+        """
+        gaps = []
+        cursor = start
+        for range_start, range_end in self.ranges:
+            if range_end < cursor:
+                continue
+            if range_start > end:
+                break
+            if range_start > cursor:
+                gaps.append((cursor, range_start - 1))
+            cursor = max(cursor, range_end + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
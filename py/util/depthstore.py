@@ -0,0 +1,213 @@
+import numpy as np
+from pathlib import Path
+
+MAGIC = b"DPTH"
+VERSION = 1
+
+# 64-byte file header, followed by `capacity` fixed-width records
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u4"),
+        ("levels", "<u4"),
+        ("reserved", "<u4"),
+        ("capacity", "<u8"),
+        ("count", "<u8"),
+        ("padding", "V32"),
+    ]
+)
+
+
+def record_dtype(levels: int) -> np.dtype:
+    """
+    Fixed-width record of one snapshot: time in milliseconds, then float32 price
+    and quantity arrays per book side. Missing levels are NaN.
+    """
+    return np.dtype(
+        [
+            ("time", "<i8"),
+            ("bid_price", "<f4", (levels,)),
+            ("bid_qty", "<f4", (levels,)),
+            ("ask_price", "<f4", (levels,)),
+            ("ask_qty", "<f4", (levels,)),
+        ]
+    )
+
+
+class DepthRing:
+    """
+    Order-book snapshots of one symbol in a fixed-size binary ring file.
+
+    The file holds a header and `capacity` records of the same width, so the
+    snapshot at position i is at a known offset and the whole file is a memory
+    map. Once full, the oldest snapshots are overwritten. Records are written
+    in time order, so a time range is found by binary search on each of the
+    two sorted segments of the ring.
+    """
+
+    def __init__(self, path: str, levels: int = 20, capacity: int = 2**20):
+        self.path = Path(path)
+        if not self.path.exists():
+            self._create(levels, capacity)
+        self.header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        if self.header["magic"][0] != MAGIC:
+            raise ValueError(f"Not a depth ring file: {self.path}")
+        self.levels = int(self.header["levels"][0])
+        self.capacity = int(self.header["capacity"][0])
+        self.dtype = record_dtype(self.levels)
+        self.records = np.memmap(
+            self.path,
+            dtype=self.dtype,
+            mode="r+",
+            offset=HEADER_DTYPE.itemsize,
+            shape=(self.capacity,),
+        )
+
+    def _create(self, levels: int, capacity: int):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["levels"] = levels
+        header["capacity"] = capacity
+        with open(self.path, "wb") as f:
+            f.write(header.tobytes())
+            # Sparse on most filesystems until records are written
+            f.truncate(HEADER_DTYPE.itemsize + record_dtype(levels).itemsize * capacity)
+
+    @property
+    def count(self) -> int:
+        """
+        Number of snapshots ever written, including the overwritten ones.
+        """
+        return int(self.header["count"][0])
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, time: int, bids, asks):
+        """
+        Write one snapshot.
+
+        Args:
+            time (int): Snapshot time in milliseconds, not older than the last one.
+            bids: Sequence of (price, qty) pairs, best first.
+            asks: Sequence of (price, qty) pairs, best first.
+        """
+        record = np.zeros(1, dtype=self.dtype)
+        record["time"] = time
+        for side, levels in (("bid", bids), ("ask", asks)):
+            values = np.full((self.levels, 2), np.nan, dtype=np.float32)
+            levels = np.asarray(levels, dtype=np.float32).reshape(-1, 2)[: self.levels]
+            values[: len(levels)] = levels
+            record[f"{side}_price"] = values[:, 0]
+            record[f"{side}_qty"] = values[:, 1]
+
+        count = self.count
+        if len(self) > 0 and time < self.records["time"][(count - 1) % self.capacity]:
+            raise ValueError("Snapshots must be appended in time order")
+        self.records[count % self.capacity] = record[0]
+        # The count is bumped after the record, see read for the slot being overwritten
+        self.header["count"] = count + 1
+
+    def flush(self):
+        """
+        Flush written snapshots to disk.
+        """
+        self.records.flush()
+        self.header.flush()
+
+    def read(self, start: int = None, end: int = None) -> np.ndarray:
+        """
+        Read the snapshots of a time range in time order.
+
+        Once the ring is full, the slot of the oldest snapshot is the next one
+        overwritten and may be half written, so at most `capacity - 1` snapshots
+        are readable. Snapshots overwritten by a writer while they are copied are
+        dropped as well.
+
+        Args:
+            start (int): Inclusive lower time bound in milliseconds.
+            end (int): Inclusive upper time bound in milliseconds.
+
+        Returns:
+            np.ndarray: Structured array of records (see record_dtype).
+        """
+        count = self.count
+        readable = min(count, self.capacity - 1)
+        first = (count - readable) % self.capacity
+        if first + readable <= self.capacity:
+            segments = [(0, self.records[first : first + readable])]
+        else:
+            head = self.capacity - first
+            segments = [
+                (0, self.records[first:]),
+                (head, self.records[: readable - head]),
+            ]
+
+        parts = []
+        for position, segment in segments:
+            times = segment["time"]
+            lo = 0 if start is None else np.searchsorted(times, start, side="left")
+            hi = (
+                len(times) if end is None else np.searchsorted(times, end, side="right")
+            )
+            parts.append((position + lo, np.array(segment[lo:hi])))
+
+        # Writes since `count` went to the oldest slots, the last one may be in progress
+        overwritten = self.count - count + readable - self.capacity + 1
+        parts = [part[max(0, overwritten - position) :] for position, part in parts]
+        return np.concatenate(parts)
+
+
+def ring_path(root: str, symbol: str) -> Path:
+    return Path(root) / f"{symbol}.depth"
+
+
+def book_imbalance(records: np.ndarray, levels: int = None) -> np.ndarray:
+    """
+    (bid qty - ask qty) / (bid qty + ask qty) over the best `levels` of each snapshot.
+
+    Args:
+        records (np.ndarray): Snapshots from DepthRing.read.
+        levels (int): Number of levels per side, defaults to all of them.
+
+    Returns:
+        np.ndarray: Imbalance in [-1, 1] per snapshot, NaN for an empty book.
+    """
+    bids = np.nansum(records["bid_qty"][:, :levels], axis=1, dtype=np.float64)
+    asks = np.nansum(records["ask_qty"][:, :levels], axis=1, dtype=np.float64)
+    total = bids + asks
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (bids - asks) / total, np.nan)
+
+
+def mid_and_spread(records: np.ndarray) -> tuple:
+    """
+    Mid price and relative spread of the best levels of each snapshot.
+
+    Returns:
+        tuple: (mid, spread) float64 arrays.
+    """
+    bid = records["bid_price"][:, 0].astype(np.float64)
+    ask = records["ask_price"][:, 0].astype(np.float64)
+    mid = (bid + ask) / 2
+    return mid, (ask - bid) / mid
+
+
+def align(times, record_times, values) -> np.ndarray:
+    """
+    Take the value of the last snapshot at or before each time, e.g. each candle close.
+
+    Args:
+        times: Array of times in milliseconds.
+        record_times: Sorted snapshot times in milliseconds.
+        values: One value per snapshot.
+
+    Returns:
+        np.ndarray: One value per time, NaN before the first snapshot.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    idx = np.searchsorted(record_times, np.asarray(times, dtype=np.int64), "right") - 1
+    aligned = values[np.maximum(idx, 0)] if len(values) else np.full(len(idx), np.nan)
+    return np.where(idx >= 0, aligned, np.nan)
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas
+from .file import is_csv, resolve
+from .integrity import frame_to_columns, kline_csv_usecols, sorted_unique
+from .klinestore import KlineStore, format_times, month_bounds
+
+# Normalized columns of every source, open times in milliseconds
+FEED_COLUMNS = ["open", "high", "low", "close", "vol"]
+
+
+def iter_csv(path: str, chunk_size: int = 1_000_000):
+    """
+    Read a Binance or BingX kline CSV file in chunks, normalized to FEED_COLUMNS.
+    The open time comes from the epoch timestamp column, so the local-time date
+    strings of BingX files do not matter.
+
+    Yields:
+        dict: open_time and FEED_COLUMNS arrays of up to `chunk_size` rows.
+    """
+    usecols = kline_csv_usecols(path)
+    reader = pandas.read_csv(
+        path,
+        usecols=usecols,
+        dtype={c: np.float64 for c in usecols},
+        chunksize=chunk_size,
+    )
+    with reader:
+        for df in reader:
+            yield frame_to_columns(df)
+
+
+def iter_store(path: str):
+    """
+    Read a <store>/<symbol>/<interval> dataset one month partition at a time.
+
+    Yields:
+        dict: open_time and FEED_COLUMNS arrays of one partition.
+    """
+    store, symbol, interval = KlineStore.from_path(path)
+    columns = ["open_time", *FEED_COLUMNS]
+    for month in store.partitions(symbol, interval):
+        start, end = month_bounds(month)
+        yield store.read(symbol, interval, start, end - 1, columns)
+
+
+def iter_source(path: str, chunk_size: int = 1_000_000):
+    """
+    Read a kline CSV file or a kline store dataset in chunks.
+    """
+    if is_csv(path):
+        return iter_csv(resolve(path), chunk_size)
+    return iter_store(resolve(path))
+
+
+def checked(name: str, chunks):
+    """
+    Pass chunks through, dropping empty ones and raising ValueError unless open
+    times strictly increase across the whole source.
+    """
+    last = None
+    for chunk in chunks:
+        times = chunk["open_time"]
+        if not len(times):
+            continue
+        if (np.diff(times) <= 0).any() or (last is not None and times[0] <= last):
+            raise ValueError(
+                f"Source {name} is not sorted and unique by open time, repair it first."
+            )
+        last = times[-1]
+        yield chunk
+
+
+def merge_sources(sources: dict):
+    """
+    Merge sorted kline sources by open time, one block at a time (a k-way merge
+    of chunks rather than of rows). Each block covers the open times up to the
+    smallest last open time of the buffered chunks, so no later chunk of any
+    source can still hold one of them and memory stays bounded by one chunk per source.
+
+    Args:
+        sources (dict): Source name to an iterator of column chunks (see iter_source).
+
+    Yields:
+        dict: open_time, and <name>_<column> arrays for every source and FEED_COLUMNS,
+            NaN where a source has no candle at that open time.
+    """
+    names = list(sources)
+    iterators = {name: checked(name, chunks) for name, chunks in sources.items()}
+    buffers = {name: next(iterators[name], None) for name in names}
+
+    while any(buffer is not None for buffer in buffers.values()):
+        live = {name: b for name, b in buffers.items() if b is not None}
+        watermark = min(b["open_time"][-1] for b in live.values())
+
+        parts = {}
+        for name, buffer in live.items():
+            split = np.searchsorted(buffer["open_time"], watermark, side="right")
+            parts[name] = {c: a[:split] for c, a in buffer.items()}
+            if split < len(buffer["open_time"]):
+                buffers[name] = {c: a[split:] for c, a in buffer.items()}
+            else:
+                buffers[name] = next(iterators[name], None)
+
+        # A stable sort merges the sorted runs of the parts
+        times = sorted_unique(np.concatenate([p["open_time"] for p in parts.values()]))
+        block = {"open_time": times}
+        for name in names:
+            part = parts.get(name)
+            positions = None
+            if part is not None:
+                positions = np.searchsorted(times, part["open_time"])
+            for column in FEED_COLUMNS:
+                values = np.full(len(times), np.nan)
+                if positions is not None:
+                    values[positions] = part[column]
+                block[f"{name}_{column}"] = values
+        yield block
+
+
+def cross_fields(block: dict, names: list) -> dict:
+    """
+    Per open time cross-exchange fields of a merged block.
+
+    Args:
+        block (dict): Block from merge_sources.
+        names (list): Source names.
+
+    Returns:
+        dict: venues (sources with a candle), spread ((max - min) / mean close,
+            NaN below two venues), <name>_premium (close / mean close - 1) and
+            <name>_share (share of the summed volume).
+    """
+    closes = np.stack([block[f"{name}_close"] for name in names])
+    volumes = np.nan_to_num(np.stack([block[f"{name}_vol"] for name in names]))
+    venues = np.count_nonzero(~np.isnan(closes), axis=0)
+    total = volumes.sum(axis=0)
+
+    fields = {"venues": venues}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(closes, axis=0) / venues
+        # fmax/fmin skip NaN without warning about all-NaN columns
+        spread = (np.fmax.reduce(closes) - np.fmin.reduce(closes)) / mean
+        fields["spread"] = np.where(venues >= 2, spread, np.nan)
+        for i, name in enumerate(names):
+            fields[f"{name}_premium"] = closes[i] / mean - 1
+            fields[f"{name}_share"] = np.where(total > 0, volumes[i] / total, np.nan)
+    return fields
+
+
+def to_columns(block: dict, names: list) -> dict:
+    """
+    Output columns of a merged block in order: timestamp (seconds), UTC date and
+    start strings, the source columns, then the cross-exchange fields.
+    """
+    dates, datetimes = format_times(block["open_time"])
+    columns = {
+        "timestamp": block["open_time"] / 1000,
+        "date": dates,
+        "start": datetimes,
+    }
+    for name in names:
+        for column in FEED_COLUMNS:
+            columns[f"{name}_{column}"] = block[f"{name}_{column}"]
+    columns.update(cross_fields(block, names))
+    return columns
+
+
+def format_rows(columns: dict) -> str:
+    """
+    Format columns as CSV rows, without header. Floats are written with repr,
+    like the kline CSV writers, and NaN as an empty field.
+    """
+    fields = []
+    for values in columns.values():
+        if values.dtype.kind == "f":
+            text = np.array(list(map(repr, values.tolist())), dtype=object)
+            text[np.isnan(values)] = ""
+            fields.append(text.tolist())
+        else:
+            fields.append(list(map(str, values.tolist())))
+    return "".join(",".join(row) + "\n" for row in zip(*fields))
@@ -1,9 +1,46 @@
 import re
 import os
+import csv
+import hashlib
+import io
+import numpy as np
 import pandas
 import json
+import zipfile
 from pathlib import Path
 
+# Column types of the kline CSV schema. Timestamps are epoch seconds with a
+# fraction, and the date strings are kept as text. The type column is left
+# to inference, older files hold "U"/"D" strings or blanks there.
+KLINE_DTYPES = {
+    "symbol": "category",
+    "timestamp": "float64",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "vol": "float64",
+    "volume": "float64",
+}
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Parsed CSV files are cached under this directory, named by the hash of their path
+CACHE_ROOT = "ignore/cache/frames"
+CACHE_VERSION = 2
+
+# Compression of CSV files by extension, as pandas infers it
+CSV_COMPRESSION = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".zip": "zip",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+# Columnar output formats by extension
+COLUMNAR_FORMATS = {".npz": "npz", ".parquet": "parquet", ".feather": "feather"}
+
 
 def resolve(path: str) -> Path:
     """
@@ -18,26 +55,332 @@ def resolve(path: str) -> Path:
     return Path(os.path.join(os.getcwd(), path)).resolve()
 
 
-def get_source(source: str) -> pandas.DataFrame:
+def is_csv(path: str) -> bool:
+    """
+    Check whether a path points to a CSV file by its extension.
+    """
+    return re.search("(.csv$)", str(path)) is not None
+
+
+def get_source(
+    source: str,
+    usecols: list = None,
+    prices: str = "float64",
+    engine: str = "c",
+    cache: bool = True,
+    cache_root: str = None,
+) -> pandas.DataFrame:
     """
-    Get the source data from a CSV file.
+    Get the source data from a CSV file or a kline store dataset.
+
+    Known kline columns are parsed with fixed types (see KLINE_DTYPES) instead
+    of being inferred, and only the requested columns are parsed. The parsed
+    columns of a CSV file are cached in a binary file under `cache_root`, keyed
+    by the modification time and size of the CSV file, so later loads of an
+    unchanged file skip text parsing for every column parsed before.
 
     Args:
-        source (str): The path to the CSV file.
+        source (str): The path to the CSV file, or to a <store>/<symbol>/<interval> directory.
+        usecols (list): Columns to load, defaults to all of them.
+        prices (str): Type of the price columns, "float64" or "float32".
+        engine (str): pandas CSV parser, "c" or "pyarrow" (needs the pyarrow package).
+        cache (bool): Read and write the parsed-frame cache of a CSV file.
+        cache_root (str): Directory of the parsed-frame cache files, defaults to CACHE_ROOT.
 
     Returns:
-        dict: A dictionary containing the dataframe, filename, and filepath.
+        pandas.DataFrame: The data.
     """
-    if re.search("(.csv$)", source) is None:
+    source_path = resolve(source)
+
+    if os.path.isdir(source_path):
+        from .klinestore import KlineStore
+
+        store, symbol, interval = KlineStore.from_path(source_path)
+        print(f"Imported DataFrame from kline store {source_path}")
+        df = store.read_frame(symbol, interval)
+        return df[list(usecols)] if usecols else df
+
+    data_format, _ = file_format(source_path)
+    if data_format != "csv" and data_format != "npz":
         raise ValueError("CSV not found")
 
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"File not found: {source_path}")
+
+    if data_format == "npz":
+        print(f"Imported DataFrame from {source_path}")
+        return read_frame_npz(source_path, usecols=usecols)
+
+    dtypes = kline_dtypes(prices)
+    if not cache:
+        print(f"Imported DataFrame from {source_path}")
+        return read_csv_typed(
+            source_path, dtypes, sep=",", usecols=usecols, engine=engine
+        )
+
+    stat = os.stat(source_path)
+    key = {
+        "version": CACHE_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "prices": prices,
+    }
+    cache_path = frame_cache_path(source_path, cache_root)
+    try:
+        df = read_frame_npz(cache_path, key, usecols)
+    except ValueError:
+        # Some requested columns were not parsed before
+        df = None
+    if df is not None:
+        print(f"Imported DataFrame from {source_path} (cached)")
+        return df
+
+    df = read_csv_typed(source_path, dtypes, sep=",", usecols=usecols, engine=engine)
+    cached = df
+    if usecols:
+        # Keep the columns cached before, in file order
+        stored = read_frame_npz(cache_path, key)
+        if stored is not None and len(stored) == len(df):
+            header = pandas.read_csv(source_path, nrows=0).columns
+            stored = stored.drop(columns=df.columns, errors="ignore")
+            cached = pandas.concat([stored, df], axis=1)
+            cached = cached[[c for c in header if c in cached.columns]]
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_frame_npz(cache_path, cached, meta=key)
+    except OSError as e:
+        print(f"Could not write cache {cache_path}: {e}")
+    print(f"Imported DataFrame from {source_path}")
+    return df
+
+
+def frame_cache_path(source_path: Path, cache_root: str = None) -> Path:
+    """
+    Path of the parsed-frame cache file of a CSV file.
+    """
+    digest = hashlib.sha1(str(resolve(source_path)).encode("utf-8")).hexdigest()
+    return resolve(cache_root or CACHE_ROOT) / f"{digest}.npz"
+
+
+def kline_dtypes(prices: str = "float64") -> dict:
+    """
+    Column types of the kline CSV schema with the given price type.
+    """
+    return dict(KLINE_DTYPES, **{c: prices for c in PRICE_COLUMNS})
+
+
+def read_csv_typed(source, dtypes: dict, **kwargs) -> pandas.DataFrame:
+    """
+    Read a CSV file with fixed column types where its values allow them. If one
+    column does not parse with its type, e.g. text in a numeric column, the file
+    is read again with inferred types and only the columns that convert cleanly
+    get their fixed type, instead of failing the whole file.
+
+    Args:
+        source (str | Path | io.BytesIO): The CSV file or buffer.
+        dtypes (dict): Column types, e.g. kline_dtypes().
+        **kwargs: Other arguments of pandas.read_csv.
+
+    Returns:
+        pandas.DataFrame: The data.
+    """
+    try:
+        return pandas.read_csv(source, dtype=dtypes, **kwargs)
+    except (ValueError, TypeError):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        df = pandas.read_csv(source, **kwargs)
+    for column, dtype in dtypes.items():
+        if column in df.columns:
+            try:
+                df[column] = df[column].astype(dtype)
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def read_tail(
+    source: str, rows: int, usecols: list = None, prices: str = "float64"
+) -> pandas.DataFrame:
+    """
+    Read only the last rows of a CSV file or a kline store dataset.
+
+    For a plain CSV file, the start of the last `rows` lines is found by reading
+    backwards from the end (see tail_offset), and only the header and those lines
+    are parsed, so the cost does not grow with the file. Other formats are read
+    in full with get_source.
+
+    Args:
+        source (str): The path to the CSV file, or to a <store>/<symbol>/<interval> directory.
+        rows (int): Number of rows.
+        usecols (list): Columns to load, defaults to all of them.
+        prices (str): Type of the price columns, "float64" or "float32".
+
+    Returns:
+        pandas.DataFrame: The last rows, indexed from 0.
+    """
     source_path = resolve(source)
 
+    if os.path.isdir(source_path):
+        from .klinestore import KlineStore, to_frame
+
+        store, symbol, interval = KlineStore.from_path(source_path)
+        df = to_frame(symbol, store.read_tail(symbol, interval, rows))
+        return df[list(usecols)] if usecols else df
+
+    data_format, compression = file_format(source_path)
+    if data_format != "csv" or compression is not None:
+        df = get_source(source, usecols=usecols, prices=prices)
+        return df.tail(rows).reset_index(drop=True)
+
     if not os.path.exists(source_path):
         raise FileNotFoundError(f"File not found: {source_path}")
 
-    print(f"Imported DataFrame from {source_path}")
-    return pandas.read_csv(source_path, sep=",")
+    with open(source_path, "rb") as f:
+        header = f.readline()
+        # The header is one of the lines tail_offset counts
+        f.seek(max(tail_offset(source_path, rows), len(header)))
+        body = f.read()
+    return read_csv_typed(
+        io.BytesIO(header + body), kline_dtypes(prices), usecols=usecols
+    )
+
+
+def select_columns(columns, usecols: list) -> list:
+    """
+    Pick `usecols` in file order, like pandas.read_csv does.
+    """
+    missing = set(usecols) - set(columns)
+    if missing:
+        raise ValueError(
+            f"Usecols do not match columns, columns expected but not found: {sorted(missing)}"
+        )
+    return [c for c in columns if c in usecols]
+
+
+def encode_columns(series: list) -> tuple:
+    """
+    Encode columns as plain numpy arrays, as stored by write_frame_npz and the
+    shared dataset registry. Text and categorical columns are dictionary encoded
+    as int32 codes (-1 for missing values) and fixed-width unique strings.
+
+    Args:
+        series (list): The columns as pandas.Series.
+
+    Returns:
+        tuple: (arrays, kinds): arrays keyed c<i> (values or codes) and u<i> (unique
+            strings) for the i-th column, and the kind of every column: array, text or category.
+    """
+    arrays = {}
+    kinds = {}
+    for i, values in enumerate(series):
+        column = values.name
+        if isinstance(values.dtype, pandas.CategoricalDtype):
+            kinds[column] = "category"
+        elif values.dtype.kind in "biufcmM":
+            kinds[column] = "array"
+            arrays[f"c{i}"] = values.to_numpy()
+            continue
+        else:
+            kinds[column] = "text"
+        codes, uniques = pandas.factorize(values)
+        arrays[f"c{i}"] = codes.astype(np.int32)
+        arrays[f"u{i}"] = np.asarray(uniques.astype(str), dtype=str)
+    return arrays, kinds
+
+
+def decode_columns(
+    columns: list, kinds: dict, load, usecols: list = None
+) -> pandas.DataFrame:
+    """
+    Build a DataFrame from arrays written by encode_columns.
+
+    Args:
+        columns (list): All column names, in stored order.
+        kinds (dict): The kind of every column.
+        load (callable): Returns the array of a key, e.g. c0.
+        usecols (list): Columns to load, defaults to all of them.
+
+    Returns:
+        pandas.DataFrame: The selected columns.
+    """
+    selected = select_columns(columns, usecols) if usecols else columns
+    data = {}
+    for column in selected:
+        i = columns.index(column)
+        values = load(f"c{i}")
+        kind = kinds[column]
+        if kind == "category":
+            values = pandas.Categorical.from_codes(values, load(f"u{i}"))
+        elif kind == "text":
+            # Code -1 picks the NaN appended to the unique strings
+            uniques = np.append(load(f"u{i}").astype(object), np.nan)
+            values = uniques[values]
+        data[column] = values
+    return pandas.DataFrame(data, columns=selected)
+
+
+def write_frame_npz(
+    path: Path,
+    df: pandas.DataFrame,
+    columns: list = None,
+    index_label: str = None,
+    meta: dict = None,
+):
+    """
+    Write a DataFrame to a .npz file, one array per column, replacing it atomically.
+    Text and categorical columns are dictionary encoded as integer codes (-1 for
+    missing values) and fixed-width unique strings, so the file loads without pickle.
+
+    Args:
+        path (Path): The path to the .npz file.
+        df (pandas.DataFrame): The DataFrame to write.
+        columns (list): Columns to write, defaults to all of them.
+        index_label (str): Write the index first as a column of this name.
+        meta (dict): Values stored with the data, e.g. a cache key checked by read_frame_npz.
+    """
+    series = [df[c] for c in columns or df.columns]
+    if index_label is not None:
+        series.insert(0, df.index.to_series(name=index_label))
+    arrays, kinds = encode_columns(series)
+
+    meta = dict(meta or {}, columns=[values.name for values in series], kinds=kinds)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_frame_npz(
+    path: Path, key: dict = None, usecols: list = None
+) -> pandas.DataFrame:
+    """
+    Read a DataFrame written by write_frame_npz, loading only the requested columns.
+
+    Args:
+        path (Path): The path to the .npz file.
+        key (dict): Expected values of the stored meta, e.g. a cache key.
+        usecols (list): Columns to load, defaults to all of them.
+
+    Returns:
+        pandas.DataFrame: The data, or None if the file is missing, damaged or its key differs.
+    """
+    if not path.exists():
+        return None
+    try:
+        npz = np.load(path, allow_pickle=False)
+        meta = json.loads(str(npz["__meta__"]))
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # e.g. a damaged cache file, which is rebuilt from the CSV file
+        return None
+
+    with npz:
+        if any(meta.get(k) != v for k, v in (key or {}).items()):
+            return None
+        return decode_columns(meta["columns"], meta["kinds"], npz.__getitem__, usecols)
 
 
 def write(path: str, content: str, mode="w"):
@@ -50,13 +393,43 @@ def write(path: str, content: str, mode="w"):
         f.write(content)
 
 
-def write_dataframe(df: pandas.DataFrame, path: str):
+def file_format(path: str) -> tuple:
     """
-    Write a DataFrame to a CSV file.
+    Get the data format and compression of a file from its extension.
+
+    Returns:
+        tuple: (format, compression), format is csv, npz, parquet or feather,
+            compression is a pandas compression name or None.
+    """
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    last = suffixes[-1] if suffixes else ""
+    if last in COLUMNAR_FORMATS:
+        return COLUMNAR_FORMATS[last], None
+    if last in CSV_COMPRESSION and suffixes[-2:-1] == [".csv"]:
+        return "csv", CSV_COMPRESSION[last]
+    return ("csv" if last == ".csv" else None), None
+
+
+def write_dataframe(
+    df: pandas.DataFrame,
+    path: str,
+    columns: list = None,
+    compression: str = "infer",
+    chunk_size: int = 100_000,
+):
+    """
+    Write a DataFrame to a file in the format given by its extension: CSV (.csv,
+    compressed as .csv.gz/.bz2/.zip/.xz/.zst), or columnar .npz, .parquet or
+    .feather (the last two need pyarrow). The file is written to a temporary
+    file first, CSV rows in chunks, then moved into place, so a crash never
+    leaves a truncated output.
 
     Args:
         df (pandas.DataFrame): The DataFrame to write.
-        path (str): The path to the output CSV file.
+        path (str): The path to the output file.
+        columns (list): Columns to write, defaults to all of them. The index is always written.
+        compression (str): CSV compression, inferred from the extension by default.
+        chunk_size (int): CSV rows formatted at a time.
     """
     if not isinstance(df, pandas.DataFrame):
         raise TypeError("Expected a pandas DataFrame")
@@ -68,12 +441,162 @@ def write_dataframe(df: pandas.DataFrame, path: str):
     except KeyError:
         pass
 
-    with open(resolved_path, "w") as f:
-        f.write(df.to_csv(index_label="index", lineterminator="\n"))
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"Columns not found: {', '.join(missing)}")
+
+    data_format, inferred = file_format(resolved_path)
+    if compression == "infer":
+        compression = inferred
+    tmp_path = resolved_path.with_name(resolved_path.name + ".tmp")
+    try:
+        if data_format == "npz":
+            write_frame_npz(tmp_path, df, columns, index_label="index")
+        elif data_format in ("parquet", "feather"):
+            frame = (df[columns] if columns else df).reset_index(names="index")
+            getattr(frame, f"to_{data_format}")(tmp_path)
+        else:
+            df.to_csv(
+                tmp_path,
+                columns=columns,
+                index_label="index",
+                lineterminator="\n",
+                chunksize=chunk_size,
+                compression=compression,
+            )
+        os.replace(tmp_path, resolved_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     print(f"Exported DataFrame to {resolved_path}")
 
 
+def write_pages_reversed(path: str, pages, header: str = "") -> int:
+    """
+    Write text pages produced newest first to a file, oldest first.
+    Pages are spooled to a temporary file as they arrive, so memory stays bounded
+    by one page, then copied out in reverse order and moved into place atomically.
+
+    Args:
+        path (str): The path to the output file.
+        pages (iterable): Text blocks, newest first.
+        header (str): Text written before the oldest page.
+
+    Returns:
+        int: Number of pages written. The file is left untouched if there is none.
+    """
+    _path = resolve(path)
+    spool_path = _path.with_name(_path.name + ".pages.tmp")
+    tmp_path = _path.with_name(_path.name + ".tmp")
+    spans = []
+    try:
+        with open(spool_path, "w+b") as spool:
+            for page in pages:
+                data = page.encode("utf-8")
+                if data:
+                    spans.append((spool.tell(), len(data)))
+                    spool.write(data)
+            if not spans:
+                return 0
+            with open(tmp_path, "wb") as f:
+                f.write(header.encode("utf-8"))
+                for offset, size in reversed(spans):
+                    spool.seek(offset)
+                    f.write(spool.read(size))
+        os.replace(tmp_path, _path)
+    finally:
+        spool_path.unlink(missing_ok=True)
+        tmp_path.unlink(missing_ok=True)
+    return len(spans)
+
+
+def tail_offset(path: str, lines: int = 1, block_size: int = 64 * 1024) -> int:
+    """
+    Find where the last N lines of a file start by reading blocks backwards from the end.
+
+    Args:
+        path (str): The path to the file.
+        lines (int): Number of lines to find.
+        block_size (int): Number of bytes read per backward step.
+
+    Returns:
+        int: Byte offset of the first of the last N lines, 0 if the file has fewer lines.
+    """
+    with open(resolve(path), "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        # A trailing newline terminates the last line, it does not start a new one
+        if pos > 0:
+            f.seek(pos - 1)
+            if f.read(1) == b"\n":
+                pos -= 1
+        found = 0
+        while pos > 0:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            block = f.read(read_size)
+            idx = len(block)
+            while True:
+                idx = block.rfind(b"\n", 0, idx)
+                if idx < 0:
+                    break
+                found += 1
+                if found == lines:
+                    return pos + idx + 1
+    return 0
+
+
+def read_last_record(path: str) -> tuple:
+    """
+    Read the header and the last complete record of a CSV file without loading the whole file.
+    A trailing line without a newline is a partial write and is cut off the file.
+
+    Args:
+        path (str): The path to the CSV file.
+
+    Returns:
+        tuple: (record, offset) where record is a dict (None if the file has no rows)
+            and offset is the byte position the record starts at.
+    """
+    _path = resolve(path)
+    with open(_path, "r", newline="") as f:
+        header = next(csv.reader(f), None)
+    if header is None:
+        return None, 0
+
+    while True:
+        offset = tail_offset(_path, 1)
+        with open(_path, "rb") as f:
+            f.seek(offset)
+            last_line = f.read()
+        if offset == 0:
+            return None, 0
+        if last_line.endswith(b"\n"):
+            break
+        truncate(_path, offset)
+
+    values = next(csv.reader([last_line.decode("utf-8")]))
+    return dict(zip(header, values)), offset
+
+
+def truncate(path: str, offset: int):
+    """
+    Truncate a file at the given byte offset and flush it to disk.
+
+    Args:
+        path (str): The path to the file.
+        offset (int): The new file size in bytes.
+    """
+    with open(resolve(path), "r+b") as f:
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
 def require(path: str) -> dict:
     """
     Load JSON file.
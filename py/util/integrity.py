@@ -0,0 +1,250 @@
+import mmap
+import os
+import numpy as np
+import pandas
+from pathlib import Path
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Binance CSV files name the volume "vol", BingX CSV files "volume"
+VOLUME_COLUMNS = ["vol", "volume"]
+
+# Bytes scanned for line ends per step
+BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def kline_csv_usecols(path: str) -> list:
+    """
+    Get the open time and OHLCV column names of a kline CSV file.
+
+    Args:
+        path (str): The path to the CSV file.
+
+    Returns:
+        list: timestamp, open, high, low, close and the volume column.
+    """
+    header = pandas.read_csv(path, nrows=0).columns
+    volume = next((c for c in VOLUME_COLUMNS if c in header), None)
+    if "timestamp" not in header or volume is None:
+        raise ValueError(f"Not a kline CSV file: {path}")
+    return ["timestamp", *PRICE_COLUMNS, volume]
+
+
+def frame_to_columns(df: pandas.DataFrame) -> dict:
+    """
+    Convert kline CSV rows read with kline_csv_usecols into arrays.
+
+    Returns:
+        dict: open_time (int64 milliseconds), open/high/low/close/vol (float64) arrays.
+    """
+    # Timestamps are written in seconds
+    columns = {"open_time": np.rint(df["timestamp"].to_numpy() * 1000).astype(np.int64)}
+    for c in PRICE_COLUMNS:
+        columns[c] = df[c].to_numpy()
+    volume = next(c for c in VOLUME_COLUMNS if c in df.columns)
+    columns["vol"] = df[volume].to_numpy()
+    return columns
+
+
+def read_csv_columns(path: str) -> dict:
+    """
+    Read the open times and OHLCV columns of a kline CSV file.
+
+    Args:
+        path (str): The path to the CSV file.
+
+    Returns:
+        dict: open_time (int64 milliseconds), open/high/low/close/vol (float64) arrays,
+            in file order.
+    """
+    usecols = kline_csv_usecols(path)
+    df = pandas.read_csv(
+        path, usecols=usecols, dtype={c: np.float64 for c in usecols}, engine="c"
+    )
+    return frame_to_columns(df)
+
+
+def sorted_unique(times: np.ndarray) -> np.ndarray:
+    """
+    Sorted unique open times. Stored files are (nearly) sorted already, which
+    a stable sort handles in close to one pass, unlike np.unique.
+    """
+    if (np.diff(times) < 0).any():
+        times = np.sort(times, kind="stable")
+    return times[np.append(True, times[1:] != times[:-1])] if len(times) else times
+
+
+def infer_candle_ms(times: np.ndarray) -> int:
+    """
+    Guess the candle width as the median step between sorted unique open times.
+    """
+    steps = np.diff(sorted_unique(times))
+    return int(np.median(steps)) if len(steps) else None
+
+
+def keep_order(times: np.ndarray) -> np.ndarray:
+    """
+    Row indices that sort rows by open time and keep the last written row of every
+    open time, which is the freshest copy of a candle.
+
+    Args:
+        times (np.ndarray): Open times in file order.
+
+    Returns:
+        np.ndarray: Row indices in output order.
+    """
+    order = np.argsort(times, kind="stable")
+    sorted_times = times[order]
+    last = np.append(sorted_times[1:] != sorted_times[:-1], True)
+    return order[last]
+
+
+def find_gaps(times: np.ndarray, candle_ms: int) -> tuple:
+    """
+    Find holes between sorted, unique open times.
+
+    Returns:
+        tuple: (starts, ends, missing) arrays: first and last missing open time of
+            every hole and its number of missing candles.
+    """
+    steps = np.diff(times)
+    idx = np.flatnonzero(steps > candle_ms)
+    starts = times[idx] + candle_ms
+    ends = times[idx + 1] - candle_ms
+    missing = steps[idx] // candle_ms - 1
+    return starts, ends, missing
+
+
+def scan(columns: dict, candle_ms: int = None, max_gaps: int = 10) -> dict:
+    """
+    Check kline columns for ordering, duplicate, gap, volume and OHLC problems.
+    Every check is one vectorized pass over the arrays.
+
+    Args:
+        columns (dict): open_time and OHLCV arrays in stored order.
+        candle_ms (int): Candle width in milliseconds, inferred if None.
+            Gaps are not checked for monthly candles.
+        max_gaps (int): Number of the largest holes listed in the report.
+
+    Returns:
+        dict: Counts of every problem, and the largest holes as (start, end, missing).
+    """
+    times = columns["open_time"]
+    unique_times = sorted_unique(times)
+    if candle_ms is None:
+        steps = np.diff(unique_times)
+        candle_ms = int(np.median(steps)) if len(steps) else None
+
+    open_, high, low, close = (columns[c] for c in PRICE_COLUMNS)
+    values = np.stack([open_, high, low, close, columns["vol"]])
+    with np.errstate(invalid="ignore"):
+        bad_ohlc = (
+            (high < np.maximum(open_, close))
+            | (low > np.minimum(open_, close))
+            | (low > high)
+            | (low <= 0)
+        )
+
+    report = {
+        "rows": len(times),
+        "out_of_order": int(np.count_nonzero(np.diff(times) < 0)),
+        "duplicates": len(times) - len(unique_times),
+        "gaps": 0,
+        "missing_candles": 0,
+        "misaligned": 0,
+        "nan_rows": int(np.count_nonzero(np.isnan(values).any(axis=0))),
+        "zero_volume": int(np.count_nonzero(columns["vol"] == 0)),
+        "bad_ohlc": int(np.count_nonzero(bad_ohlc)),
+        "first_open_time": int(unique_times[0]) if len(times) else None,
+        "last_open_time": int(unique_times[-1]) if len(times) else None,
+        "candle_ms": candle_ms,
+        "largest_gaps": [],
+    }
+    # Monthly candles have no fixed width
+    if candle_ms is None or candle_ms >= 28 * 24 * 60 * 60 * 1000:
+        return report
+
+    starts, ends, missing = find_gaps(unique_times, candle_ms)
+    largest = np.argsort(missing, kind="stable")[::-1][:max_gaps]
+    report["gaps"] = len(missing)
+    report["missing_candles"] = int(missing.sum())
+    report["misaligned"] = int(np.count_nonzero(np.diff(unique_times) % candle_ms))
+    report["largest_gaps"] = list(
+        zip(starts[largest].tolist(), ends[largest].tolist(), missing[largest].tolist())
+    )
+    return report
+
+
+def is_clean(report: dict) -> bool:
+    """
+    Whether a scan report has no problem at all.
+    """
+    checks = ("out_of_order", "duplicates", "gaps", "misaligned")
+    checks += ("nan_rows", "zero_volume", "bad_ohlc")
+    return not any(report[c] for c in checks)
+
+
+def line_bounds(buffer) -> tuple:
+    """
+    Find the byte range of every line of a buffer, scanning block by block.
+
+    Returns:
+        tuple: (starts, ends) int64 arrays, ends exclusive and including the line end.
+            A last line without line end ends at the end of the buffer.
+    """
+    size = len(buffer)
+    view = np.frombuffer(buffer, dtype=np.uint8)
+    ends = [
+        np.flatnonzero(view[pos : pos + BLOCK_SIZE] == ord("\n")) + pos + 1
+        for pos in range(0, size, BLOCK_SIZE)
+    ]
+    ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+    if size and (len(ends) == 0 or ends[-1] != size):
+        ends = np.append(ends, size)
+    ends = ends.astype(np.int64)
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    return starts, ends
+
+
+def rewrite_rows(path: str, order: np.ndarray, rows: int) -> int:
+    """
+    Rewrite the rows of a CSV file in the given order in one streaming pass, then
+    replace the file. Consecutive rows are copied as one block.
+
+    Args:
+        path (str): The path to the CSV file.
+        order (np.ndarray): Row indices (0 is the first row after the header) in output order.
+        rows (int): Number of rows the file is expected to have.
+
+    Returns:
+        int: Number of rows written.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(path, "rb") as f, open(tmp_path, "wb") as out:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            starts, ends = line_bounds(buffer)
+            # Blank lines are skipped by CSV readers, so they are not rows either
+            short = np.flatnonzero(ends - starts <= 2)
+            blank = [i for i in short if not buffer[starts[i] : ends[i]].strip()]
+            starts, ends = np.delete(starts, blank), np.delete(ends, blank)
+            if len(starts) - 1 != rows:
+                raise ValueError(
+                    f"Expected {rows} rows in {path}, found {len(starts) - 1}"
+                )
+            line_end = b"\r\n" if buffer[ends[0] - 2 : ends[0]] == b"\r\n" else b"\n"
+            out.write(buffer[starts[0] : ends[0]])
+
+            lines = order + 1
+            terminated = buffer[ends[-1] - 1 : ends[-1]] == b"\n"
+            breaks = np.flatnonzero(np.diff(lines) != 1) + 1
+            for run in np.split(lines, breaks):
+                if not len(run):
+                    continue
+                out.write(buffer[starts[run[0]] : ends[run[-1]]])
+                if not terminated and run[-1] == len(starts) - 1:
+                    out.write(line_end)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    return len(order)
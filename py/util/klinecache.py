@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class KlineCache:
+    """
+    Disk cache of kline pages that only contain closed candles.
+
+    Closed candles never change, so a page is stored once and served for every
+    later request with the same parameters. Entries are JSON files named by the
+    hash of (exchange, symbol, interval, request window). When the cache grows
+    over `max_bytes`, the least recently used entries are deleted.
+    """
+
+    def __init__(self, root: str = "ignore/cache", max_bytes: int = 512 * 1024**2):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _entry_path(self, exchange: str, symbol: str, interval: str, window: dict):
+        key = json.dumps([exchange, symbol, interval, window], sort_keys=True)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / exchange / f"{digest}.json"
+
+    def _entries(self) -> list:
+        if not self.root.is_dir():
+            return []
+        return [p for p in self.root.glob("*/*.json") if p.is_file()]
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._entries())
+        return self._size
+
+    def get(self, exchange: str, symbol: str, interval: str, window: dict):
+        """
+        Get a cached page.
+
+        Args:
+            exchange (str): Exchange name, e.g. binance.
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            window (dict): Request parameters that select the page (limit, startTime, endTime).
+
+        Returns:
+            *: The cached page, or None on a miss.
+        """
+        path = self._entry_path(exchange, symbol, interval, window)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # Access time drives LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process since it was read
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, exchange: str, symbol: str, interval: str, window: dict, data):
+        """
+        Store a page. Callers must only store pages made of closed candles.
+
+        Args:
+            exchange (str): Exchange name, e.g. binance.
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            window (dict): Request parameters that select the page.
+            data: JSON-serializable page content.
+        """
+        path = self._entry_path(exchange, symbol, interval, window)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        with self._lock:
+            size = self._current_size()
+            if path.exists():
+                size -= path.stat().st_size
+            os.replace(tmp_path, path)
+            self._size = size + path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries down to 90% of the budget
+        target = self.max_bytes * 0.9
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda e: e[0])
+        for _, size, entry in entries:
+            if self._size <= target:
+                break
+            entry.unlink(missing_ok=True)
+            self._size -= size
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the cache counters.
+
+        Returns:
+            dict: Hits, misses and the cache size in bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._current_size(),
+            }
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(root: str = "ignore/cache") -> KlineCache:
+    """
+    Get the process-wide cache for a directory, creating it on first use.
+
+    Args:
+        root (str): Cache directory.
+
+    Returns:
+        KlineCache: The shared cache.
+    """
+    root = str(Path(os.path.join(os.getcwd(), root)).resolve())
+    with _caches_lock:
+        if root not in _caches:
+            _caches[root] = KlineCache(root)
+        return _caches[root]
@@ -0,0 +1,477 @@
+import os
+import shutil
+import numpy as np
+import pandas
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Stored columns and their binary types. Times are open/close times in milliseconds.
+COLUMNS = {
+    "open_time": np.int64,
+    "close_time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "vol": np.float64,
+}
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Prices of these symbols are stored multiplied, whatever wrote them
+PRICE_MULTIPLIERS = {"PEPEUSDT": 1000}
+
+# Candle widths in milliseconds. "1M" is approximated as 30 days.
+INTERVAL_MS_MAP = {
+    "1m": 60 * 1000,
+    "3m": 3 * 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "30m": 30 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "2h": 2 * 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "6h": 6 * 60 * 60 * 1000,
+    "8h": 8 * 60 * 60 * 1000,
+    "12h": 12 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+    "3d": 3 * 24 * 60 * 60 * 1000,
+    "1w": 7 * 24 * 60 * 60 * 1000,
+    "1M": 30 * 24 * 60 * 60 * 1000,
+}
+
+
+def price_multiplier(symbol: str) -> int:
+    """
+    Multiplier applied to the prices of a symbol before they are stored.
+    """
+    return PRICE_MULTIPLIERS.get(symbol, 1)
+
+
+def scale_prices(symbol: str, columns: dict) -> dict:
+    """
+    Apply the price multiplier of a symbol to the price columns.
+
+    Args:
+        symbol (str): Symbol name.
+        columns (dict): Column name to numpy array, with raw exchange prices.
+
+    Returns:
+        dict: The columns, with new price arrays if the symbol has a multiplier.
+    """
+    mul = price_multiplier(symbol)
+    if mul == 1:
+        return columns
+    return {c: a * mul if c in PRICE_COLUMNS else a for c, a in columns.items()}
+
+
+def month_bounds(month: str) -> tuple:
+    """
+    Get the [start, end) range of a partition in milliseconds.
+
+    Args:
+        month (str): Partition name (YYYY-MM).
+
+    Returns:
+        tuple: (start_ms, end_ms)
+    """
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+def format_times(times_ms) -> tuple:
+    """
+    Format millisecond timestamps as UTC date and datetime strings in one vectorized pass.
+
+    Args:
+        times_ms: Array of timestamps in milliseconds.
+
+    Returns:
+        tuple: ("%Y-%m-%d" array, "%Y-%m-%d %H:%M:%S" array)
+    """
+    seconds = np.asarray(times_ms, dtype=np.int64).astype("datetime64[ms]")
+    iso = np.datetime_as_string(seconds.astype("datetime64[s]"), unit="s")
+    # "YYYY-MM-DDTHH:MM:SS": swap the separator in place through a per-character view
+    iso = np.ascontiguousarray(iso, dtype="<U19")
+    iso.view("<U1").reshape(-1, 19)[:, 10] = " "
+    return iso.astype("<U10"), iso
+
+
+def to_frame(symbol: str, data: dict) -> pandas.DataFrame:
+    """
+    Convert stored columns into a DataFrame with the same schema as the kline CSVs.
+    Only the columns present in `data` (and the fields derivable from them) are included.
+
+    Args:
+        symbol (str): Symbol name.
+        data (dict): Column name to numpy array, as returned by KlineStore.read.
+
+    Returns:
+        pandas.DataFrame: Kline DataFrame.
+    """
+    df = pandas.DataFrame()
+    length = len(next(iter(data.values()))) if data else 0
+    df["symbol"] = pandas.Series([symbol] * length, dtype="category")
+    if "open_time" in data:
+        dates, datetimes = format_times(data["open_time"])
+        df["timestamp"] = data["open_time"] / 1000
+        df["date"] = dates
+        df["start"] = datetimes
+    if "close_time" in data:
+        df["end"] = format_times(data["close_time"])[1]
+    for column in ("open", "high", "low", "close", "vol"):
+        if column in data:
+            df[column] = data[column]
+    if "open" in data and "close" in data:
+        df["type"] = (data["close"] > data["open"]).astype(np.int64)
+    return df
+
+
+def keep_last(data: dict) -> dict:
+    """
+    Keep the last occurrence of every open time, sorted by open time.
+    """
+    reverse_times = data["open_time"][::-1]
+    _, first_idx = np.unique(reverse_times, return_index=True)
+    keep = len(reverse_times) - 1 - first_idx
+    return {c: a[keep] for c, a in data.items()}
+
+
+def count_changes(old: dict, new: dict) -> int:
+    """
+    Count the rows of `new` whose open time is not in `old`, or whose values differ
+    from the row of `old` with the same open time. Both are sorted and unique by open time.
+    """
+    times = old["open_time"]
+    if len(times) == 0:
+        return len(new["open_time"])
+    idx = np.minimum(np.searchsorted(times, new["open_time"]), len(times) - 1)
+    same = times[idx] == new["open_time"]
+    for column in COLUMNS:
+        stored, values = old[column][idx], new[column]
+        equal = stored == values
+        if stored.dtype.kind == "f":
+            equal |= np.isnan(stored) & np.isnan(values)
+        same &= equal
+    return int(len(same) - np.count_nonzero(same))
+
+
+class KlineStore:
+    """
+    Columnar kline store partitioned by symbol, interval and month.
+
+    Layout: <root>/<symbol>/<interval>/<YYYY-MM>/<column>.npy
+    Each column is a plain .npy file, so reads are memory maps and only the
+    requested columns are touched.
+    """
+
+    def __init__(self, root: str = "ignore/store"):
+        self.root = Path(root)
+
+    @classmethod
+    def from_path(cls, path: str) -> tuple:
+        """
+        Split a <root>/<symbol>/<interval> path into a store and its dataset.
+
+        Args:
+            path (str): Path to a symbol/interval directory of a store.
+
+        Returns:
+            tuple: (KlineStore, symbol, interval)
+        """
+        path = Path(path)
+        return cls(path.parent.parent), path.parent.name, path.name
+
+    def dataset_path(self, symbol: str, interval: str) -> Path:
+        return self.root / symbol / interval
+
+    def partitions(self, symbol: str, interval: str) -> list:
+        """
+        List the month partitions of a dataset, oldest first.
+
+        Returns:
+            list: Partition names (YYYY-MM).
+        """
+        dataset = self.dataset_path(symbol, interval)
+        if not dataset.is_dir():
+            return []
+        # Skip the .tmp and .old directories of a partition being replaced
+        return sorted(
+            p.name for p in dataset.iterdir() if p.is_dir() and "." not in p.name
+        )
+
+    def exists(self, symbol: str, interval: str) -> bool:
+        return len(self.partitions(symbol, interval)) > 0
+
+    def _load_partition(self, symbol: str, interval: str, month: str, columns: list):
+        partition = self.dataset_path(symbol, interval) / month
+        data = {c: np.load(partition / f"{c}.npy", mmap_mode="r") for c in columns}
+        # Columns grow one by one in _append_partition, keep rows that every column has
+        length = min(len(a) for a in data.values())
+        return {c: a[:length] for c, a in data.items()}
+
+    def _write_partition(self, symbol: str, interval: str, month: str, data: dict):
+        """
+        Write a whole partition into <month>.tmp, then swap it in with two renames,
+        so every column is replaced at once. An interrupted swap is completed by
+        _recover_partition.
+        """
+        dataset = self.dataset_path(symbol, interval)
+        partition, tmp, old = (
+            dataset / f"{month}{suffix}" for suffix in ("", ".tmp", ".old")
+        )
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for column in COLUMNS:
+            values = np.ascontiguousarray(data[column], dtype=COLUMNS[column])
+            np.save(tmp / f"{column}.npy", values)
+        if partition.exists():
+            os.replace(partition, old)
+        os.replace(tmp, partition)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _recover_partition(self, symbol: str, interval: str, month: str):
+        """
+        Finish or roll back a partition swap interrupted by a crash.
+        """
+        dataset = self.dataset_path(symbol, interval)
+        partition, tmp, old = (
+            dataset / f"{month}{suffix}" for suffix in ("", ".tmp", ".old")
+        )
+        if not partition.exists() and old.exists():
+            # The old partition is only moved away once the new one is complete
+            os.replace(tmp if tmp.exists() else old, partition)
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _append_partition(
+        self, symbol: str, interval: str, month: str, data: dict
+    ) -> int:
+        """
+        Append sorted rows that are all newer than the partition in place: the rows
+        are written at the end of every column file, then its .npy header gets the
+        new length (numpy leaves room in the header for it). Readers see the old
+        rows until a header changes, and _load_partition trims a partition
+        interrupted between two columns to the rows every column has.
+        The first row may have the open time of the last stored row instead, e.g. a
+        candle that was still open: it is overwritten in place if it changed.
+
+        Returns:
+            int: Number of rows added or changed, None, with nothing written, if the
+                rows do not follow the partition or its files cannot grow in place.
+        """
+        partition = self.dataset_path(symbol, interval) / month
+        headers = {}
+        for column, dtype in COLUMNS.items():
+            with open(partition / f"{column}.npy", "rb") as f:
+                if np.lib.format.read_magic(f) != (1, 0):
+                    return None
+                shape, fortran_order, stored = np.lib.format.read_array_header_1_0(f)
+                if stored != dtype or fortran_order or len(shape) != 1:
+                    return None
+                headers[column] = (shape[0], f.tell())
+        length = min(rows for rows, _ in headers.values())
+        changed = 0
+        if length:
+            last_row = self._load_partition(symbol, interval, month, list(COLUMNS))
+            last_row = {c: np.array(a[length - 1 :]) for c, a in last_row.items()}
+            if data["open_time"][0] < last_row["open_time"][0]:
+                return None
+            if data["open_time"][0] == last_row["open_time"][0]:
+                first_row = {c: a[:1] for c, a in data.items()}
+                changed = count_changes(last_row, first_row)
+                # Like any update of an open candle, readers may see it column by column
+                for column in COLUMNS if changed else ():
+                    offset = headers[column][1]
+                    with open(partition / f"{column}.npy", "r+b") as f:
+                        f.seek(offset + (length - 1) * first_row[column].itemsize)
+                        f.write(first_row[column].tobytes())
+                data = {c: a[1:] for c, a in data.items()}
+                if len(data["open_time"]) == 0:
+                    return changed
+
+        for column, dtype in COLUMNS.items():
+            offset = headers[column][1]
+            values = np.ascontiguousarray(data[column], dtype=dtype)
+            with open(partition / f"{column}.npy", "r+b") as f:
+                # Drop rows of a column that got ahead in an interrupted append
+                f.seek(offset + length * values.itemsize)
+                f.truncate()
+                f.write(values.tobytes())
+                f.seek(0)
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                    "fortran_order": False,
+                    "shape": (length + len(values),),
+                }
+                np.lib.format.write_array_header_1_0(f, header)
+                if f.tell() != offset:
+                    raise ValueError(f"Header of {f.name} cannot grow in place")
+        return changed + len(data["open_time"])
+
+    def append(self, symbol: str, interval: str, data: dict) -> int:
+        """
+        Append klines to the store. Rows whose open time is already stored are replaced.
+        Rows newer than a month partition are appended to its files, a changed last
+        row is overwritten in place, other changes rewrite the partition.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            data (dict): Column name to array, must contain every column of COLUMNS.
+
+        Returns:
+            int: Number of rows added or changed. Rows stored already with the same
+                values, or repeated in `data`, are not counted.
+        """
+        missing = [c for c in COLUMNS if c not in data]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        data = {c: np.asarray(data[c], dtype=COLUMNS[c]) for c in COLUMNS}
+        if len(data["open_time"]) == 0:
+            return 0
+
+        rows = 0
+        months = data["open_time"].astype("datetime64[ms]").astype("datetime64[M]")
+        for month_value in np.unique(months):
+            mask = months == month_value
+            month = str(month_value)
+            new = keep_last({c: a[mask] for c, a in data.items()})
+            self._recover_partition(symbol, interval, month)
+            if month not in self.partitions(symbol, interval):
+                self._write_partition(symbol, interval, month, new)
+                rows += len(new["open_time"])
+                continue
+            changed = self._append_partition(symbol, interval, month, new)
+            if changed is not None:
+                rows += changed
+                continue
+            old = self._load_partition(symbol, interval, month, list(COLUMNS))
+            changed = count_changes(old, new)
+            if changed:
+                merged = keep_last(
+                    {c: np.concatenate([old[c], new[c]]) for c in COLUMNS}
+                )
+            # Unmap the old files before they are replaced
+            del old
+            if changed:
+                self._write_partition(symbol, interval, month, merged)
+                rows += changed
+        return rows
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start: int = None,
+        end: int = None,
+        columns: list = None,
+    ) -> dict:
+        """
+        Read a time range of a dataset.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            start (int): Inclusive open time lower bound in milliseconds.
+            end (int): Inclusive open time upper bound in milliseconds.
+            columns (list): Columns to load, defaults to all of COLUMNS.
+
+        Returns:
+            dict: Column name to numpy array.
+        """
+        columns = self._check_columns(columns)
+        load_columns = columns if "open_time" in columns else columns + ["open_time"]
+
+        chunks = []
+        for month in self.partitions(symbol, interval):
+            month_start, month_end = month_bounds(month)
+            if start is not None and month_end <= start:
+                continue
+            if end is not None and month_start > end:
+                continue
+            part = self._load_partition(symbol, interval, month, load_columns)
+            times = part["open_time"]
+            lo = 0 if start is None else np.searchsorted(times, start, side="left")
+            hi = len(times) if end is None else np.searchsorted(times, end, "right")
+            chunks.append({c: part[c][lo:hi] for c in columns})
+
+        if len(chunks) == 1:
+            return chunks[0]
+        if not chunks:
+            return {c: np.empty(0, dtype=COLUMNS[c]) for c in columns}
+        return {c: np.concatenate([chunk[c] for chunk in chunks]) for c in columns}
+
+    def read_tail(
+        self, symbol: str, interval: str, rows: int, columns: list = None
+    ) -> dict:
+        """
+        Read the last rows of a dataset, loading partitions from the newest one back
+        until there are enough rows.
+
+        Args:
+            symbol (str): Symbol name.
+            interval (str): Interval, e.g. 1h.
+            rows (int): Number of rows.
+            columns (list): Columns to load, defaults to all of COLUMNS.
+
+        Returns:
+            dict: Column name to numpy array, oldest row first.
+        """
+        columns = self._check_columns(columns)
+        chunks = []
+        count = 0
+        for month in reversed(self.partitions(symbol, interval)):
+            if count >= rows:
+                break
+            part = self._load_partition(symbol, interval, month, columns)
+            length = len(part[columns[0]])
+            take = min(length, rows - count)
+            chunks.append({c: a[length - take :] for c, a in part.items()})
+            count += take
+
+        if not chunks:
+            return {c: np.empty(0, dtype=COLUMNS[c]) for c in columns}
+        chunks.reverse()
+        return {c: np.concatenate([chunk[c] for chunk in chunks]) for c in columns}
+
+    def _check_columns(self, columns: list = None) -> list:
+        columns = list(columns or COLUMNS)
+        unknown = [c for c in columns if c not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        return columns
+
+    def read_frame(
+        self,
+        symbol: str,
+        interval: str,
+        start: int = None,
+        end: int = None,
+        columns: list = None,
+    ) -> pandas.DataFrame:
+        """
+        Read a time range of a dataset as a DataFrame in the kline CSV schema.
+
+        Returns:
+            pandas.DataFrame: Kline DataFrame.
+        """
+        return to_frame(symbol, self.read(symbol, interval, start, end, columns))
+
+    def last_open_time(self, symbol: str, interval: str) -> int:
+        """
+        Get the most recent stored open time.
+
+        Returns:
+            int: Open time in milliseconds, or None if the dataset is empty.
+        """
+        for month in reversed(self.partitions(symbol, interval)):
+            times = self._load_partition(symbol, interval, month, ["open_time"])
+            if len(times["open_time"]) > 0:
+                return int(times["open_time"][-1])
+        return None
@@ -0,0 +1,290 @@
+import asyncio
+import random
+import threading
+import time
+
+# Request weight budget per minute for each exchange (per IP).
+WEIGHT_PER_MINUTE = {
+    "binance": 6000,
+    "bingx": 600,
+}
+
+# Fraction of the budget the server may report as used before we slow down.
+HIGH_USAGE_RATIO = 0.8
+
+
+class RateLimitError(Exception):
+    """
+    Raised by a request function when the exchange answers with HTTP 429 or 418.
+    """
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"Rate limited by exchange (HTTP {status_code})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers) -> float:
+    """
+    Read the Retry-After header (in seconds) from a response header mapping.
+
+    Args:
+        headers: Response headers, or None.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not headers:
+        return None
+    for key in headers.keys():
+        if key.lower() == "retry-after":
+            try:
+                return float(headers[key])
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class RateLimiter:
+    """
+    Weight-aware token bucket shared by every request sent to one exchange.
+
+    Tokens refill continuously up to `weight_per_minute`. Each call waits for
+    enough tokens and a free concurrency slot. The concurrency limit grows by one
+    after each successful call and is halved when the exchange reports high usage
+    or answers 429/418, in which case all callers also back off with jitter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        weight_per_minute: int,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 120.0,
+    ):
+        self.name = name
+        self.capacity = float(weight_per_minute)
+        self.tokens = float(weight_per_minute)
+        self.refill_rate = weight_per_minute / 60.0
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queued = 0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.updated_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, weight: int = 1):
+        """
+        Block until `weight` tokens and a concurrency slot are available.
+
+        Args:
+            weight (int): Request weight of the call about to be sent.
+        """
+        weight = min(weight, self.capacity)
+        with self._cond:
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self.blocked_until:
+                        timeout = self.blocked_until - now
+                    elif self.in_flight >= self.concurrency:
+                        timeout = None
+                    elif self.tokens < weight:
+                        timeout = (weight - self.tokens) / self.refill_rate
+                    else:
+                        self.tokens -= weight
+                        self.in_flight += 1
+                        return
+                    self._cond.wait(timeout)
+            finally:
+                self.queued -= 1
+
+    def release(self, success: bool = True):
+        """
+        Free the concurrency slot taken by `acquire`.
+
+        Args:
+            success (bool): If True, allow one more concurrent request next time.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if success and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+            self._cond.notify_all()
+
+    def observe_used_weight(self, used_weight: int):
+        """
+        Align the bucket with the used weight reported by the exchange.
+
+        Args:
+            used_weight (int): Weight already consumed in the current window.
+        """
+        with self._cond:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, max(0.0, self.capacity - used_weight))
+            if used_weight >= self.capacity * HIGH_USAGE_RATIO:
+                self.concurrency = max(1, self.concurrency // 2)
+
+    def penalize(self, attempt: int, retry_after: float = None):
+        """
+        Pause every caller after a 429/418 answer.
+
+        Args:
+            attempt (int): Zero-based retry attempt, used for exponential backoff.
+            retry_after (float): Delay requested by the exchange, in seconds.
+        """
+        delay = retry_after or min(self.max_delay, self.base_delay * 2**attempt)
+        delay += random.uniform(0, delay * 0.5)
+        with self._cond:
+            self.tokens = 0.0
+            self.concurrency = max(1, self.concurrency // 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        print(f"[{self.name}] Rate limited, backing off for {delay:.1f}s.")
+
+    def call(self, request, weight: int = 1):
+        """
+        Run `request` under the limiter, retrying when it raises RateLimitError.
+
+        Args:
+            request (callable): Function sending one request and returning its result.
+            weight (int): Request weight of the call.
+
+        Returns:
+            *: Whatever `request` returns.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(weight)
+            success = False
+            try:
+                result = request()
+                success = True
+                return result
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                self.penalize(attempt, e.retry_after)
+            finally:
+                self.release(success)
+
+    async def acquire_async(self, weight: int = 1):
+        """
+        Await `acquire` in a worker thread so the event loop keeps running.
+        A cancelled caller cannot stop the thread, so the slot it still takes is
+        handed back by the thread itself, even if the event loop is gone by then.
+
+        Args:
+            weight (int): Request weight of the call about to be sent.
+        """
+        handoff = threading.Lock()
+        state = {"acquired": False, "abandoned": False}
+
+        def take():
+            self.acquire(weight)
+            with handoff:
+                if state["abandoned"]:
+                    self.release(success=False)
+                else:
+                    state["acquired"] = True
+
+        try:
+            await asyncio.to_thread(take)
+        except asyncio.CancelledError:
+            with handoff:
+                state["abandoned"] = True
+                if state["acquired"]:
+                    self.release(success=False)
+            raise
+
+    async def call_async(self, request, weight: int = 1):
+        """
+        Await `request()` under the limiter, retrying when it raises RateLimitError.
+        Waiting for tokens happens in a worker thread (see acquire_async).
+
+        Args:
+            request (callable): Coroutine function sending one request and returning its result.
+            weight (int): Request weight of the call.
+
+        Returns:
+            *: Whatever `request` returns.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(weight)
+            success = False
+            try:
+                result = await request()
+                success = True
+                return result
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                self.penalize(attempt, e.retry_after)
+            finally:
+                self.release(success)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the limiter state.
+
+        Returns:
+            dict: Queued and in-flight request counts, current concurrency and tokens.
+        """
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "name": self.name,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "concurrency": self.concurrency,
+                "tokens": round(self.tokens, 2),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(exchange: str) -> RateLimiter:
+    """
+    Get the process-wide limiter for an exchange, creating it on first use.
+
+    Args:
+        exchange (str): Exchange name, a key of WEIGHT_PER_MINUTE.
+
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    with _limiters_lock:
+        if exchange not in _limiters:
+            if exchange not in WEIGHT_PER_MINUTE:
+                raise ValueError(f"Unknown exchange: {exchange}")
+            _limiters[exchange] = RateLimiter(exchange, WEIGHT_PER_MINUTE[exchange])
+        return _limiters[exchange]
+
+
+def reset_limiter(exchange: str) -> RateLimiter:
+    """
+    Replace the process-wide limiter of an exchange with a new one, so the next
+    requests start with a full budget, e.g. between benchmark runs.
+
+    Args:
+        exchange (str): Exchange name, a key of WEIGHT_PER_MINUTE.
+
+    Returns:
+        RateLimiter: The new shared limiter.
+    """
+    with _limiters_lock:
+        _limiters.pop(exchange, None)
+    return get_limiter(exchange)
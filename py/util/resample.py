@@ -0,0 +1,114 @@
+import numpy as np
+from .klinestore import INTERVAL_MS_MAP, KlineStore
+
+DAY_MS = INTERVAL_MS_MAP["1d"]
+
+# Weekly candles open on Monday 00:00 UTC, the epoch was a Thursday.
+WEEK_OFFSET_MS = 4 * DAY_MS
+
+
+def check_derivable(base_interval: str, interval: str):
+    """
+    Raise ValueError unless every `interval` bucket is made of whole `base_interval` candles.
+    """
+    for name in (base_interval, interval):
+        if name not in INTERVAL_MS_MAP:
+            raise ValueError(f"Unsupported interval: {name}")
+    base_ms = INTERVAL_MS_MAP[base_interval]
+    if base_interval == "1M" or base_interval == "1w" and interval != "1w":
+        raise ValueError(f"Cannot derive {interval} from {base_interval}")
+    if interval == "1M":
+        if DAY_MS % base_ms != 0:
+            raise ValueError(f"Cannot derive {interval} from {base_interval}")
+        return
+    if INTERVAL_MS_MAP[interval] % base_ms != 0:
+        raise ValueError(f"Cannot derive {interval} from {base_interval}")
+
+
+def bucket_starts(open_times, interval: str) -> np.ndarray:
+    """
+    Get the open time of the `interval` candle each open time belongs to,
+    using the same UTC boundaries as the exchange.
+
+    Args:
+        open_times: Array of open times in milliseconds.
+        interval (str): Target interval.
+
+    Returns:
+        np.ndarray: Bucket open times in milliseconds.
+    """
+    times = np.asarray(open_times, dtype=np.int64)
+    if interval == "1M":
+        months = times.astype("datetime64[ms]").astype("datetime64[M]")
+        return months.astype("datetime64[ms]").astype(np.int64)
+    width = INTERVAL_MS_MAP[interval]
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (times - offset) // width * width + offset
+
+
+def bucket_close_times(starts, interval: str) -> np.ndarray:
+    """
+    Get the close time (last millisecond) of buckets from their open times.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    if interval == "1M":
+        months = starts.astype("datetime64[ms]").astype("datetime64[M]") + 1
+        return months.astype("datetime64[ms]").astype(np.int64) - 1
+    return starts + INTERVAL_MS_MAP[interval] - 1
+
+
+def resample(data: dict, base_interval: str, interval: str) -> dict:
+    """
+    Aggregate sorted base candles into a higher interval.
+    Open is the first open, high the max, low the min, close the last close and
+    vol the sum of the candles in each bucket. The last bucket may be partial,
+    like the still-open candle returned by the exchange.
+
+    Args:
+        data (dict): Kline store columns of the base interval, sorted by open time.
+        base_interval (str): Interval of `data`, e.g. 1h.
+        interval (str): Target interval, e.g. 4h.
+
+    Returns:
+        dict: Kline store columns of the target interval.
+    """
+    check_derivable(base_interval, interval)
+    times = np.asarray(data["open_time"], dtype=np.int64)
+    if len(times) == 0:
+        return {c: np.asarray(data[c])[:0] for c in data}
+
+    starts = bucket_starts(times, interval)
+    boundaries = np.flatnonzero(np.diff(starts)) + 1
+    first = np.concatenate([[0], boundaries])
+    last = np.concatenate([boundaries - 1, [len(times) - 1]])
+    return {
+        "open_time": starts[first],
+        "close_time": bucket_close_times(starts[first], interval),
+        "open": np.asarray(data["open"])[first],
+        "high": np.maximum.reduceat(np.asarray(data["high"]), first),
+        "low": np.minimum.reduceat(np.asarray(data["low"]), first),
+        "close": np.asarray(data["close"])[last],
+        "vol": np.add.reduceat(np.asarray(data["vol"]), first),
+    }
+
+
+def resample_store(
+    store: KlineStore, symbol: str, base_interval: str, interval: str
+) -> int:
+    """
+    Derive `interval` from `base_interval` inside a kline store, incrementally.
+    Only the buckets from the last stored `interval` candle onwards are rebuilt.
+
+    Args:
+        store (KlineStore): The kline store.
+        symbol (str): Symbol name.
+        base_interval (str): Stored finer interval, e.g. 1h.
+        interval (str): Interval to derive, e.g. 4h.
+
+    Returns:
+        int: Number of derived candles written.
+    """
+    check_derivable(base_interval, interval)
+    last_open_time = store.last_open_time(symbol, interval)
+    base = store.read(symbol, base_interval, start=last_open_time)
+    return store.append(symbol, interval, resample(base, base_interval, interval))
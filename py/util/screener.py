@@ -0,0 +1,212 @@
+import numpy as np
+import pandas
+from .klinestore import INTERVAL_MS_MAP, KlineStore
+
+
+def list_symbols(store: KlineStore, interval: str) -> list:
+    """
+    List the symbols of a store that have data for an interval.
+    """
+    if not store.root.is_dir():
+        return []
+    return sorted(
+        p.name
+        for p in store.root.iterdir()
+        if p.is_dir() and store.exists(p.name, interval)
+    )
+
+
+def load_matrix(
+    store: KlineStore, symbols: list, interval: str, candles: int = 200
+) -> tuple:
+    """
+    Load the latest candles of many symbols into symbol x time arrays on a common
+    time grid ending at the most recent candle of any symbol. Missing candles are NaN.
+
+    Args:
+        store (KlineStore): The kline store.
+        symbols (list): Symbols to load.
+        interval (str): Interval, e.g. 1h.
+        candles (int): Number of candles per symbol.
+
+    Returns:
+        tuple: (symbols, open_times, data) where data maps open/high/low/close/vol
+            to float64 arrays of shape (len(symbols), candles).
+    """
+    candle_ms = INTERVAL_MS_MAP[interval]
+    last_times = {s: store.last_open_time(s, interval) for s in symbols}
+    symbols = [s for s in symbols if last_times[s] is not None]
+    columns = ("open", "high", "low", "close", "vol")
+    data = {c: np.full((len(symbols), candles), np.nan) for c in columns}
+    if not symbols:
+        return symbols, np.empty(0, dtype=np.int64), data
+
+    end = max(last_times[s] for s in symbols)
+    start = end - (candles - 1) * candle_ms
+    open_times = start + np.arange(candles, dtype=np.int64) * candle_ms
+    for row, symbol in enumerate(symbols):
+        stored = store.read(symbol, interval, start=start, end=end)
+        offset = stored["open_time"] - start
+        # Only candles on the grid, e.g. not a misaligned monthly candle
+        keep = offset % candle_ms == 0
+        cols = offset[keep] // candle_ms
+        for c in columns:
+            data[c][row, cols] = stored[c][keep]
+    return symbols, open_times, data
+
+
+def ewm(values: np.ndarray, alpha: float, min_periods: int = 1) -> np.ndarray:
+    """
+    Exponentially weighted mean along the time axis of a symbol x time array,
+    like pandas ewm(alpha=alpha, adjust=False). Each series starts at its first
+    valid value and NaN values carry the previous mean forward.
+
+    Args:
+        values (np.ndarray): Array of shape (symbols, time).
+        alpha (float): Smoothing factor.
+        min_periods (int): Valid values required before a mean is reported.
+
+    Returns:
+        np.ndarray: Array of the same shape.
+    """
+    out = np.full(values.shape, np.nan)
+    mean = np.full(values.shape[0], np.nan)
+    valid = ~np.isnan(values)
+    # Loop over time, every step is one vector operation over all symbols
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        updated = np.where(np.isnan(mean), x, (1 - alpha) * mean + alpha * x)
+        mean = np.where(valid[:, t], updated, mean)
+        out[:, t] = mean
+    out[np.cumsum(valid, axis=1) < min_periods] = np.nan
+    return out
+
+
+def ema(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    EMA like ta.trend.ema_indicator.
+    """
+    return ewm(close, 2 / (window + 1), min_periods=window)
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    RSI with Wilder smoothing like ta.momentum.rsi.
+    """
+    diff = np.diff(close, axis=1, prepend=np.nan)
+    seen = ~np.isnan(close)
+    up = np.where(seen, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(seen, np.where(diff < 0, -diff, 0.0), np.nan)
+    ema_up = ewm(up, 1 / window, min_periods=window)
+    ema_down = ewm(down, 1 / window, min_periods=window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = ema_up / ema_down
+        values = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + rs))
+    return np.where(np.isnan(ema_up), np.nan, values)
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14):
+    """
+    Wilder's ADX with the +DI and -DI lines.
+
+    Returns:
+        tuple: (adx, +di, -di) arrays of shape (symbols, time).
+    """
+    prev_close = np.roll(close, 1, axis=1)
+    prev_close[:, 0] = np.nan
+    true_range = np.fmax(high, prev_close) - np.fmin(low, prev_close)
+    up = np.diff(high, axis=1, prepend=np.nan)
+    down = -np.diff(low, axis=1, prepend=np.nan)
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    missing = np.isnan(up) | np.isnan(down)
+    plus_dm[missing] = np.nan
+    minus_dm[missing] = np.nan
+
+    alpha = 1 / window
+    atr = ewm(true_range, alpha, min_periods=window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plus_di = 100 * ewm(plus_dm, alpha, min_periods=window) / atr
+        minus_di = 100 * ewm(minus_dm, alpha, min_periods=window) / atr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return ewm(dx, alpha, min_periods=window), plus_di, minus_di
+
+
+def last_valid(values: np.ndarray) -> np.ndarray:
+    """
+    Last non-NaN value of each row, NaN for an empty row.
+    """
+    valid = ~np.isnan(values)
+    idx = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    result = values[np.arange(values.shape[0]), idx]
+    return np.where(valid.any(axis=1), result, np.nan)
+
+
+def crossed(fast: np.ndarray, slow: np.ndarray, window: int) -> np.ndarray:
+    """
+    Direction of the latest cross of `fast` over `slow` within the last `window` candles.
+
+    Returns:
+        np.ndarray: 1 for a cross up, -1 for a cross down, 0 for none, per symbol.
+    """
+    # Undefined (NaN) differences count as no side
+    sign = np.nan_to_num(np.sign(fast - slow))[:, -(window + 1) :]
+    changes = (sign[:, 1:] != sign[:, :-1]) & (sign[:, 1:] != 0) & (sign[:, :-1] != 0)
+    direction = np.where(changes, sign[:, 1:], 0)
+    # Right-most non-zero entry of each row
+    last = changes.shape[1] - 1 - np.argmax(changes[:, ::-1], axis=1)
+    latest = direction[np.arange(len(direction)), last]
+    return np.where(changes.any(axis=1), latest, 0).astype(np.int64)
+
+
+def screen(
+    symbols: list,
+    data: dict,
+    rsi_window: int = 9,
+    fast: int = 9,
+    slow: int = 21,
+    adx_window: int = 14,
+    cross_window: int = 6,
+) -> pandas.DataFrame:
+    """
+    Compute the latest indicator readings of every symbol in one vectorized pass,
+    with the same defaults as the analysis.py checks.
+
+    Args:
+        symbols (list): Row labels of the arrays.
+        data (dict): Symbol x time arrays from load_matrix.
+        rsi_window (int): RSI window.
+        fast (int): Fast EMA window.
+        slow (int): Slow EMA window.
+        adx_window (int): ADX window.
+        cross_window (int): Candles looked back for an EMA cross.
+
+    Returns:
+        pandas.DataFrame: One row per symbol.
+    """
+    close = data["close"]
+    ema_fast = ema(close, fast)
+    ema_slow = ema(close, slow)
+    adx_values, plus_di, minus_di = adx(data["high"], data["low"], close, adx_window)
+    last_close = last_valid(close)
+    first_close = close[np.arange(len(symbols)), np.argmax(~np.isnan(close), axis=1)]
+    last_fast = last_valid(ema_fast)
+    last_slow = last_valid(ema_slow)
+
+    return pandas.DataFrame(
+        {
+            "symbol": symbols,
+            "close": last_close,
+            "change": (last_close / first_close - 1) * 100,
+            "rsi": last_valid(rsi(close, rsi_window)),
+            f"ema_{fast}": last_fast,
+            f"ema_{slow}": last_slow,
+            "adx": last_valid(adx_values),
+            "plus_di": last_valid(plus_di),
+            "minus_di": last_valid(minus_di),
+            "ema_cross": crossed(ema_fast, ema_slow, cross_window),
+            "above_emas": (last_close > last_fast) & (last_close > last_slow),
+            "below_emas": (last_close < last_fast) & (last_close < last_slow),
+            "vol": np.nansum(data["vol"], axis=1),
+        }
+    )
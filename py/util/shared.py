@@ -0,0 +1,196 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import numpy as np
+import pandas
+from pathlib import Path
+from . import file
+
+# RAM backed on Linux, so published columns never touch the disk
+DEFAULT_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class SharedDataset:
+    """
+    Handle to a dataset published by a DatasetRegistry. Only the directory and the
+    column layout are pickled, so it is cheap to send to worker processes, which
+    map the column files read-only: every process reads the same memory pages.
+    """
+
+    def __init__(self, name: str, path: str, columns: list, kinds: dict, rows: int):
+        self.name = name
+        self.path = path
+        self.columns = columns
+        self.kinds = kinds
+        self.rows = rows
+        self._arrays = {}
+
+    def __getstate__(self):
+        # Mappings are per process
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
+
+    def __len__(self):
+        return self.rows
+
+    def load(self, key: str) -> np.ndarray:
+        """
+        Map one stored array (see file.encode_columns) read-only, once per process.
+        """
+        if key not in self._arrays:
+            self._arrays[key] = np.load(
+                os.path.join(self.path, f"{key}.npy"), mmap_mode="r", allow_pickle=False
+            )
+        return self._arrays[key]
+
+    def array(self, column: str) -> np.ndarray:
+        """
+        Get a zero-copy, read-only view of a column.
+
+        Args:
+            column (str): The column name.
+
+        Returns:
+            np.ndarray: The values of a numeric column, or the int32 codes of a
+                text or categorical column.
+        """
+        if column not in self.columns:
+            raise KeyError(f"Column {column} is not in dataset {self.name}")
+        return self.load(f"c{self.columns.index(column)}")
+
+    def to_frame(self, usecols: list = None) -> pandas.DataFrame:
+        """
+        Build a DataFrame of the dataset. pandas copies the mapped columns into its
+        own blocks, so the frame is private to the process and writable.
+
+        Args:
+            usecols (list): Columns to load, defaults to all of them.
+
+        Returns:
+            pandas.DataFrame: The data, with a new RangeIndex.
+        """
+        return file.decode_columns(self.columns, self.kinds, self.load, usecols)
+
+    def close(self):
+        """
+        Drop the mappings of this process.
+        """
+        self._arrays.clear()
+
+
+class DatasetRegistry:
+    """
+    Publish datasets once for multi-process workers. Each dataset is written column
+    by column to .npy files in a private directory, and workers get a SharedDataset
+    handle to map them instead of a pickled copy of the frame.
+
+    Datasets are reference counted: publish holds one reference, acquire adds one
+    for a consumer, e.g. a submitted job, and release drops one. The files are removed
+    with the last reference, and close (or leaving the with block, or the exit of
+    the interpreter) removes whatever is left. Processes that still map a removed
+    dataset keep reading it until they close it.
+
+    Example:
+        with DatasetRegistry() as registry:
+            registry.publish("btc", "ignore/btc.csv")
+            dataset = registry.acquire("btc")
+            future = pool.submit(work, dataset)
+            future.add_done_callback(lambda _: registry.release("btc"))
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        """
+        Args:
+            root (str): Directory for the dataset files, /dev/shm if it exists,
+                else the temporary directory.
+        """
+        self.root = Path(tempfile.mkdtemp(prefix="datasets-", dir=root))
+        self.datasets = {}
+        self.refs = {}
+        self.published = 0
+        self.lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.root, True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.datasets
+
+    def publish(self, name: str, data, usecols: list = None) -> SharedDataset:
+        """
+        Write a dataset to the registry. The index of a DataFrame is not published.
+
+        Args:
+            name (str): The dataset name.
+            data (pandas.DataFrame | str): A DataFrame, or a source read with file.get_source.
+            usecols (list): Columns to publish, defaults to all of them.
+
+        Returns:
+            SharedDataset: The handle, holding the reference of the registry.
+        """
+        if not isinstance(data, pandas.DataFrame):
+            data = file.get_source(data, usecols=usecols)
+        elif usecols:
+            data = data[file.select_columns(list(data.columns), usecols)]
+
+        with self.lock:
+            if name in self.datasets:
+                raise ValueError(f"Dataset {name} is already published")
+            self.published += 1
+            path = self.root / str(self.published)
+            path.mkdir()
+            arrays, kinds = file.encode_columns([data[c] for c in data.columns])
+            for key, values in arrays.items():
+                np.save(path / f"{key}.npy", values, allow_pickle=False)
+            dataset = SharedDataset(
+                name, str(path), list(data.columns), kinds, len(data)
+            )
+            self.datasets[name] = dataset
+            self.refs[name] = 1
+        return dataset
+
+    def acquire(self, name: str) -> SharedDataset:
+        """
+        Add a reference to a dataset.
+
+        Returns:
+            SharedDataset: The handle, to pass to a worker.
+        """
+        with self.lock:
+            if name not in self.datasets:
+                raise KeyError(f"Dataset {name} is not published")
+            self.refs[name] += 1
+            return self.datasets[name]
+
+    def release(self, name: str):
+        """
+        Drop a reference to a dataset, removing its files with the last one.
+        """
+        with self.lock:
+            if name not in self.datasets:
+                raise KeyError(f"Dataset {name} is not published")
+            self.refs[name] -= 1
+            if self.refs[name]:
+                return
+            dataset = self.datasets.pop(name)
+            del self.refs[name]
+        dataset.close()
+        shutil.rmtree(dataset.path, ignore_errors=True)
+
+    def close(self):
+        """
+        Remove every dataset, whatever its references.
+        """
+        with self.lock:
+            for dataset in self.datasets.values():
+                dataset.close()
+            self.datasets.clear()
+            self.refs.clear()
+        self._finalizer()
@@ -93,12 +93,21 @@ def fetch_handler():
         source = request.args.get("source", "")
         symbol = request.args.get("symbol", "")
         interval = request.args.get("interval", "")
+        chunk = int(request.args.get("chunk", 1))
         source_path = os.path.join(SOURCE_DIR, source)
         backtest_output = os.path.join(FILES_ROOT, source)
+        changed = None
 
         if symbol and interval:
-            bingx = BingX_CLI(symbol=symbol, interval=interval, output=source_path)
-            bingx.run()
+            # Only the candles since the last stored one are fetched
+            bingx = BingX_CLI(
+                symbol=symbol,
+                interval=interval,
+                output=source_path,
+                chunk=chunk,
+                sync="true",
+            )
+            changed = bingx.run()
 
         rules = request.args.get("rules", "")
         config = request.args.get("config", "")
@@ -113,7 +122,7 @@ def fetch_handler():
                 allowed_rules=rules,
             )
             quant.run_specific_config()
-        return jsonify(success=True)
+        return jsonify(success=True, changed=changed)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return jsonify(success=False, error=f"{e}")
@@ -18,22 +18,14 @@ fi
 # python py/processor.py process --source=$file_path --output=$ta_file_path_15m
 
 interval_1h="1h"
-file_path="ignore/${symbol}_${interval_1h}.csv"
-ta_file_path_1h="ignore/${symbol}_${interval_1h}_ta.csv"
-python py/price.py fetch --symbol=$symbol --interval=$interval_1h --path=$file_path --merge=true --chunk=30
-python py/processor.py process --source=$file_path --output=$ta_file_path_1h
-
 interval_2h="2h"
-file_path="ignore/${symbol}_${interval_2h}.csv"
-ta_file_path_2h="ignore/${symbol}_${interval_2h}_ta.csv"
-python py/price.py fetch --symbol=$symbol --interval=$interval_2h --path=$file_path --merge=true --chunk=30
-python py/processor.py process --source=$file_path --output=$ta_file_path_2h
-
 interval_4h="4h"
-file_path="ignore/${symbol}_${interval_4h}.csv"
+ta_file_path_1h="ignore/${symbol}_${interval_1h}_ta.csv"
+ta_file_path_2h="ignore/${symbol}_${interval_2h}_ta.csv"
 ta_file_path_4h="ignore/${symbol}_${interval_4h}_ta.csv"
-python py/price.py fetch --symbol=$symbol --interval=$interval_4h --path=$file_path --merge=true --chunk=30
-python py/processor.py process --source=$file_path --output=$ta_file_path_4h
+
+# Fetch and process every interval in one process
+python py/price.py fetch_many --symbols=$symbol --intervals=$interval_1h,$interval_2h,$interval_4h --merge=true --chunk=30 --process=true
 
 datetime=$(date +%Y-%m-%d_%H)
 analyze_file="ignore/analyze_${symbol}_${datetime}.txt"